@@ -1,63 +1,226 @@
+import argparse
+from functools import partial
 import re
 
+from .data_cleaning import DataCleaning
 from .datasets.card_data import CardData
 from .datasets.date_events_data import DateEventsData
 from .datasets.orders_data import OrdersData
 from .datasets.products_data import ProductsData
 from .datasets.stores_data import StoresData
 from .datasets.user_data import UserData
+from .index_planner import IndexPlanner
+from .memory_usage import report_memory_usage
+from .pipeline_scheduler import PipelineScheduler
+from .sales_rollups import SalesRollups
+from .stage_snapshots import StageSnapshotStore
+
+
+stage_snapshot_store = StageSnapshotStore()
+
+
+def restore_stage_snapshot(dataset_instance, stage: str):
+  '''
+  Reads back the snapshot of a dataset's output of a stage and restores the high-water
+  mark saved with it. Returns the output of the stage; raises a RuntimeError if there
+  is no usable snapshot, so that the pipeline tasks depending on the table are skipped.
+  '''
+  snapshot = stage_snapshot_store.load(dataset_instance._target_table_name, stage)
+  if snapshot is None:
+    raise RuntimeError(f"{dataset_instance._target_table_name} can't be resumed without its {stage} snapshot.")
+  df, dataset_state = snapshot
+  dataset_instance._extracted_high_water_mark = dataset_state.get('extracted_high_water_mark')
+  return df
+
+
+def save_stage_snapshot(dataset_instance, stage: str, df) -> None:
+  '''
+  Saves a snapshot of a dataset's output of a stage, along with its high-water mark.
+  '''
+  high_water_mark = dataset_instance._extracted_high_water_mark
+  stage_snapshot_store.save(dataset_instance._target_table_name, stage, df,
+                            {'extracted_high_water_mark': None if high_water_mark is None else int(high_water_mark)})
+
+
+def run_dataset_etl(dataset_instance, from_stage: str = 'extract', chunksize: int = None) -> None:
+  '''
+  Extracts, cleans and uploads a dataset into the local database, then records how
+  far its RDS source table (if any) has been loaded, for later incremental runs.
+  The output of the extract and clean stages is snapshotted, so that a later run can
+  start from_stage 'clean' (cleaning the last extracted data) or 'upload' (uploading
+  the last cleaned data) instead of extracting the dataset again.
+  The dataset is loaded into a staging table that is swapped in for any existing
+  table, so the existing table stays readable throughout and no confirmation is asked for.
+  Raises a RuntimeError if the upload did not happen, so that the pipeline
+  tasks depending on the table are skipped. The memory usage of each stage is reported,
+  and in memory-lean mode the cleaned data is released once the upload is confirmed.
+  If a chunksize is given, the datasets extracted from the RDS database (orders and users)
+  are instead streamed from it, and cleaned and uploaded, one chunk of at most that many
+  rows at a time; their stages aren't snapshotted, as no stage holds the whole dataset.
+  '''
+  table_name = dataset_instance._target_table_name
+  if chunksize is not None and isinstance(dataset_instance, (OrdersData, UserData)):
+    with report_memory_usage(f'extract, clean and upload {table_name} in chunks'):
+      dataset_instance.extract_data(chunksize=chunksize)
+      if not dataset_instance.upload_extracted_chunks_to_db(use_staging_table=True):
+        raise RuntimeError(f"{table_name} was not uploaded to the database.")
+    dataset_instance.save_extracted_high_water_mark()
+    return
+  if from_stage == 'extract':
+    with report_memory_usage(f'extract {table_name}'):
+      dataset_instance.extract_data()
+    save_stage_snapshot(dataset_instance, 'extract', dataset_instance._extracted_data)
+  elif from_stage == 'clean':
+    dataset_instance._extracted_data = restore_stage_snapshot(dataset_instance, 'extract')
+  if from_stage == 'upload':
+    dataset_instance._cleaned_data = restore_stage_snapshot(dataset_instance, 'clean')
+  else:
+    with report_memory_usage(f'clean {table_name}'), DataCleaning.memory_lean_scope():
+      dataset_instance.clean_extracted_data()
+    save_stage_snapshot(dataset_instance, 'clean', dataset_instance._cleaned_data)
+  with report_memory_usage(f'upload {table_name}'):
+    if not dataset_instance.upload_to_db(use_staging_table=True): # see individual dataset modules for type casting specified in each upload
+      raise RuntimeError(f"{table_name} was not uploaded to the database.")
+  dataset_instance.save_extracted_high_water_mark()
+  if DataCleaning._memory_lean_mode:
+    dataset_instance.release_cleaned_data()
+
+
+def refresh_sales_rollups(incremental: bool = False) -> None:
+  '''
+  Refreshes the sales rollups (see SalesRollups.refresh). Raises a RuntimeError if
+  the refresh failed, so that the run doesn't report success with stale rollups.
+  '''
+  if not SalesRollups().refresh(incremental=incremental):
+    raise RuntimeError("The sales rollups were not refreshed.")
 
 
 if __name__ == "__main__":
 
-  # INITIALISING INSTANCES OF ALL DATASET CLASSES
-  card_data = CardData()
-  stores_data = StoresData()
-  user_data = UserData()
-  products_data = ProductsData()
-  orders_data = OrdersData()
-  date_events_data = DateEventsData()
-
-  dataset_instances = [card_data, stores_data, user_data, products_data, orders_data, date_events_data]
-
-  # EXTRACTING, CLEANING AND UPLOADING ALL DATA INTO LOCAL DATABASE
-  for dataset_instance in dataset_instances:
-    dataset_instance.extract_data()
-    dataset_instance.clean_extracted_data()
-    dataset_instance.upload_to_db() # see individual dataset modules for type casting specified in each upload
-
-  # TWEAKING THE DATABASE SCHEMA IN LOCAL SERVER
-      # SETTING VARCHAR CHARACTER LIMITS ON RESPECTIVE COLUMNS
-  card_data.set_varchar_type_limit_to_max_char_length_of_columns(['card_number', 'expiry_date', 'card_provider'])
-  date_events_data.set_varchar_type_limit_to_max_char_length_of_columns(['month', 'day', 'year', 'time_period'])
-  orders_data.set_varchar_type_limit_to_max_char_length_of_columns(['card_number', 'store_code', 'product_code'])
-  products_data.set_varchar_type_limit_to_max_char_length_of_columns(['EAN', 'product_code'])
-  stores_data.set_varchar_type_limit_to_max_char_length_of_columns(['store_code', 'country_code'])
-  user_data.set_varchar_type_limit_to_max_char_length_of_columns(['country_code'])
-
-      # MAKING REQUIRED CHANGES TO dim_products TABLE
-  products_data.add_weight_class_column_to_db_table()
-
-  products_data.rename_column_in_db_table('removed', 'still_available')
-
-  query = "ALTER TABLE dim_products ALTER Still_available TYPE bool \
-                USING CASE \
-                    WHEN Still_available = 'Still_avaliable' THEN TRUE \
-                    ELSE FALSE END;"
-  products_data.update_db(query)
-
-
-# FINALISING THE STAR-BASED SCHEMEA: SETTING THE PRIMARY AND FOREIGN KEYS
-    # if the dataset's table name starts with "dim":
-    # find the column it has in common with orders_table,
-    # make that column a primary key in the dim table,
-    # and make the matching column in the orders_table its foreign key
-for dataset_instance in dataset_instances:
-    if re.match(r'^dim', dataset_instance._target_table_name):
-      dataset_instance.set_primary_key_column()
-      primary_key_column = dataset_instance.return_column_in_common_with_orders_table()
-      orders_table_query1 = f'ALTER TABLE orders_table ALTER COLUMN "{primary_key_column}" SET NOT NULL'
-      dataset_instance.update_db(orders_table_query1)
-      orders_table_query2 = f'ALTER TABLE orders_table ADD CONSTRAINT fk_{primary_key_column} FOREIGN KEY ("{primary_key_column}")\
-                              REFERENCES {dataset_instance._target_table_name} ("{primary_key_column}");'
-      dataset_instance.update_db(orders_table_query2)
+  parser = argparse.ArgumentParser(prog='python -m db_setup',
+                                   description='Extracts, cleans and loads the retail datasets into the local sales_data database.')
+  parser.add_argument('--incremental', action='store_true',
+                      help='only extract and append the orders and users rows added to the RDS database since the last load')
+  parser.add_argument('--workers', type=int, default=4,
+                      help='the maximum number of pipeline tasks run concurrently (default: 4)')
+  parser.add_argument('--memory-lean', action='store_true',
+                      help='clean with copy-on-write instead of copying the extracted data, and release each dataset\'s data once it has been uploaded')
+  parser.add_argument('--from-stage', choices=StageSnapshotStore.stages, default='extract',
+                      help='start each dataset\'s pipeline from this stage, using the data snapshotted by the previous run '
+                           'of the stage before it (default: extract)')
+  parser.add_argument('--chunksize', type=int,
+                      help='stream the orders and users tables from the RDS database, cleaning and uploading them this '
+                           'many rows at a time, so that only one chunk of each is held in memory')
+  parser.add_argument('--covering-indexes', action='store_true',
+                      help='build the indexes on the columns the business queries join and filter on as covering indexes, '
+                           'including the other columns of the table the queries read')
+  args = parser.parse_args()
+  if args.incremental and args.from_stage != 'extract':
+    parser.error('--from-stage can only be used for full loads, not with --incremental')
+  if args.chunksize is not None and (args.incremental or args.from_stage != 'extract'):
+    parser.error('--chunksize can only be used for full loads starting from the extract stage')
+  if args.chunksize is not None and args.chunksize < 1:
+    parser.error('--chunksize must be a positive number of rows')
+
+  DataCleaning.set_memory_lean_mode(args.memory_lean)
+
+  if args.incremental:
+
+    # INITIALISING INSTANCES OF THE DATASET CLASSES EXTRACTED FROM THE RDS DATABASE
+    user_data = UserData()
+    orders_data = OrdersData()
+
+    # APPENDING THE ROWS ADDED BEYOND EACH SOURCE TABLE'S HIGH-WATER MARK
+      # users are appended first so that new orders never reference a user not yet in dim_users;
+      # dim_date_times holds a row for every sale, so it is reloaded in full before the new orders
+      # are appended, so that their foreign key to it holds. New orders for cards, stores or products
+      # not yet in their dim tables are rejected by their foreign keys, and need a full load.
+    orders_reloaded_in_full = False
+    for dataset_instance in [user_data, orders_data]:
+      table_name = dataset_instance._target_table_name
+      has_high_water_mark = dataset_instance._watermark_store.get(dataset_instance._source_db_table_name) is not None
+      if has_high_water_mark:
+        dataset_instance.extract_data(incremental=True)
+        if dataset_instance._extracted_data.empty:
+          continue
+      if dataset_instance is orders_data:
+        run_dataset_etl(DateEventsData())
+      # with no high-water mark there is nothing to append beyond, so the table is reloaded in full
+      if not has_high_water_mark:
+        print(f"No high-water mark saved for {table_name}; loading it in full instead.")
+        run_dataset_etl(dataset_instance)
+        if dataset_instance is orders_data:
+          orders_reloaded_in_full = True
+        continue
+      with DataCleaning.memory_lean_scope():
+        dataset_instance.clean_extracted_data()
+      if not dataset_instance.append_to_db():
+        raise RuntimeError(f"The new rows could not be appended to {table_name}, and its high-water mark is unchanged. "
+                           "If they reference rows not yet in a dim table, run a full load.")
+      dataset_instance.save_extracted_high_water_mark()
+      if args.memory_lean:
+        dataset_instance.release_cleaned_data()
+
+    # ADDING THE NEWLY APPENDED ORDERS TO THE SALES ROLLUPS
+    refresh_sales_rollups(incremental=not orders_reloaded_in_full)
+
+  else:
+
+    # INITIALISING INSTANCES OF ALL DATASET CLASSES
+    card_data = CardData()
+    stores_data = StoresData()
+    user_data = UserData()
+    products_data = ProductsData()
+    orders_data = OrdersData()
+    date_events_data = DateEventsData()
+
+    dataset_instances = [card_data, stores_data, user_data, products_data, orders_data, date_events_data]
+
+    # BUILDING THE PIPELINE AS A GRAPH OF TASKS, SO THAT INDEPENDENT TASKS RUN CONCURRENTLY
+    scheduler = PipelineScheduler(max_workers=args.workers)
+
+    for dataset_instance in dataset_instances:
+      table_name = dataset_instance._target_table_name
+
+      # EXTRACTING, CLEANING AND UPLOADING THE DATASET INTO LOCAL DATABASE
+        # each table is created with its final column types, including the VARCHAR character
+        # limits of the columns listed in its config, and with any columns derived in cleaning
+        # (e.g. dim_products' weight_class and still_available), so no columns are altered after the upload
+        # the datasets are extracted, cleaned and uploaded to their staging tables concurrently, but swapped
+        # in one at a time, as each swap drops and re-adds foreign keys of orders_table (see _staging_swap_lock)
+      scheduler.add_task(f'load_{table_name}', partial(run_dataset_etl, dataset_instance, args.from_stage, args.chunksize))
+
+    # FINALISING THE STAR-BASED SCHEMEA: SETTING THE PRIMARY AND FOREIGN KEYS
+        # if the dataset's table name starts with "dim":
+        # make its primary key column a primary key once the dim table has been loaded
+        # (already done on the staging table for every dim table with a primary_key_column
+        # in its config, so this task only checks for it),
+        # and make the matching column in the orders_table its foreign key once that key exists;
+        # the foreign keys are added NOT VALID, and only validated once all of them have been added,
+        # as validation and adding a foreign key take conflicting locks on orders_table
+    dim_table_names = [dataset_instance._target_table_name for dataset_instance in dataset_instances
+                       if re.match(r'^dim', dataset_instance._target_table_name)]
+    for dataset_instance in dataset_instances:
+      table_name = dataset_instance._target_table_name
+      if table_name in dim_table_names:
+        scheduler.add_task(f'set_primary_key_{table_name}', dataset_instance.set_primary_key_column,
+                           depends_on=[f'load_{table_name}'])
+        scheduler.add_task(f'add_foreign_key_to_orders_table_{table_name}', dataset_instance.add_foreign_key_to_orders_table,
+                           depends_on=[f'set_primary_key_{table_name}', 'load_orders_table'])
+    for dataset_instance in dataset_instances:
+      table_name = dataset_instance._target_table_name
+      if table_name in dim_table_names:
+        scheduler.add_task(f'validate_foreign_key_in_orders_table_{table_name}', dataset_instance.validate_foreign_key_in_orders_table,
+                           depends_on=[f'add_foreign_key_to_orders_table_{name}' for name in dim_table_names])
+
+    # REBUILDING THE SALES ROLLUPS ONCE EVERY TABLE HAS BEEN LOADED AND ITS KEYS VALIDATED
+        # (see querying-the-data/rollup_queries.sql for the business queries answered from them)
+    scheduler.add_task('refresh_sales_rollups', refresh_sales_rollups,
+                       depends_on=[f'validate_foreign_key_in_orders_table_{name}' for name in dim_table_names])
+
+    # INDEXING THE FOREIGN KEY COLUMNS AND THE COLUMNS THE BUSINESS QUERIES JOIN AND FILTER ON
+        # (built concurrently, so the tables stay readable while the rollups are refreshed)
+    scheduler.add_task('build_indexes', partial(IndexPlanner().build_indexes, args.covering_indexes),
+                       depends_on=[f'validate_foreign_key_in_orders_table_{name}' for name in dim_table_names])
+
+    scheduler.run()
@@ -0,0 +1,253 @@
+import re
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+class CatalogCache:
+    '''
+    An in-process snapshot of a database's catalog, shared by every connector
+    to the database: the tables of the current schema, with their columns and
+    column types, and their constraints. The snapshot is loaded with a single
+    query the first time it is read, and kept until the connectors issue DDL,
+    when only the tables the statement touches are marked stale and reloaded
+    (again in a single query) the next time the snapshot is read.
+
+    Parameters:
+    ----------
+    engine: sqlalchemy.engine.Engine
+        The engine connected to the database.
+
+    Attributes:
+    ----------
+    _engine: sqlalchemy.engine.Engine
+        Protected; the engine connected to the database.
+    _tables: dict[str, dict] | None
+        Protected; dictionary mapping each table name to a dictionary holding its
+        'columns' and 'constraints'. None until the snapshot is first loaded.
+    _stale_table_names: set[str]
+        Protected; the names of the tables to be reloaded before the snapshot is next read.
+    _lock: threading.Lock
+        Protected; lock held while the snapshot is read or invalidated, as the connectors
+        sharing it are used from the pipeline's worker threads.
+    '''
+    # one query returning every table with its columns and constraints as JSON arrays
+    _snapshot_query = """
+        SELECT t.table_name,
+               COALESCE((SELECT json_agg(json_build_object('column_name', c.column_name,
+                                                           'data_type', c.data_type,
+                                                           'character_maximum_length', c.character_maximum_length,
+                                                           'numeric_precision', c.numeric_precision,
+                                                           'numeric_precision_radix', c.numeric_precision_radix,
+                                                           'datetime_precision', c.datetime_precision,
+                                                           'udt_name', c.udt_name,
+                                                           'is_nullable', c.is_nullable)
+                                         ORDER BY c.ordinal_position)
+                         FROM INFORMATION_SCHEMA.COLUMNS AS c
+                         WHERE c.table_schema = t.table_schema AND c.table_name = t.table_name), '[]') AS columns,
+               COALESCE((SELECT json_agg(json_build_object('constraint_name', con.conname,
+                                                           'constraint_type', CASE con.contype WHEN 'p' THEN 'PRIMARY KEY'
+                                                                                               WHEN 'f' THEN 'FOREIGN KEY'
+                                                                                               WHEN 'u' THEN 'UNIQUE'
+                                                                                               WHEN 'c' THEN 'CHECK'
+                                                                                               ELSE con.contype::text END,
+                                                           'definition', pg_get_constraintdef(con.oid),
+                                                           'referenced_table', NULLIF(con.confrelid, 0)::regclass::text,
+                                                           'is_validated', con.convalidated))
+                         FROM pg_constraint AS con
+                         WHERE con.conrelid = format('%I.%I', t.table_schema, t.table_name)::regclass), '[]') AS constraints
+        FROM INFORMATION_SCHEMA.TABLES AS t
+        WHERE t.table_schema = current_schema() AND t.table_type = 'BASE TABLE'
+        """
+
+    # the table names a DDL statement may create, change or drop
+    _ddl_table_name_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in
+                                [r'\b(?:ALTER|CREATE|DROP)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(?:ONLY\s+)?"?(\w+)"?',
+                                 r'\bRENAME\s+TO\s+"?(\w+)"?',
+                                 r'\bINDEX\b.*?\bON\s+(?:ONLY\s+)?"?(\w+)"?']]
+
+    def __init__(self, engine: Engine) -> None:
+        '''
+        See help(CatalogCache) for accurate signature.
+        '''
+        self._engine = engine
+        self._tables = None
+        self._stale_table_names = set()
+        self._lock = threading.Lock()
+
+    def _load_tables(self, table_names: list[str] = None) -> dict[str, dict]:
+        '''
+        Protected; method that loads the catalog entries of the tables of the current
+        schema from the database, in a single query.
+
+        Arguments:
+        ---------
+        table_names: list[str]
+            Default=None. The names of the tables to be loaded. If None, every table is loaded.
+
+        Returns:
+        -------
+        dict[str, dict]: dictionary mapping each table name loaded to a dictionary
+        holding its 'columns' and 'constraints'.
+        '''
+        query = self._snapshot_query
+        params = {}
+        if table_names is not None:
+            query += " AND t.table_name = ANY(:table_names)"
+            params['table_names'] = list(table_names)
+        with self._engine.connect() as conn:
+            rows = conn.execute(text(query), params).fetchall()
+        return {table_name: {'columns': columns, 'constraints': constraints}
+                for table_name, columns, constraints in rows}
+
+    def _get_tables(self) -> dict[str, dict]:
+        '''
+        Protected; method that returns the snapshot, loading it if it hasn't been
+        loaded yet and reloading any stale tables.
+
+        Returns:
+        -------
+        dict[str, dict]: dictionary mapping each table name to its catalog entry.
+        '''
+        with self._lock:
+            if self._tables is None:
+                self._tables = self._load_tables()
+                self._stale_table_names.clear()
+            elif self._stale_table_names:
+                reloaded_tables = self._load_tables(self._stale_table_names)
+                # stale tables that weren't reloaded have been dropped or renamed
+                for table_name in self._stale_table_names:
+                    self._tables.pop(table_name, None)
+                self._tables.update(reloaded_tables)
+                self._stale_table_names.clear()
+            # a copy, so that it can be iterated over while another thread invalidates the snapshot
+            return dict(self._tables)
+
+    def invalidate(self, table_names: list[str] = None) -> None:
+        '''
+        Method that marks tables of the snapshot as stale, so that they are reloaded
+        the next time the snapshot is read.
+
+        Arguments:
+        ---------
+        table_names: list[str]
+            Default=None. The names of the tables created, changed or dropped. If None,
+            the whole snapshot is reloaded.
+        '''
+        with self._lock:
+            if table_names is None:
+                self._tables = None
+            else:
+                self._stale_table_names.update(table_names)
+
+    def invalidate_for_statement(self, query_text: str) -> None:
+        '''
+        Method that marks as stale the tables that a SQL statement may have created,
+        changed or dropped. Statements that aren't DDL leave the snapshot unchanged;
+        DDL statements whose tables can't all be identified (e.g. DROP INDEX, ALTER INDEX,
+        or anything CASCADE) invalidate the whole snapshot.
+
+        Arguments:
+        ---------
+        query_text: str
+            The SQL statement that has been executed.
+        '''
+        if not re.match(r'\s*(ALTER|CREATE|DROP|COMMENT)\b', query_text, re.IGNORECASE):
+            return
+        table_names = {table_name for pattern in self._ddl_table_name_patterns
+                       for table_name in pattern.findall(query_text)}
+        # (the table referenced by a new foreign key gains no constraint, so isn't reloaded)
+        if table_names and not re.match(r'\s*(ALTER|DROP)\s+INDEX\b', query_text, re.IGNORECASE) \
+            and not re.search(r'\bCASCADE\b', query_text, re.IGNORECASE):
+            self.invalidate(list(table_names))
+        else:
+            self.invalidate()
+
+    def get_table_names(self) -> list[str]:
+        '''
+        Method that returns the names of the tables in the database.
+
+        Returns:
+        -------
+        list[str]: the names of the tables of the current schema.
+        '''
+        return list(self._get_tables())
+
+    def get_columns(self, table_name: str) -> list[dict]:
+        '''
+        Method that returns the columns of a table, in the order of the table.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table.
+
+        Returns:
+        -------
+        list[dict]: a dictionary for each column, holding its 'column_name', 'data_type',
+        'character_maximum_length', 'numeric_precision', 'numeric_precision_radix',
+        'datetime_precision', 'udt_name' and 'is_nullable'. Empty if there is no such table.
+        '''
+        return self._get_tables().get(table_name, {}).get('columns', [])
+
+    def get_column(self, table_name: str, column_name: str) -> dict | None:
+        '''
+        Method that returns a column of a table.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table.
+        column_name: str
+            The name of the column.
+
+        Returns:
+        -------
+        dict | None: the column's dictionary (see get_columns), or None if there is no such column.
+        '''
+        for column in self.get_columns(table_name):
+            if column['column_name'] == column_name:
+                return column
+        return None
+
+    def get_constraints(self, table_name: str, constraint_type: str = None) -> list[dict]:
+        '''
+        Method that returns the constraints of a table.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table.
+        constraint_type: str
+            Default=None. If given, only the constraints of this type are returned:
+            'PRIMARY KEY', 'FOREIGN KEY', 'UNIQUE' or 'CHECK'.
+
+        Returns:
+        -------
+        list[dict]: a dictionary for each constraint, holding its 'constraint_name',
+        'constraint_type', 'definition', 'referenced_table' and 'is_validated'.
+        '''
+        constraints = self._get_tables().get(table_name, {}).get('constraints', [])
+        if constraint_type is None:
+            return list(constraints)
+        return [constraint for constraint in constraints if constraint['constraint_type'] == constraint_type]
+
+    def get_foreign_keys_referencing(self, table_name: str) -> list[tuple[str, dict]]:
+        '''
+        Method that returns the foreign keys of other tables that reference a table.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the referenced table.
+
+        Returns:
+        -------
+        list[tuple[str, dict]]: the name of the referencing table and the foreign key's
+        dictionary (see get_constraints), for each foreign key.
+        '''
+        return [(referencing_table, constraint)
+                for referencing_table, table_entry in self._get_tables().items() if referencing_table != table_name
+                for constraint in table_entry['constraints']
+                if constraint['constraint_type'] == 'FOREIGN KEY' and constraint['referenced_table'] == table_name]
@@ -1,18 +1,209 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import multiprocessing
 import re
+import threading
+from typing import Any, Callable, Iterator
 
 import numpy as np
 import pandas as pd
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError: # only public from pandas 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
 
 from dateutil.parser import parse
 
 
+class RowFilterPlan:
+    '''
+    A plan of the rows to be removed from a DataFrame being cleaned. The row
+    predicates are collected without being evaluated, then evaluated together
+    when the plan is materialised: they are combined into a single mask, so that
+    the DataFrame is filtered (and copied) once, however many predicates there are.
+    The number of rows removed by each predicate is counted, each row being counted
+    against the first predicate in the plan that removes it.
+
+    Parameters:
+    ----------
+    df: pd.DataFrame
+        The Pandas DataFrame being cleaned.
+
+    Attributes:
+    ----------
+    _df: pd.DataFrame
+        Protected; the Pandas DataFrame being cleaned.
+    _predicates: list[tuple[str, Callable[[pd.DataFrame], pd.Series]]]
+        Protected; the description of each predicate in the plan, and the function
+        returning the mask of the rows it removes.
+    '''
+    def __init__(self, df: pd.DataFrame) -> None:
+        '''
+        See help(RowFilterPlan) for accurate signature.
+        '''
+        self._df = df
+        self._predicates = []
+
+    def remove_rows_where(self, description: str, predicate: Callable[[pd.DataFrame], pd.Series]) -> None:
+        '''
+        Method that adds a predicate to the plan. The predicate is evaluated against
+        every row of the DataFrame when the plan is materialised, not only the rows
+        kept by the predicates before it, so it mustn't rely on them having been removed.
+
+        Arguments:
+        ---------
+        description: str
+            The description of the rows removed, used in the count of rows removed.
+        predicate: Callable[[pd.DataFrame], pd.Series]
+            Function that takes the DataFrame and returns a boolean mask of the rows
+            to be removed. Rows where the mask is NaN/Null are kept.
+        '''
+        self._predicates.append((description, predicate))
+
+    def remove_rows_with_nan_values_in_specified_column(self, column: str) -> None:
+        '''
+        Method that adds to the plan the removal of rows in which NaN/Null values
+        exist in a specified column.
+
+        Arguments:
+        ---------
+        column: str
+            The name of the column to search for NaN/Null values
+        '''
+        self.remove_rows_where(f"NaN in {column}", lambda df: df[column].isna())
+
+    def remove_rows_with_specific_value_in_specified_column(self, column: str, specified_value) -> None:
+        '''
+        Method that adds to the plan the removal of rows in which a specified value
+        is found in a specified column.
+
+        Arguments:
+        ---------
+        column: str
+            The name of the column to search for the specified value
+        specified_value: any
+            The value to be searched for in the specified column
+        '''
+        self.remove_rows_where(f"{column} == {specified_value!r}", lambda df: df[column] == specified_value)
+
+    def remove_rows_where_numeric_digits_are_found_in_string_column_values(self, column: str) -> None:
+        '''
+        Method that adds to the plan the removal of rows in which numeric digits are
+        found in the string column values in a specified column.
+
+        Arguments:
+        ---------
+        column: str
+            The name of the column to search in for numeric digits.
+        '''
+        self.remove_rows_where(f"numeric digits in {column}",
+                               lambda df: df[column].str.contains(pat=r'[0-9]', regex=True))
+
+    def remove_rows_where_column_values_not_in_defined_list(self, column: str, list_of_valid_values: list) -> None:
+        '''
+        Method that adds to the plan the removal of rows in which the value of a
+        specified column does not exist in a defined list.
+
+        Arguments:
+        ---------
+        column: str
+            The name of the column to search for any values not in the defined list
+        list_of_valid_values: list
+            A list of the values which are valid for the column
+        '''
+        self.remove_rows_where(f"{column} not in {list_of_valid_values}",
+                               lambda df: ~np.isin(df[column], list_of_valid_values))
+
+    def materialise(self) -> tuple[pd.DataFrame, dict[str, int]]:
+        '''
+        Method that evaluates the predicates of the plan, combines them into a single
+        mask and filters the DataFrame with it.
+
+        Returns:
+        -------
+        tuple[pd.DataFrame, dict[str, int]]: the filtered DataFrame (the DataFrame itself
+        if no rows are removed), and a dictionary mapping the description of each predicate
+        to the number of rows it removed.
+        '''
+        rows_kept = np.ones(len(self._df), dtype=bool)
+        rows_removed = {}
+        for description, predicate in self._predicates:
+            rows_removed_by_predicate = pd.Series(predicate(self._df)).fillna(False).to_numpy(dtype=bool)
+            rows_removed[description] = int(np.count_nonzero(rows_kept & rows_removed_by_predicate))
+            rows_kept &= ~rows_removed_by_predicate
+        if rows_kept.all():
+            return self._df, rows_removed
+        return self._df[rows_kept], rows_removed
+
+
 class DataCleaning(ABC):
     '''
     An abstract base class an abstract method to be implemented
     and static methods to be used for data cleaning of Pandas
     DataFrames by the inheriting dataset-related classes on their
+
+    Attributes:
+    ----------
+    _learned_datetime_formats: list[str]
+        Protected; class attribute listing the explicit formats that date strings
+        are parsed with, column-wide, before falling back to dateutil. Formats are
+        learned from the values that fall back to dateutil, when a value's guessed
+        format parses it to the same datetime as dateutil does. Shared by the datasets
+        cleaned concurrently, so it is only read and extended under
+        _learned_datetime_formats_lock.
+    _learned_datetime_formats_max_size: int
+        Protected; class attribute holding the maximum number of formats held in
+        _learned_datetime_formats, beyond which no more formats are learned.
+    _valid_phone_number_patterns: dict[str, re.Pattern]
+        Protected; class attribute mapping each supported country code to the
+        precompiled regular expression a valid phone number of that country matches.
+    _transform_cache: OrderedDict
+        Protected; class attribute holding the least recently used results of the
+        transforms applied with _apply_to_unique_values and _memoized_transform,
+        keyed by the transform's cache name and the value it was applied to, and
+        kept across cleaning runs for recurring values.
+    _transform_cache_max_size: int
+        Protected; class attribute holding the maximum number of results held in
+        _transform_cache, beyond which the least recently used are evicted.
+    _memory_lean_mode: bool
+        Protected; class attribute, True if the datasets are cleaned in memory-lean
+        mode (see set_memory_lean_mode).
+    _copy_on_write_scope_depth: int
+        Protected; class attribute holding the number of cleaning calls currently in a
+        memory_lean_scope, so that pandas' copy-on-write mode is only restored once the
+        last of the datasets cleaned concurrently has left it.
+    derived_columns: dict[str, str]
+        Class attribute mapping the name of each column a dataset derives from its
+        cleaned columns to the name of the dataset's method computing it from the
+        dataframe (see _add_derived_columns). Empty unless overridden by the dataset class.
     '''
+    _memory_lean_mode = False
+    _copy_on_write_scope_depth = 0
+    _copy_on_write_scope_lock = threading.Lock()
+    _copy_on_write_option_context = None
+
+    derived_columns = {}
+
+    _transform_cache = OrderedDict()
+    _transform_cache_max_size = 100000
+    _transform_cache_lock = threading.Lock()
+
+    _learned_datetime_formats = ['%Y-%m-%d', '%Y/%m/%d']
+    _learned_datetime_formats_max_size = 20
+    _learned_datetime_formats_lock = threading.Lock()
+
+    # the precompiled pattern of a valid phone number of each country
+    _valid_phone_number_patterns = {
+        # This regex allows for a lot of flexibility in how the number may be inputted,
+        # but it counts as invalid any number where (counting from after the country code)
+        # the 1st or 4th digit is 0 or 1.
+        'US': re.compile(r'^\s*((0{1,2}\s?1|\+1|1)[\.\s-]?)?\(?([2-9][0-9]{2})\)?[\.\s-]?[2-9][0-9]{2}[\.\s-]?\d{4}(?:[\.\s]*((?:#|x\.?|ext\.?|extension)\s*(\d+)))?'),
+        'GB': re.compile(r'^\s*(?:(?:\(?(?:0(?:0|11)\)?[\s-]?\(?|\+)44\)?[\s-]?(?:\(?0\)?[\s-]?)?)|(?:\(?0))(?:(?:\d{5}\)?[\s-]?\d{4,5})|(?:\d{4}\)?[\s-]?(?:\d{5}|\d{3}[\s-]?\d{3}))|(?:\d{3}\)?[\s-]?\d{3}[\s-]?\d{3,4})|(?:\d{2}\)?[\s-]?\d{4}[\s-]?\d{4}))(?:[\s-]?(?:x|ext\.?|\#)\d{3,4})?\s*$'),
+        'DE': re.compile(r'^\s*((((00|\+)?49)((\s)|\s?\(0\)\s?)?)?|\(?(0\s?)?)?\(?(((([2-9]\d)|1[2-9])\)?[-\s](\d\s?){5,9}\d?)|((([2-9]\d{2})|1[2-9]\d)\)?[-\s]?(\d\s?){4,8}\d)|((([2-9]\d{3})|1[2-9]\d{2})\)?[-\s](\d\s?){3,7}\d?))\s*$')
+    }
 
     @abstractmethod
     def clean_extracted_data(self):
@@ -22,6 +213,83 @@ class DataCleaning(ABC):
         '''
         pass
 
+    @staticmethod
+    def set_memory_lean_mode(enabled: bool) -> None:
+        '''
+        Method that turns memory-lean mode on or off for every dataset. In memory-lean
+        mode, pandas' copy-on-write mode is turned on while the datasets are cleaned
+        (see memory_lean_scope), so that operations that return new DataFrames share
+        the unchanged columns instead of copying them, and clean_extracted_data takes
+        ownership of the extracted dataframe instead of copying it, releasing the
+        _extracted_data attribute.
+
+        Arguments:
+        ---------
+        enabled: bool
+            True to turn memory-lean mode on, False to turn it off.
+        '''
+        DataCleaning._memory_lean_mode = enabled
+
+    @staticmethod
+    @contextmanager
+    def memory_lean_scope() -> Iterator[None]:
+        '''
+        Context manager to wrap the calls to clean_extracted_data in: in memory-lean mode,
+        pandas' copy-on-write mode is turned on for the duration, and restored to its
+        previous setting once the last of the datasets cleaned concurrently leaves the
+        scope, so the option isn't left changed for the rest of the process. Does
+        nothing outside memory-lean mode.
+        '''
+        if not DataCleaning._memory_lean_mode:
+            yield
+            return
+        # pandas options are process-wide, so the option is only set by the first concurrent cleaning call in
+        with DataCleaning._copy_on_write_scope_lock:
+            if DataCleaning._copy_on_write_scope_depth == 0:
+                DataCleaning._copy_on_write_option_context = pd.option_context('mode.copy_on_write', True)
+                DataCleaning._copy_on_write_option_context.__enter__()
+            DataCleaning._copy_on_write_scope_depth += 1
+        try:
+            yield
+        finally:
+            with DataCleaning._copy_on_write_scope_lock:
+                DataCleaning._copy_on_write_scope_depth -= 1
+                if DataCleaning._copy_on_write_scope_depth == 0:
+                    DataCleaning._copy_on_write_option_context.__exit__(None, None, None)
+                    DataCleaning._copy_on_write_option_context = None
+
+    def _take_extracted_data_for_cleaning(self) -> pd.DataFrame:
+        '''
+        Protected; method used at the start of each dataset's clean_extracted_data method
+        to get the dataframe to be cleaned: a copy of the dataframe stored at the
+        _extracted_data attribute, or, in memory-lean mode, the dataframe itself, with
+        the attribute set to None so that the raw data isn't kept alive alongside the
+        cleaned data.
+
+        Returns:
+        -------
+        pd.DataFrame: the dataframe to be cleaned.
+        '''
+        if DataCleaning._memory_lean_mode:
+            extracted_data_df = self._extracted_data
+            self._extracted_data = None
+            return extracted_data_df
+        return self._extracted_data.copy()
+
+    def _add_derived_columns(self, df: pd.DataFrame) -> None:
+        '''
+        Protected; method that adds to the dataframe the columns in the dataset's
+        derived_columns attribute, in order, so that they are uploaded with the rest
+        of the cleaned data instead of being added to the table once it has been loaded.
+
+        Arguments:
+        ---------
+        df: pd.DataFrame
+            The Pandas dataframe being cleaned.
+        '''
+        for column_name, method_name in self.derived_columns.items():
+            df[column_name] = getattr(self, method_name)(df)
+
     @staticmethod
     def _drop_columns(df: pd.DataFrame, columns: list[str]) -> None:
         '''
@@ -68,7 +336,9 @@ class DataCleaning(ABC):
             A mapping dictionary where the key of the key:value pair is the existing
             value to be replaced and the value represents the value it should be replaced by
         '''
-        df[column].replace(mapping_dict, inplace=True)
+        # assigned back rather than replaced inplace on df[column], which under copy-on-write
+        # would only change a temporary copy of the column
+        df[column] = df[column].replace(mapping_dict)
 
     @staticmethod
     def _cast_columns_to_category(df: pd.DataFrame, columns: list[str]) -> None:
@@ -134,6 +404,222 @@ class DataCleaning(ABC):
         for column in columns:
             df[column] = pd.to_numeric(df[column], downcast='float', errors=errors_flag)
 
+    @classmethod
+    def _get_cached_transform_results(cls, cache_name: str, values: list) -> dict:
+        '''
+        Protected; method that returns the results held in _transform_cache of a
+        transform applied to values, marking them as recently used.
+
+        Arguments:
+        ---------
+        cache_name: str
+            The name the transform's results are cached under.
+        values: list
+            The values the transform is being applied to.
+
+        Returns:
+        -------
+        dict: dictionary mapping each value with a cached result to its result.
+        '''
+        cached_results = {}
+        with cls._transform_cache_lock:
+            for value in values:
+                cache_key = (cache_name, value)
+                if cache_key in cls._transform_cache:
+                    cls._transform_cache.move_to_end(cache_key)
+                    cached_results[value] = cls._transform_cache[cache_key]
+        return cached_results
+
+    @classmethod
+    def _cache_transform_results(cls, cache_name: str, results: dict) -> None:
+        '''
+        Protected; method that adds results of a transform to _transform_cache,
+        evicting the least recently used results beyond _transform_cache_max_size.
+
+        Arguments:
+        ---------
+        cache_name: str
+            The name the transform's results are cached under.
+        results: dict
+            Dictionary mapping each value the transform was applied to to its result.
+        '''
+        with cls._transform_cache_lock:
+            for value, result in results.items():
+                cls._transform_cache[(cache_name, value)] = result
+                cls._transform_cache.move_to_end((cache_name, value))
+            while len(cls._transform_cache) > cls._transform_cache_max_size:
+                cls._transform_cache.popitem(last=False)
+
+    @classmethod
+    def _memoized_transform(cls, cache_name: str, transform: Callable[[Any], Any], value) -> Any:
+        '''
+        Protected; method that applies a transform to a single value, reusing its
+        result from _transform_cache if the value has been transformed before.
+
+        Arguments:
+        ---------
+        cache_name: str
+            The name the transform's results are cached under.
+        transform: Callable
+            The function applied to the value.
+        value: Hashable
+            The value to be transformed.
+
+        Returns:
+        -------
+        Any: the result of the transform.
+        '''
+        cached_results = cls._get_cached_transform_results(cache_name, [value])
+        if value in cached_results:
+            return cached_results[value]
+        result = transform(value)
+        cls._cache_transform_results(cache_name, {value: result})
+        return result
+
+    @classmethod
+    def _apply_to_unique_values(cls,
+                                column: pd.Series,
+                                transform: Callable[[Any], Any],
+                                cache_name: str = None,
+                                max_workers: int = None) -> pd.Series:
+        '''
+        Protected; method used in place of Series.apply for expensive per-element
+        functions over columns with repeated values: the column is factorized, the
+        transform is applied to each distinct value only once, and the results are
+        mapped back to the rows by their codes. Missing values are left missing.
+
+        Arguments:
+        ---------
+        column: pd.Series
+            The column to be transformed.
+        transform: Callable
+            The function applied to each distinct value. Must be picklable (e.g. a
+            module-level function or staticmethod, not a lambda) if max_workers is set.
+        cache_name: str
+            Default=None. If given, results are reused from, and added to, the
+            bounded _transform_cache shared across cleaning runs under this name.
+        max_workers: int
+            Default=None. If given, the distinct values not found in the cache are
+            transformed in a pool of this many worker processes.
+
+        Returns:
+        -------
+        pd.Series: the transformed column, with the index of the original column.
+        '''
+        codes, unique_values = pd.factorize(column, use_na_sentinel=True)
+        unique_values = list(unique_values)
+
+        results = cls._get_cached_transform_results(cache_name, unique_values) if cache_name is not None else {}
+        values_to_transform = [value for value in unique_values if value not in results]
+        if max_workers is not None and len(values_to_transform) > 1:
+            # spawned rather than forked, as cleaning runs in pipeline worker threads while other
+            # threads hold pooled database connections and locks, which a fork would copy
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                chunksize = max(1, len(values_to_transform) // (max_workers * 4))
+                transformed_values = list(executor.map(transform, values_to_transform, chunksize=chunksize))
+        else:
+            transformed_values = [transform(value) for value in values_to_transform]
+        new_results = dict(zip(values_to_transform, transformed_values))
+        if cache_name is not None:
+            cls._cache_transform_results(cache_name, new_results)
+        results.update(new_results)
+
+        # one extra slot at the end for the NaN sentinel code (-1)
+        unique_results = np.empty(len(unique_values) + 1, dtype=object)
+        unique_results[:-1] = [results[value] for value in unique_values]
+        unique_results[-1] = np.nan
+        return pd.Series(unique_results[codes], index=column.index, name=column.name)
+
+    @staticmethod
+    def _parse_datetime_or_none(value: str) -> datetime | None:
+        '''
+        Protected; method that parses a date string with dateutil, returning None
+        if it can't be parsed, so that its result can be memoized.
+
+        Arguments:
+        ---------
+        value: str
+            The date string.
+
+        Returns:
+        -------
+        datetime | None: the parsed datetime, or None.
+        '''
+        try:
+            return parse(value)
+        except (ValueError, OverflowError):
+            return None
+
+    @classmethod
+    def _parse_datetime_strings(cls, column: pd.Series) -> tuple[pd.Series, dict[str, int]]:
+        '''
+        Protected; method that parses the date strings of a column, parsing each
+        distinct value only once: the distinct values are first parsed, vectorized,
+        with each of the _learned_datetime_formats in turn, and only the values
+        matching none of them are parsed one by one with dateutil. The format of
+        each of those values is guessed, and learned if it parses the value the same
+        way as dateutil, so that later values of the same format are parsed vectorized.
+
+        Arguments:
+        ---------
+        column: pd.Series
+            The column of date strings.
+
+        Returns:
+        -------
+        tuple[pd.Series, dict[str, int]]: the column of parsed datetimes (NaT where a
+        value couldn't be parsed), and a dictionary mapping each format, 'dateutil'
+        and 'unparsed' to the number of rows parsed that way.
+        '''
+        value_counts = column.dropna().astype(str).value_counts()
+        unparsed_values = value_counts.index
+        parsed_values = {}
+        rows_parsed_by = {}
+
+        def parse_with_format(datetime_format: str) -> None:
+            nonlocal unparsed_values
+            parsed = pd.to_datetime(pd.Series(unparsed_values, index=unparsed_values), format=datetime_format, errors='coerce')
+            matched = parsed.dropna()
+            if not matched.empty:
+                parsed_values.update(matched.to_dict())
+                rows_parsed_by[datetime_format] = rows_parsed_by.get(datetime_format, 0) + int(value_counts[matched.index].sum())
+                unparsed_values = unparsed_values.difference(matched.index, sort=False)
+
+        with cls._learned_datetime_formats_lock:
+            learned_datetime_formats = list(cls._learned_datetime_formats)
+        for datetime_format in learned_datetime_formats:
+            if unparsed_values.empty:
+                break
+            parse_with_format(datetime_format)
+
+        # the residue, parsed with dateutil one distinct value at a time, until a format is
+        # learned from a value, which is then used to parse the rest of the residue vectorized
+        while not unparsed_values.empty:
+            value = unparsed_values[0]
+            unparsed_values = unparsed_values[1:]
+            parsed_value = cls._memoized_transform('dateutil.parse', cls._parse_datetime_or_none, value)
+            if parsed_value is None:
+                rows_parsed_by['unparsed'] = rows_parsed_by.get('unparsed', 0) + int(value_counts[value])
+                continue
+            parsed_values[value] = pd.Timestamp(parsed_value)
+            rows_parsed_by['dateutil'] = rows_parsed_by.get('dateutil', 0) + int(value_counts[value])
+            guessed_format = guess_datetime_format(value)
+            if guessed_format is not None and guessed_format not in learned_datetime_formats:
+                try:
+                    is_same_datetime = datetime.strptime(value, guessed_format) == parsed_value
+                except ValueError:
+                    is_same_datetime = False
+                if is_same_datetime:
+                    learned_datetime_formats.append(guessed_format)
+                    with cls._learned_datetime_formats_lock:
+                        if (guessed_format not in cls._learned_datetime_formats
+                                and len(cls._learned_datetime_formats) < cls._learned_datetime_formats_max_size):
+                            cls._learned_datetime_formats.append(guessed_format)
+                    parse_with_format(guessed_format)
+
+        parsed_column = pd.to_datetime(column.astype(str).map(parsed_values).where(column.notna()))
+        return parsed_column, rows_parsed_by
+
     @staticmethod
     def _cast_columns_to_datetime64(df: pd.DataFrame,
                                     columns: list[str],
@@ -154,20 +640,25 @@ class DataCleaning(ABC):
         errors_flag: str
             The error flag to be passed to the Pandas.to_datetime() function.
         parse_first: bool
-            Default=False. If True, dateutil.parser is applied to the column before typecasting
+            Default=False. If True, the column's date strings are parsed with _parse_datetime_strings
+            before typecasting, and the number of rows parsed by each format is printed.
         '''
         for column in columns:
 
             if parse_first:
                 try:
-                    df[column] = df[column].apply(parse)
+                    df[column], rows_parsed_by = DataCleaning._parse_datetime_strings(df[column])
+                    print(f"Parsed dates of column {column}: {rows_parsed_by}")
                 except:
-                    print("error with apply parse in _cast_clumns_to_datetime64 method")
+                    print("error with parsing dates in _cast_clumns_to_datetime64 method")
             try:
                 df[column] = pd.to_datetime(df[column], format=format_flag, errors=errors_flag)
             except:
                 print("error on to_datetime cast")
 
+    # the _remove_rows_* methods each filter the DataFrame once; to remove rows matching
+    # several predicates in a single pass, add them to a RowFilterPlan instead
+
     @staticmethod
     def _remove_rows_with_nan_values_in_specified_column(df: pd.DataFrame, column: str) -> pd.DataFrame:
         '''
@@ -185,8 +676,9 @@ class DataCleaning(ABC):
         --------
         pd.DataFrame: the Pandas DataFrame being cleaned
         '''
-        mask_nan_values_in_specified_column = df[column].isna()
-        df = df[~mask_nan_values_in_specified_column]
+        row_filter_plan = RowFilterPlan(df)
+        row_filter_plan.remove_rows_with_nan_values_in_specified_column(column)
+        df, _ = row_filter_plan.materialise()
         return df
 
     @staticmethod
@@ -208,8 +700,9 @@ class DataCleaning(ABC):
         --------
         pd.DataFrame: the Pandas DataFrame being cleaned
         '''
-        mask_value_in_specified_column = df[column] == specified_value
-        df = df[~mask_value_in_specified_column]
+        row_filter_plan = RowFilterPlan(df)
+        row_filter_plan.remove_rows_with_specific_value_in_specified_column(column, specified_value)
+        df, _ = row_filter_plan.materialise()
         return df
 
     @staticmethod
@@ -230,8 +723,9 @@ class DataCleaning(ABC):
         --------
         pd.DataFrame: the Pandas DataFrame being cleaned
         '''
-        mask_numeric_digits_in_column = df[column].str.contains(pat=r'[0-9]', regex=True)
-        df = df[~mask_numeric_digits_in_column]
+        row_filter_plan = RowFilterPlan(df)
+        row_filter_plan.remove_rows_where_numeric_digits_are_found_in_string_column_values(column)
+        df, _ = row_filter_plan.materialise()
         return df
 
     @staticmethod
@@ -255,16 +749,22 @@ class DataCleaning(ABC):
         --------
         pd.DataFrame: the Pandas DataFrame being cleaned
         '''
-        mask_valid_column_values = np.isin(df[column], list_of_valid_values)
-        df = df[mask_valid_column_values]
+        row_filter_plan = RowFilterPlan(df)
+        row_filter_plan.remove_rows_where_column_values_not_in_defined_list(column, list_of_valid_values)
+        df, _ = row_filter_plan.materialise()
         return df
 
-    @staticmethod
-    def _replace_invalid_phone_numbers_with_nan(df: pd.DataFrame,
+    @classmethod
+    def _replace_invalid_phone_numbers_with_nan(cls,
+                                                df: pd.DataFrame,
                                                 column_name: str,
-                                                country_codes: list[str]) -> pd.DataFrame:
+                                                country_codes: list[str],
+                                                country_code_column: str = 'country_code') -> tuple[pd.DataFrame, dict[str, int]]:
         '''
-        Protected; method which replaces invalid phone numbers with np.NaN.
+        Protected; method which replaces invalid phone numbers with np.NaN. The rows are
+        grouped by their country code once, and each country's precompiled pattern from
+        _valid_phone_number_patterns is matched only against the phone numbers of its
+        own rows, so each phone number is checked once, against its own country's format.
 
         Arguments:
         ----------
@@ -275,27 +775,27 @@ class DataCleaning(ABC):
         country_codes: list[str]
             A list of the country codes, matching the country_code column of the DataFrame,
             representing the different phone number types to validate.
+        country_code_column: str
+            Default='country_code'. The name of the column holding each row's country code.
 
         Returns:
         --------
-        pd.DataFrame: the Pandas DataFrame being cleaned
+        tuple[pd.DataFrame, dict[str, int]]: the Pandas DataFrame being cleaned, and a
+        dictionary mapping each country code to the number of its phone numbers found invalid.
         '''
         for country_code in country_codes:
-
-            if country_code == 'US':
-                # This regex allows for a lot of flexibility in how the number may be inputted,
-                # but it counts as invalid any number where (counting from after the country code)
-                # the 1st or 4th digit is 0 or 1.
-                valid_tel_regex = r'^\s*((0{1,2}\s?1|\+1|1)[\.\s-]?)?\(?([2-9][0-9]{2})\)?[\.\s-]?[2-9][0-9]{2}[\.\s-]?\d{4}(?:[\.\s]*((?:#|x\.?|ext\.?|extension)\s*(\d+)))?'
-            elif country_code == 'GB':
-                valid_tel_regex = r'^\s*(?:(?:\(?(?:0(?:0|11)\)?[\s-]?\(?|\+)44\)?[\s-]?(?:\(?0\)?[\s-]?)?)|(?:\(?0))(?:(?:\d{5}\)?[\s-]?\d{4,5})|(?:\d{4}\)?[\s-]?(?:\d{5}|\d{3}[\s-]?\d{3}))|(?:\d{3}\)?[\s-]?\d{3}[\s-]?\d{3,4})|(?:\d{2}\)?[\s-]?\d{4}[\s-]?\d{4}))(?:[\s-]?(?:x|ext\.?|\#)\d{3,4})?\s*$'
-            elif country_code == 'DE':
-                valid_tel_regex = r'^\s*((((00|\+)?49)((\s)|\s?\(0\)\s?)?)?|\(?(0\s?)?)?\(?(((([2-9]\d)|1[2-9])\)?[-\s](\d\s?){5,9}\d?)|((([2-9]\d{2})|1[2-9]\d)\)?[-\s]?(\d\s?){4,8}\d)|((([2-9]\d{3})|1[2-9]\d{2})\)?[-\s](\d\s?){3,7}\d?))\s*$'
-            else:
+            if country_code not in cls._valid_phone_number_patterns:
                 raise ValueError("Invalid country code passed to method.")
 
-            mask_valid_tel = df[column_name].str.match(valid_tel_regex)
-
-            df.loc[~mask_valid_tel & (df[column_name] == country_code), column_name] = np.nan
-
-        return df
\ No newline at end of file
+        invalid_counts = {country_code: 0 for country_code in country_codes}
+        rows_by_country = df.groupby(country_code_column, observed=True, sort=False).groups
+        for country_code in country_codes:
+            if country_code not in rows_by_country:
+                continue
+            phone_numbers = df.loc[rows_by_country[country_code], column_name]
+            is_valid = phone_numbers.str.match(cls._valid_phone_number_patterns[country_code]).fillna(False).astype(bool)
+            invalid_index = phone_numbers.index[phone_numbers.notna() & ~is_valid]
+            df.loc[invalid_index, column_name] = np.nan
+            invalid_counts[country_code] = len(invalid_index)
+
+        return df, invalid_counts
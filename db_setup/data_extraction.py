@@ -1,13 +1,27 @@
+import io
 import json
+import multiprocessing
 import os.path
+import tempfile
+import time
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from typing import Iterator
 
 import boto3
 from botocore.exceptions import ClientError
 import pandas as pd
+from pypdf import PdfReader
+import requests
+from requests.adapters import HTTPAdapter
 import sqlalchemy
 import tabula
+from urllib3.util.retry import Retry
+
+from .extraction_cache import ExtractionCache
+from .watermarks import WatermarkStore
 
 
 class DataExtractor(ABC):
@@ -27,9 +41,27 @@ class DataExtractor(ABC):
     _extracted_data: pd.DataFrame
         Protected; initialised as None by default, but will contain a
         Pandas DataFrame of the data extracted from its source
+
+    _extraction_cache: ExtractionCache
+        Protected; class attribute. The local cache of extracted datasets shared
+        by the static extraction methods, so that unchanged sources are not
+        downloaded and parsed again on repeated runs.
+
+    _watermark_store: WatermarkStore
+        Protected; class attribute. The persistent record of the high-water
+        mark of each source table, used for incremental extraction.
+
+    _extracted_high_water_mark: int
+        Protected; initialised as None, but will contain the largest key value
+        in the data extracted from a source table in the RDS database, to be saved
+        to the _watermark_store once the data has been loaded.
     '''
+    _extraction_cache = ExtractionCache()
+    _watermark_store = WatermarkStore()
+
     def __init__(self, extracted_data: pd.DataFrame = None) -> None:
         self._extracted_data = extracted_data
+        self._extracted_high_water_mark = None
 
     @abstractmethod
     def extract_data(self):
@@ -39,26 +71,145 @@ class DataExtractor(ABC):
       '''
       pass
 
+    def save_extracted_high_water_mark(self) -> None:
+      '''
+      Method that saves the high-water mark of the last extraction from the
+      source table in the RDS database, so that the next incremental extraction
+      only reads the rows added after it. To be called once the extracted data
+      has been loaded into the local database. Does nothing for datasets not
+      extracted from the RDS database.
+      '''
+      if self._extracted_high_water_mark is not None:
+        self._watermark_store.set(self._source_db_table_name, self._extracted_high_water_mark)
+
+    def _track_high_water_mark_of_chunks(self,
+                                         extracted_data_chunks: Iterator[pd.DataFrame],
+                                         key_column: str) -> Iterator[pd.DataFrame]:
+      '''
+      Protected; generator method that passes on the chunks of a table streamed from
+      the RDS database, raising the _extracted_high_water_mark attribute to the largest
+      key value of each chunk as it is read, so that the high-water mark of a chunked
+      extraction is known once every chunk has been loaded.
+
+      Arguments:
+      ---------
+      extracted_data_chunks: Iterator[pd.DataFrame]
+          The chunks of the table, e.g. as yielded by _stream_rds_table.
+      key_column: str
+          The name of the numeric key column of the table.
+
+      Yields:
+      ------
+      pd.DataFrame: the next chunk of the extracted dataset, unchanged.
+      '''
+      self._extracted_high_water_mark = None
+      for chunk_df in extracted_data_chunks:
+        if not chunk_df.empty:
+          chunk_high_water_mark = int(chunk_df[key_column].max())
+          if self._extracted_high_water_mark is None or chunk_high_water_mark > self._extracted_high_water_mark:
+            self._extracted_high_water_mark = chunk_high_water_mark
+        yield chunk_df
+
     @staticmethod
-    def _retrieve_pdf_data(pdf_url: str) -> pd.DataFrame:
+    def _retrieve_pdf_data(pdf_url: str, max_workers: int = None, pages_per_shard: int = 8) -> pd.DataFrame:
       '''
       Protected; method that uses Tabula to read and load a table from a PDF file to
-      a Pandas DataFrame.
+      a Pandas DataFrame. The PDF is downloaded once, split into shards of consecutive
+      pages, and the shards are read in parallel across a pool of worker processes, each
+      holding its own warm JVM. The tables read from each shard are merged in page order.
+      Prints the extraction rate in pages per second on completion.
 
       Arguments:
       ---------
       pdf_url: str
           The URL for the PDF to be read.
+      max_workers: int
+          Default=None. The number of worker processes to read the PDF with. If None,
+          the number of CPUs on the machine is used.
+      pages_per_shard: int
+          Default=8. The number of consecutive pages read by a worker process at a time.
 
       Returns:
       -------
       pd.DataFrame: a Pandas DataFrame containing the extracted dataset.
       '''
 
-      df = tabula.read_pdf(pdf_url, lattice=True, pages='all', multiple_tables=False)[0]
-
+      freshness_token = ExtractionCache.get_http_freshness_token(pdf_url)
+      df = DataExtractor._extraction_cache.get(pdf_url, freshness_token)
+      if df is not None:
+        return df
+
+      with tempfile.TemporaryDirectory() as temp_dir:
+        # downloading the PDF once so that the worker processes don't each fetch it
+        pdf_filepath = os.path.join(temp_dir, 'source.pdf')
+        with requests.get(pdf_url, stream=True) as response:
+          response.raise_for_status()
+          with open(pdf_filepath, 'wb') as pdf_file:
+            for content_chunk in response.iter_content(chunk_size=1024 * 1024):
+              pdf_file.write(content_chunk)
+
+        num_of_pages = len(PdfReader(pdf_filepath).pages)
+        if num_of_pages == 0:
+          print(f"The PDF at {pdf_url} has no pages.")
+          return pd.DataFrame()
+        page_shards = [list(range(first_page, min(first_page + pages_per_shard, num_of_pages + 1)))
+                       for first_page in range(1, num_of_pages + 1, pages_per_shard)]
+
+        start_time = time.perf_counter()
+        # the workers are spawned rather than forked, as the pool is started from a pipeline worker
+        # thread while other threads hold pooled database connections and locks, which a fork would copy
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=DataExtractor._start_pdf_extraction_worker_jvm) as executor:
+          # executor.map returns the shards' tables in page order
+          page_shard_dfs = list(executor.map(DataExtractor._read_pdf_pages, repeat(pdf_filepath), page_shards))
+        elapsed_time = time.perf_counter() - start_time
+
+      print(f"Extracted {num_of_pages} PDF pages in {elapsed_time:.1f}s ({num_of_pages / elapsed_time:.1f} pages/sec).")
+
+      df = pd.concat(page_shard_dfs, ignore_index=True)
+
+      DataExtractor._extraction_cache.put(pdf_url, freshness_token, df)
       return df
 
+    @staticmethod
+    def _start_pdf_extraction_worker_jvm() -> None:
+      '''
+      Protected; initialiser of the PDF extraction worker processes, which starts
+      the JVM running Tabula once per worker, so that it stays warm for every page
+      shard the worker reads. If jpype is not installed, Tabula falls back to
+      starting a Java subprocess per read.
+      '''
+      try:
+        import jpype
+      except ImportError:
+        return
+      if not jpype.isJVMStarted():
+        jpype.addClassPath(tabula.backend.jar_path())
+        jpype.startJVM(convertStrings=False)
+
+    @staticmethod
+    def _read_pdf_pages(pdf_filepath: str, pages: list[int]) -> pd.DataFrame:
+      '''
+      Protected; method run in the PDF extraction worker processes, which uses
+      Tabula to read the table from a shard of pages of a local PDF file.
+
+      Arguments:
+      ---------
+      pdf_filepath: str
+          The filepath of the downloaded PDF.
+      pages: list[int]
+          The numbers of the pages to be read.
+
+      Returns:
+      -------
+      pd.DataFrame: a Pandas DataFrame containing the table read from the pages.
+      '''
+      page_dfs = tabula.read_pdf(pdf_filepath, lattice=True, pages=pages, multiple_tables=False)
+      if not page_dfs:
+        return pd.DataFrame()
+      return page_dfs[0]
+
     @staticmethod
     def _extract_data_from_json_url(json_url) -> pd.DataFrame:
       '''
@@ -74,8 +225,14 @@ class DataExtractor(ABC):
       -------
       pd.DataFrame: a Pandas DataFrame containing the extracted dataset.
       '''
+      freshness_token = ExtractionCache.get_http_freshness_token(json_url)
+      df = DataExtractor._extraction_cache.get(json_url, freshness_token)
+      if df is not None:
+        return df
+
       df = pd.read_json(json_url)
 
+      DataExtractor._extraction_cache.put(json_url, freshness_token, df)
       return df
 
     @staticmethod
@@ -87,80 +244,349 @@ class DataExtractor(ABC):
       Arguments:
       ---------
       rds_db_connector_instance: RDSDatabaseConnector.class.object
-          An instance of the RDSDatabaseConnector class, used to
-          initialise an engine to connect to the AWS RDS database.
+          An instance of the RDSDatabaseConnector class, whose shared
+          engine is used to connect to the AWS RDS database.
+
+      rds_table_name: str
+          The name of the table in the AWS RDS database to be extracted.
+
+      Returns:
+      -------
+      pd.DataFrame: a Pandas DataFrame containing the extracted dataset.
+      '''
+      engine = rds_db_connector_instance.engine
+
+      source_uri = f"{engine.url.render_as_string(hide_password=True)}/{rds_table_name}"
+      freshness_token = DataExtractor._get_rds_table_freshness_token(engine, rds_table_name)
+      df = DataExtractor._extraction_cache.get(source_uri, freshness_token)
+
+      if df is None:
+        df = pd.read_sql_table(rds_table_name, engine)
+        DataExtractor._extraction_cache.put(source_uri, freshness_token, df)
+
+      return df
+
+    @staticmethod
+    def _read_rds_table_partitioned(rds_db_connector_instance,
+                                    rds_table_name: str,
+                                    partition_key_column: str,
+                                    num_of_partitions: int) -> pd.DataFrame:
+      '''
+      Protected; method that reads and loads a table from the AWS RDS database
+      to a Pandas DataFrame by splitting the table into ranges of a numeric key
+      column, reading the ranges concurrently over separate connections from the
+      engine's connection pool, and reassembling them in key order. Rows whose key
+      is NULL fall outside every range, so are read as a final partition of their own.
+
+      Arguments:
+      ---------
+      rds_db_connector_instance: RDSDatabaseConnector.class.object
+          An instance of the RDSDatabaseConnector class, whose shared
+          engine is used to connect to the AWS RDS database.
 
       rds_table_name: str
           The name of the table in the AWS RDS database to be extracted.
 
+      partition_key_column: str
+          The name of the numeric column the table is partitioned on.
+
+      num_of_partitions: int
+          The number of key ranges the table is split into, and so the number
+          of connections it is read over concurrently.
+
       Returns:
       -------
       pd.DataFrame: a Pandas DataFrame containing the extracted dataset.
       '''
-      engine = rds_db_connector_instance._init_db_engine()
-      engine.connect()
-      df = pd.read_sql_table(rds_table_name, engine)
-      engine.dispose()
+      engine = rds_db_connector_instance.engine
+
+      source_uri = f"{engine.url.render_as_string(hide_password=True)}/{rds_table_name}"
+      freshness_token = DataExtractor._get_rds_table_freshness_token(engine, rds_table_name)
+      df = DataExtractor._extraction_cache.get(source_uri, freshness_token)
+      if df is not None:
+        return df
+
+      with engine.connect() as conn:
+        min_key, max_key = conn.execute(sqlalchemy.text(f'SELECT MIN("{partition_key_column}"), MAX("{partition_key_column}") \
+                                                         FROM "{rds_table_name}";')).one()
+
+      # an empty table has no key range to split
+      if min_key is None:
+        df = pd.read_sql_table(rds_table_name, engine)
+      else:
+        range_size = -(-(max_key - min_key + 1) // num_of_partitions) # ceiling division
+        key_ranges = [(lower_bound, min(lower_bound + range_size, max_key + 1))
+                      for lower_bound in range(min_key, max_key + 1, range_size)]
+
+        # None stands for the partition of the rows with a NULL key, read after the key ranges
+        key_ranges.append(None)
+
+        query = sqlalchemy.text(f'SELECT * FROM "{rds_table_name}" \
+                                  WHERE "{partition_key_column}" >= :lower_bound AND "{partition_key_column}" < :upper_bound \
+                                  ORDER BY "{partition_key_column}";')
+        null_key_query = sqlalchemy.text(f'SELECT * FROM "{rds_table_name}" WHERE "{partition_key_column}" IS NULL;')
+
+        def read_key_range(key_range: tuple[int, int] | None) -> pd.DataFrame:
+          with engine.connect() as conn:
+            if key_range is None:
+              return pd.read_sql_query(null_key_query, conn)
+            return pd.read_sql_query(query, conn, params={'lower_bound': key_range[0], 'upper_bound': key_range[1]})
+
+        with ThreadPoolExecutor(max_workers=num_of_partitions) as executor:
+          # executor.map returns the key ranges' DataFrames in key order, followed by the NULL key rows
+          key_range_dfs = list(executor.map(read_key_range, key_ranges))
+        # an empty NULL key partition is left out, as its columns have no dtype and would upcast the others to object
+        if key_range_dfs[-1].empty:
+          key_range_dfs.pop()
+
+        df = pd.concat(key_range_dfs, ignore_index=True)
+
+      DataExtractor._extraction_cache.put(source_uri, freshness_token, df)
       return df
 
     @staticmethod
-    def _extract_from_s3(s3_uri: str) -> pd.DataFrame:
+    def _read_rds_table_beyond_watermark(rds_db_connector_instance,
+                                         rds_table_name: str,
+                                         key_column: str,
+                                         high_water_mark: int) -> pd.DataFrame:
+      '''
+      Protected; method that reads and loads to a Pandas DataFrame only the rows
+      of a table in the AWS RDS database whose key is greater than a high-water mark.
+
+      Arguments:
+      ---------
+      rds_db_connector_instance: RDSDatabaseConnector.class.object
+          An instance of the RDSDatabaseConnector class, whose shared
+          engine is used to connect to the AWS RDS database.
+
+      rds_table_name: str
+          The name of the table in the AWS RDS database to be extracted.
+
+      key_column: str
+          The name of the numeric key column the high-water mark applies to.
+
+      high_water_mark: int
+          The largest key value already extracted from the table.
+
+      Returns:
+      -------
+      pd.DataFrame: a Pandas DataFrame containing the rows added beyond the high-water mark.
+      '''
+      engine = rds_db_connector_instance.engine
+      query = sqlalchemy.text(f'SELECT * FROM "{rds_table_name}" WHERE "{key_column}" > :high_water_mark \
+                                ORDER BY "{key_column}";')
+      with engine.connect() as conn:
+        df = pd.read_sql_query(query, conn, params={'high_water_mark': high_water_mark})
+      return df
+
+    @staticmethod
+    def _get_rds_table_freshness_token(engine: sqlalchemy.engine.Engine, rds_table_name: str) -> str | None:
+      '''
+      Protected; method that returns a freshness token for a table in the
+      AWS RDS database, used as part of its key in the extraction cache.
+
+      Arguments:
+      ---------
+      engine: sqlalchemy.engine.Engine
+          A SQLAlchemy engine connected to the AWS RDS database.
+
+      rds_table_name: str
+          The name of the table in the AWS RDS database.
+
+      Returns:
+      -------
+      str | None: a token containing the table's row count, or None if it could not be retrieved.
+      '''
+      try:
+        with engine.connect() as conn:
+          row_count = conn.execute(sqlalchemy.text(f'SELECT COUNT(*) FROM "{rds_table_name}";')).scalar()
+      except sqlalchemy.exc.SQLAlchemyError:
+        return None
+      return f"rows={row_count}"
+
+    @staticmethod
+    def _stream_rds_table(rds_db_connector_instance,
+                          rds_table_name: str,
+                          chunksize: int) -> Iterator[pd.DataFrame]:
+      '''
+      Protected; generator method that reads a table from the AWS RDS database
+      through a server-side cursor, yielding it as a series of Pandas DataFrames
+      of at most `chunksize` rows, so that only one chunk is held in memory at a time.
+
+      Arguments:
+      ---------
+      rds_db_connector_instance: RDSDatabaseConnector.class.object
+          An instance of the RDSDatabaseConnector class, whose shared
+          engine is used to connect to the AWS RDS database.
+
+      rds_table_name: str
+          The name of the table in the AWS RDS database to be extracted.
+
+      chunksize: int
+          The maximum number of rows in each DataFrame yielded.
+
+      Yields:
+      ------
+      pd.DataFrame: a Pandas DataFrame containing the next chunk of the extracted dataset.
+      '''
+      engine = rds_db_connector_instance.engine
+      # stream_results makes psycopg2 use a named (server-side) cursor, so rows are
+      # fetched from the server in batches of max_row_buffer rather than all at once
+      with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        for chunk_df in pd.read_sql_table(rds_table_name, conn, chunksize=chunksize):
+          yield chunk_df
+
+    @staticmethod
+    def _extract_from_s3(s3_uri: str,
+                         endpoint_url: str = None,
+                         range_request_size: int = 8 * 1024 * 1024,
+                         max_concurrent_range_requests: int = 8) -> pd.DataFrame:
       '''
       Protected; method that reads and loads a csv file from an AWS S3 bucket
-      to a Pandas DataFrame.
+      to a Pandas DataFrame, parsing the object body directly without saving a
+      local copy. Objects larger than range_request_size are fetched with parallel
+      ranged GET requests.
 
       Arguments:
       ---------
       s3_uri: str
         The URI of the AWS S3 object.
+      endpoint_url: str
+        Default=None. The URL of the S3 endpoint to connect to, e.g. a local S3
+        stand-in for testing. If None, the AWS S3 endpoint is used.
+      range_request_size: int
+        Default=8MiB. The object size above which the object is fetched in ranged
+        GET requests, and the number of bytes fetched by each of them.
+      max_concurrent_range_requests: int
+        Default=8. The maximum number of ranged GET requests in flight at once.
 
       Returns:
       -------
       pd.DataFrame: a Pandas DataFrame containing the extracted dataset.
       '''
-      s3_path_parts = s3_uri.split('://')[1].split('/')
+      s3_path_parts = s3_uri.split('://')[1].split('/', 1)
       bucket_name = s3_path_parts[0]
       object_name = s3_path_parts[1]
 
-      file_name = object_name
+      # boto3 clients are thread-safe, so one client is shared by the ranged requests
+      s3 = boto3.client('s3', endpoint_url=endpoint_url)
 
-      # if object has already been downloaded, give option of using file already in repo instead of downloading again
-      if os.path.isfile(file_name):
+      try:
 
-        user_input = input(f'File with name {file_name} already exists in repo.\
-                        Enter 0 to extract the data from this local file. Enter 1 to delete the local file of this name\
-                        and extract the data from the original S3 URI.')
+        object_metadata = s3.head_object(Bucket=bucket_name, Key=object_name)
+        freshness_token = f"etag={object_metadata['ETag']};last-modified={object_metadata['LastModified'].isoformat()}"
 
-        while user_input not in ['0', '1']:
-            user_input = input('That was not a valid response. Enter the digit 0 to extract the data\
-                        from the file already in the repo. Enter the digit 1 to delete the existing file\
-                        and extract the data from the S3 URI.')
+        products_df = DataExtractor._extraction_cache.get(s3_uri, freshness_token)
+        if products_df is not None:
+          return products_df
 
-        if user_input == '0':
+        object_size = object_metadata['ContentLength']
 
-            products_df = pd.read_csv(file_name, index_col=[0])
-            return products_df
+        if object_size <= range_request_size:
+          # the streaming body is parsed as it is read from the response
+          object_body = s3.get_object(Bucket=bucket_name, Key=object_name)['Body']
+          products_df = pd.read_csv(object_body, index_col=[0])
+        else:
+          byte_ranges = [f"bytes={first_byte}-{min(first_byte + range_request_size, object_size) - 1}"
+                         for first_byte in range(0, object_size, range_request_size)]
 
-        elif user_input == '1':
+          def get_byte_range(byte_range: str) -> bytes:
+            return s3.get_object(Bucket=bucket_name, Key=object_name, Range=byte_range)['Body'].read()
 
-            os.remove(file_name)
+          with ThreadPoolExecutor(max_workers=max_concurrent_range_requests) as executor:
+            # executor.map returns the byte ranges in order
+            object_bytes = b''.join(executor.map(get_byte_range, byte_ranges))
 
-            try:
+          products_df = pd.read_csv(io.BytesIO(object_bytes), index_col=[0])
 
-              s3 = boto3.client('s3')
-              s3.download_file(bucket_name, object_name, file_name)
-              products_df = pd.read_csv(file_name, index_col=[0])
-              return products_df
+        DataExtractor._extraction_cache.put(s3_uri, freshness_token, products_df)
+        return products_df
 
-            except ClientError as e:
+      except ClientError as e:
 
-              if e.response['Error']['Code'] == 'NoSuchBucket':
-                print('The specified bucket does not exist.')
-              elif e.response['Error']['Code'] == 'NoSuchKey':
-                print('The specified key does not exist.')
-              else:
-                print(f"{e.response['Error']['Code']}\n{e.response['Error']['Message']}")
+        if e.response['Error']['Code'] == 'NoSuchBucket':
+          print('The specified bucket does not exist.')
+        elif e.response['Error']['Code'] == 'NoSuchKey':
+          print('The specified key does not exist.')
+        # HEAD requests return a bare 404 for both a missing bucket and a missing key
+        elif e.response['Error']['Code'] == '404':
+          print('The specified bucket or key does not exist.')
+        else:
+          print(f"{e.response['Error']['Code']}\n{e.response['Error']['Message']}")
+
+    @staticmethod
+    def _retrieve_json_from_api_endpoints(endpoints: list[str],
+                                          header_dict: dict,
+                                          max_concurrent_requests: int,
+                                          max_request_retries: int) -> list[dict]:
+      '''
+      Protected; method that sends GET requests to a list of API endpoints
+      concurrently, with at most max_concurrent_requests in flight at once, over
+      a single session that reuses keep-alive connections. Transient failures
+      (connection errors and 429/5xx responses) are retried with exponential
+      backoff. Prints a summary of the per-request latencies on completion. Raises a
+      RuntimeError if any request still failed after its retries, as a partial set of
+      responses would silently drop records from the dataset.
 
+      Arguments:
+      ---------
+      endpoints: list[str]
+          The URLs of the API endpoints to be requested.
+      header_dict: dict
+          Header dictionary containing the API authentication key.
+      max_concurrent_requests: int
+          The maximum number of requests in flight at once.
+      max_request_retries: int
+          The maximum number of times a request is retried after a transient failure.
+
+      Returns:
+      -------
+      list[dict]: the JSON body of each response, in the same order as the endpoints list.
+      '''
+      retry_strategy = Retry(total=max_request_retries,
+                             backoff_factor=0.5,
+                             status_forcelist=[429, 500, 502, 503, 504],
+                             allowed_methods=['GET'])
+      adapter = HTTPAdapter(pool_connections=1,
+                            pool_maxsize=max_concurrent_requests,
+                            max_retries=retry_strategy)
+
+      def fetch(session: requests.Session, endpoint: str) -> tuple[dict | None, float]:
+        start_time = time.perf_counter()
+        try:
+          response = session.get(endpoint, headers=header_dict)
+        except requests.exceptions.RequestException as e:
+          print(f"Request to {endpoint} failed: {e}")
+          return None, time.perf_counter() - start_time
+        latency = time.perf_counter() - start_time
+        if response.status_code == 200:
+          return response.json(), latency
+        else:
+          print(f"HTTPS response code for {endpoint}: ", response.status_code)
+          return None, latency
+
+      with requests.Session() as session:
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        with ThreadPoolExecutor(max_workers=max_concurrent_requests) as executor:
+          # executor.map returns the results in the order of the endpoints
+          results = list(executor.map(lambda endpoint: fetch(session, endpoint), endpoints))
+
+      response_bodies = [body for body, _ in results if body is not None]
+
+      latencies = sorted(latency for _, latency in results)
+      if latencies:
+        print(f"{len(endpoints)} API requests completed, {len(endpoints) - len(response_bodies)} failed. "
+              f"Latency (s): min {latencies[0]:.3f}, "
+              f"median {latencies[len(latencies) // 2]:.3f}, "
+              f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.3f}, "
+              f"max {latencies[-1]:.3f}")
+
+      failed_endpoints = [endpoint for endpoint, (body, _) in zip(endpoints, results) if body is None]
+      if failed_endpoints:
+        raise RuntimeError(f"{len(failed_endpoints)} API requests failed after {max_request_retries} retries: {failed_endpoints}")
+
+      return response_bodies
 
     @staticmethod
     def _retrieve_api_authorisation(api_credentials_filepath: str) -> dict:
@@ -1,9 +1,20 @@
 from abc import ABC, abstractmethod
+import io
+import re
+import threading
+import time
+from typing import Iterable
 
+import numpy as np
+import pandas as pd
 import psycopg2
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import BIGINT, DATE, INTEGER, REAL, SMALLINT, VARCHAR
+from sqlalchemy.engine import Engine
 import yaml
 
+from .catalog_cache import CatalogCache
+
 
 class DatabaseConnector(ABC):
     '''
@@ -23,9 +34,31 @@ class DatabaseConnector(ABC):
         database.
 
     table_names_in_db: list
-        List of table names existing in the database. Set by protected
-        method on intialisation.
+        List of table names existing in the database, read from the catalog
+        snapshot each time it is accessed.
+
+    catalog: CatalogCache
+        The snapshot of the database's tables, columns and constraints, shared by
+        every connector to the same database.
+
+    _engine_registry: dict[str, sqlalchemy.engine.Engine]
+        Protected; class attribute shared by every connector in the process, mapping
+        each database URL to the one engine (and so the one connection pool) used
+        for that database.
+
+    _engine_pool_config: dict
+        Protected; class attribute holding the connection pool settings of every
+        engine in the registry, passed to sqlalchemy.create_engine.
     '''
+    _engine_registry = {}
+    _catalog_registry = {}
+    _engine_registry_lock = threading.Lock()
+    # pool_pre_ping tests each pooled connection before it is handed out, so that
+    # connections dropped by the server between pipeline stages are replaced transparently
+    _engine_pool_config = {"pool_size": 8,
+                           "max_overflow": 8,
+                           "pool_pre_ping": True,
+                           "pool_recycle": 1800}
 
     # initialise the DatabaseConnector child class with the yaml file containing the database credentials
     def __init__(self, credentials_yaml: str) -> None:
@@ -34,8 +67,7 @@ class DatabaseConnector(ABC):
        '''
        self.__credentials_yaml = credentials_yaml
        self.engine = self._init_db_engine()
-       self.table_names_in_db = []
-       self._set_db_table_names()
+       self.catalog = self._get_shared_catalog(self.engine)
 
     def _read_db_creds(self) -> dict:
       '''
@@ -52,6 +84,53 @@ class DatabaseConnector(ABC):
 
       return dict_db_creds
 
+    @classmethod
+    def _get_shared_engine(cls, db_url: str) -> Engine:
+      '''
+      Protected; method that returns the engine registered for a database URL,
+      creating and registering it with the pool settings of _engine_pool_config
+      the first time the URL is seen, so that every connector to the same
+      database shares one engine and connection pool.
+
+      Arguments:
+      ---------
+      db_url: str
+          The URL of the database, including its credentials.
+
+      Returns:
+      -------
+      sqlalchemy.engine.Engine: the shared engine for the database.
+      '''
+      with cls._engine_registry_lock:
+        engine = cls._engine_registry.get(db_url)
+        if engine is None:
+          engine = create_engine(db_url, **cls._engine_pool_config)
+          cls._engine_registry[db_url] = engine
+      return engine
+
+    @classmethod
+    def _get_shared_catalog(cls, engine: Engine) -> CatalogCache:
+      '''
+      Protected; method that returns the catalog snapshot registered for an engine,
+      creating it the first time, so that every connector to the same database
+      reads and invalidates the same snapshot.
+
+      Arguments:
+      ---------
+      engine: sqlalchemy.engine.Engine
+          A shared engine returned by _get_shared_engine.
+
+      Returns:
+      -------
+      CatalogCache: the shared catalog snapshot of the database.
+      '''
+      with cls._engine_registry_lock:
+        catalog = cls._catalog_registry.get(id(engine))
+        if catalog is None:
+          catalog = CatalogCache(engine)
+          cls._catalog_registry[id(engine)] = catalog
+      return catalog
+
     # this method will be defined in two different ways in the RDSDatabaseConnector
     # and LocalDatabaseConnector classes
     @abstractmethod
@@ -62,14 +141,14 @@ class DatabaseConnector(ABC):
        '''
        pass
 
-    def _set_db_table_names(self) -> None:
+    # read from the catalog on each access, so that it is only reloaded once DDL has marked it stale
+    @property
+    def table_names_in_db(self) -> list:
       '''
-      Protected, this method sets the table_names_in_db attribute of the class,
-      which is a list of tables already in the database being connected to.
+      The list of tables in the database being connected to, read from the
+      shared catalog snapshot.
       '''
-      inspector = inspect(self.engine)
-      table_names = inspector.get_table_names()
-      self.table_names_in_db = table_names
+      return self.catalog.get_table_names()
 
     def list_db_table_names(self) -> list:
       '''
@@ -103,8 +182,8 @@ class RDSDatabaseConnector(DatabaseConnector):
     # initialises and returns a sqlalchemy database engine
     def _init_db_engine(self):
       '''
-      Protected; method that initialises and returns a SQLAlchemy engine
-      to be stored as an attribute of the class.
+      Protected; method that returns the shared SQLAlchemy engine for the database
+      in the credentials, to be stored as an attribute of the class.
 
       Returns:
       -------
@@ -122,7 +201,7 @@ class RDSDatabaseConnector(DatabaseConnector):
         'PORT': dict_db_creds['RDS_PORT']
       }
 
-      engine = create_engine("postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}".format(**conf))
+      engine = self._get_shared_engine("postgresql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}".format(**conf))
 
       return engine
 
@@ -133,7 +212,19 @@ class LocalDatabaseConnector(DatabaseConnector):
     A child class extending DatabaseConnector, providing connection
     to the local postgreSQL database specified in the credentials
     saved at "db_setup/.credentials/local_db_creds.yaml".
+
+    Attributes:
+    ----------
+    _table_versions_table_name: str
+        Protected; class attribute holding the name of the table recording the version
+        of each table's data, bumped whenever the data of the table is loaded or changed
+        by the pipeline, so that results computed from a table can be cached until it changes.
+    _table_versions_lock: threading.Lock
+        Protected; class attribute holding the lock held while the table versions table
+        is created, as the connectors are used from the pipeline's worker threads.
     '''
+    _table_versions_table_name = 'table_versions'
+    _table_versions_lock = threading.Lock()
     # instance of class initialised with the filepath to the credentials
     # for the local postgresql database, saved as a yaml file
     def __init__(self):
@@ -145,8 +236,8 @@ class LocalDatabaseConnector(DatabaseConnector):
     # method to connect to local pgadmin database
     def _init_db_engine(self):
       '''
-      Protected; method that initialises and returns a SQLAlchemy engine
-      to be stored as an attribute of the class.
+      Protected; method that returns the shared SQLAlchemy engine for the database
+      in the credentials, to be stored as an attribute of the class.
 
       Returns:
       -------
@@ -163,26 +254,156 @@ class LocalDatabaseConnector(DatabaseConnector):
       DATABASE = dict_db_creds['DATABASE']
       PORT = dict_db_creds['PORT']
 
-      engine = create_engine(f"{DATABASE_TYPE}+{DBAPI}://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}")
+      engine = self._get_shared_engine(f"{DATABASE_TYPE}+{DBAPI}://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}")
 
       return engine
 
     def update_db(self, query_text: str) -> None:
         '''
         Method that executes a SQL query on the local PostgreSQL database;
-        updates the table_names_in_db attribute of the class after execution
-        of the query in case of created or deleted tables.
+        marks the tables the query changes as stale in the catalog snapshot if it
+        is DDL, so that they are reloaded the next time the catalog is read (e.g.
+        through the table_names_in_db attribute).
 
         Arguments:
         ----------
         query_text: str
             The SQL query to be performed provided as a string.
         '''
-        engine = self._init_db_engine()
-        with engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
+        with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
           conn.execute(text(query_text))
-        # in case of creating or deleting tables - updating table_names property of object using method
-        self._set_db_table_names()
+        self.catalog.invalidate_for_statement(query_text)
+
+    # method that creates the table versions table if it doesn't exist yet
+    def _create_table_versions_table(self) -> None:
+        '''
+        Protected; method that creates the table recording the version of each table's
+        data, if it isn't in the database yet. Called before a transaction bumps a version,
+        so that the transaction doesn't race other connectors to create the table.
+        '''
+        with LocalDatabaseConnector._table_versions_lock:
+            if self._table_versions_table_name not in self.catalog.get_table_names():
+                self.update_db(f'CREATE TABLE IF NOT EXISTS "{self._table_versions_table_name}" ('
+                               'table_name TEXT PRIMARY KEY, '
+                               'version BIGINT NOT NULL, '
+                               'updated_at TIMESTAMPTZ NOT NULL);')
+
+    # method that records that the data of tables has changed
+    def _bump_table_versions(self, table_names: list[str], conn=None) -> None:
+        '''
+        Protected; method that increments the version of each of the tables, recording
+        that their data has changed. The versions table must already exist (see
+        _create_table_versions_table) if a connection is given.
+
+        Arguments:
+        ---------
+        table_names: list[str]
+            The names of the tables whose data has changed.
+        conn: sqlalchemy.engine.Connection
+            Default=None. The connection of the transaction that changed the data, so that
+            the versions are bumped if and only if it commits. If None, the versions are
+            bumped in a transaction of their own, once the data has changed.
+        '''
+        query = text(f'INSERT INTO "{self._table_versions_table_name}" AS versions (table_name, version, updated_at) '
+                     'VALUES (:table_name, 1, now()) '
+                     'ON CONFLICT (table_name) DO UPDATE SET version = versions.version + 1, updated_at = now();')
+        if conn is not None:
+            conn.execute(query, [{'table_name': table_name} for table_name in table_names])
+            return
+        self._create_table_versions_table()
+        with self.engine.begin() as conn:
+            conn.execute(query, [{'table_name': table_name} for table_name in table_names])
+
+    # method that returns the versions of tables' data
+    def get_table_versions(self, table_names: list[str], conn=None) -> dict[str, str]:
+        '''
+        Method that returns the version of the data of each of the tables, as the version
+        number followed by the time it was recorded, e.g. '3@2024-01-31T12:00:00.123456+00:00'.
+        The version numbers restart at 1 if the versions table is recreated (e.g. in a new
+        database), so the time is needed to tell the versions of a table's data apart.
+
+        Arguments:
+        ---------
+        table_names: list[str]
+            The names of the tables.
+        conn: sqlalchemy.engine.Connection
+            Default=None. The connection to read the versions on, e.g. so that they are
+            read in the same transaction as the tables themselves. If None, a new
+            connection is used.
+
+        Returns:
+        -------
+        dict[str, str]: dictionary mapping the name of each table that has a version to its
+        version. Tables loaded before versions were recorded have none.
+        '''
+        if self._table_versions_table_name not in self.catalog.get_table_names():
+            return {}
+        query = text(f'SELECT table_name, version, updated_at FROM "{self._table_versions_table_name}" '
+                     'WHERE table_name = ANY(:table_names);')
+        if conn is not None:
+            rows = conn.execute(query, {'table_names': list(table_names)}).fetchall()
+        else:
+            with self.engine.connect() as conn:
+                rows = conn.execute(query, {'table_names': list(table_names)}).fetchall()
+        return {table_name: f"{version}@{updated_at.isoformat()}" for table_name, version, updated_at in rows}
+
+
+class _CSVRowStream(io.TextIOBase):
+    '''
+    Protected; a read-only, file-like object that formats the rows of an iterable
+    as CSV only as they are read, so that rows can be streamed into PostgreSQL's
+    COPY FROM STDIN without first writing the whole table to a buffer or file.
+    None values are written as unquoted empty fields, which COPY reads as NULL;
+    every other value is quoted, so that empty strings are kept as empty strings.
+
+    Parameters:
+    ----------
+    rows: Iterable[tuple]
+        The rows to be formatted, each a tuple of the values of one row.
+    '''
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        '''
+        See help(_CSVRowStream) for accurate signature.
+        '''
+        self._rows = iter(rows)
+        self._pending_text = ''
+
+    def readable(self) -> bool:
+        return True
+
+    @staticmethod
+    def _format_row(row: tuple) -> str:
+        '''
+        Protected; method that formats a row as a line of CSV.
+
+        Arguments:
+        ---------
+        row: tuple
+            The values of the row.
+
+        Returns:
+        -------
+        str: the line of CSV, ending with a newline.
+        '''
+        fields = ('' if value is None else '"' + str(value).replace('"', '""') + '"' for value in row)
+        return ','.join(fields) + '\n'
+
+    def read(self, size: int = -1) -> str:
+        '''
+        Method that returns up to size characters of CSV, formatting only as many
+        rows as are needed to do so; returns all the remaining rows if size is negative.
+        '''
+        read_all = size is None or size < 0
+        while read_all or len(self._pending_text) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._pending_text += self._format_row(row)
+        if read_all:
+            text_read, self._pending_text = self._pending_text, ''
+        else:
+            text_read, self._pending_text = self._pending_text[:size], self._pending_text[size:]
+        return text_read
 
 
 # child class for methods relating to specific datasets/tables to be inputted into
@@ -197,12 +418,30 @@ class DatabaseTableConnector(LocalDatabaseConnector):
     ---------
     target_table_name: str
         The name of the table as it should be saved in the local database.
+    primary_key_column: str
+        Default=None. The name of the table's primary key column, if it has one.
+    varchar_columns: list[str]
+        Default=None. The names of the columns to be created as VARCHAR(?), where ?
+        is the maximum character length of their values.
 
     Attributes:
     ----------
     _target_table_name: str
         Protected; the name of the table as it should be, or is, saved in the local database.
 
+    _primary_key_column: str | None
+        Protected; the name of the table's primary key column, if it has one.
+        Set on the staging table before it is swapped in for the live table.
+
+    _varchar_columns: list[str]
+        Protected; the names of the columns to be created as VARCHAR(?), where ?
+        is the maximum character length of their values in _cleaned_data.
+
+    _infer_column_types_on_upload: bool
+        Protected; True if the column types of the table are inferred from _cleaned_data
+        when it is uploaded (see _get_dtypes_for_upload). Turned off while the data is
+        uploaded in chunks, as the types of the first chunk may not fit later ones.
+
     _cleaned_data: None
         Protected; will be replaced with a pd.DataFrame after data cleaning.
 
@@ -210,14 +449,27 @@ class DatabaseTableConnector(LocalDatabaseConnector):
         Protected; Boolean value set by _check_if_table_in_db() method. True if a table
         by the name value of _target_table_name is already in the database. False
         if not.
+
+    _staging_swap_lock: threading.Lock
+        Protected; class attribute holding the lock held while a staging table is given its
+        constraints and swapped in, so that the swaps of the pipeline's concurrent loads, which
+        each drop and re-add foreign keys of orders_table, run one at a time.
     '''
 
-    def __init__(self, target_table_name: str) -> None:
+    # the number of rows of _cleaned_data streamed into the database by each COPY statement
+    _upload_chunksize = 100000
+
+    _staging_swap_lock = threading.Lock()
+
+    def __init__(self, target_table_name: str, primary_key_column: str = None, varchar_columns: list[str] = None) -> None:
        '''
        See help(DatabaseTableConnector) for accurate signature.
        '''
        super().__init__()
        self._target_table_name = target_table_name
+       self._primary_key_column = primary_key_column
+       self._varchar_columns = list(varchar_columns or [])
+       self._infer_column_types_on_upload = True
        self._cleaned_data = None
        self._table_in_db_at_init = self._check_if_table_in_db()
 
@@ -240,16 +492,366 @@ class DatabaseTableConnector(LocalDatabaseConnector):
           print(f"A table of the name {self._target_table_name} has already been uploaded to your local postgres sales_data database.")
         return is_in_db
 
+    # pandas to_sql insertion method, loading each chunk of rows with a single COPY statement
+    # instead of batched INSERT statements
+    @staticmethod
+    def _copy_rows_into_table(table, conn, keys: list[str], data_iter: Iterable[tuple]) -> int:
+        '''
+        Protected; method passed as the method argument of pd.DataFrame.to_sql, which
+        loads each chunk of rows into the table with PostgreSQL's COPY FROM STDIN,
+        streaming the rows to the database as CSV as they are formatted. The table
+        itself is still created by to_sql, so the column types of dtypes_for_upload
+        are kept.
+
+        Arguments:
+        ---------
+        table: pandas.io.sql.SQLTable
+            The pandas representation of the table being loaded.
+        conn: sqlalchemy.engine.Connection
+            The connection to the database the table is being loaded into.
+        keys: list[str]
+            The names of the columns being loaded.
+        data_iter: Iterable[tuple]
+            The rows of the chunk being loaded.
+
+        Returns:
+        -------
+        int: the number of rows loaded.
+        '''
+        table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        column_names = ', '.join(f'"{key}"' for key in keys)
+        dbapi_conn = conn.connection
+        with dbapi_conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table_name} ({column_names}) FROM STDIN WITH (FORMAT csv)",
+                               _CSVRowStream(data_iter))
+            return cursor.rowcount
+
+    # method that infers the tightest database type of each column of _cleaned_data, so that
+    # the table is created with its final types rather than altered after the upload
+    def _infer_column_types_for_upload(self) -> dict:
+        '''
+        Protected; method that infers from the values of _cleaned_data the tightest
+        database type of its columns: VARCHAR(?) for the columns in _varchar_columns,
+        where ? is the maximum character length of their values; SMALLINT, INTEGER or
+        BIGINT for integer columns, depending on their range; REAL for float columns
+        whose values are all exactly representable in single precision; and DATE for
+        datetime columns whose values all fall at midnight.
+
+        Returns:
+        -------
+        dict: dictionary mapping the names of the columns whose type could be inferred
+        to their SQLAlchemy type.
+        '''
+        inferred_types = {}
+        for column_name, column in self._cleaned_data.items():
+            non_null_values = column.dropna()
+            if non_null_values.empty:
+                continue
+            if column_name in self._varchar_columns:
+                max_length = non_null_values.astype(str).str.len().max()
+                inferred_types[column_name] = VARCHAR(int(max(max_length, 1)))
+            elif pd.api.types.is_integer_dtype(column):
+                min_value, max_value = non_null_values.min(), non_null_values.max()
+                for integer_type, integer_dtype in [(SMALLINT, np.int16), (INTEGER, np.int32), (BIGINT, np.int64)]:
+                    if np.iinfo(integer_dtype).min <= min_value and max_value <= np.iinfo(integer_dtype).max:
+                        inferred_types[column_name] = integer_type
+                        break
+            elif pd.api.types.is_float_dtype(column):
+                values = non_null_values.to_numpy(dtype=np.float64)
+                with np.errstate(over='ignore'):
+                    if np.array_equal(values, values.astype(np.float32).astype(np.float64)):
+                        inferred_types[column_name] = REAL
+            elif pd.api.types.is_datetime64_dtype(column):
+                if (non_null_values == non_null_values.dt.normalize()).all():
+                    inferred_types[column_name] = DATE
+        return inferred_types
+
+    # method that merges the inferred column types with those specified by the dataset
+    def _get_dtypes_for_upload(self) -> dict:
+        '''
+        Protected; method that returns the column types the table is created with:
+        those specified in the dataset's dtypes_for_upload attribute, with the types
+        inferred by _infer_column_types_for_upload for the other columns, and sized
+        VARCHAR(?) types in place of the specified types of the columns in _varchar_columns.
+
+        Returns:
+        -------
+        dict: dictionary mapping column names to their SQLAlchemy type, passed to to_sql.
+        '''
+        if not self._infer_column_types_on_upload:
+            return self.dtypes_for_upload
+        dtypes = self._infer_column_types_for_upload()
+        for column_name, column_type in self.dtypes_for_upload.items():
+            if column_name not in self._varchar_columns or column_name not in dtypes:
+                dtypes[column_name] = column_type
+        return dtypes
+
+    # method that widens the VARCHAR(?) and integer columns of an existing table that are too narrow for _cleaned_data
+    def _widen_columns_to_fit_cleaned_data(self, table_name: str) -> None:
+        '''
+        Protected; method that increases the character limit of any VARCHAR(?) column of
+        an existing table that is shorter than the longest value of that column in
+        _cleaned_data, and widens any SMALLINT or INTEGER column (narrowed to the range of
+        the data it was created with, see _infer_column_types_for_upload) to the integer
+        type the range of that column in _cleaned_data needs, so that the data can be
+        appended to it. All the columns are widened in one statement; increasing a VARCHAR
+        limit doesn't rewrite the table, but widening an integer column does. Also run before
+        each chunk of a chunked upload is appended, as the table is created with the integer
+        types of the first chunk (whose columns are downcast to the range of its values).
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table to be appended to.
+        '''
+        columns = {column['column_name']: column for column in self.catalog.get_columns(table_name)}
+        integer_type_names = ['smallint', 'integer', 'bigint']
+        integer_types = [SMALLINT, INTEGER, BIGINT]
+        alter_clauses = []
+        for column_name, column_type in self._infer_column_types_for_upload().items():
+            column = columns.get(column_name)
+            if column is None:
+                continue
+            if isinstance(column_type, VARCHAR) and column['character_maximum_length'] is not None \
+                and column_type.length > column['character_maximum_length']:
+                alter_clauses.append(f'ALTER COLUMN "{column_name}" TYPE VARCHAR({column_type.length})')
+            elif column_type in integer_types and column['data_type'] in integer_type_names \
+                and integer_types.index(column_type) > integer_type_names.index(column['data_type']):
+                alter_clauses.append(f'ALTER COLUMN "{column_name}" TYPE {integer_type_names[integer_types.index(column_type)].upper()}')
+        if alter_clauses:
+            self.update_db(f'ALTER TABLE "{table_name}" {", ".join(alter_clauses)};')
+
+    # method that writes the _cleaned_data dataframe to the database with the COPY-based insertion method
+    def _write_cleaned_data_to_db(self, if_exists: str = 'fail', table_name: str = None) -> None:
+        '''
+        Protected; method that writes the Pandas dataframe stored at the attribute
+        _cleaned_data to the table in the local database, with the column types
+        specified by dtypes_for_upload, streaming it in chunks of _upload_chunksize
+        rows, each loaded with a single COPY statement. If the table doesn't exist yet,
+        it is created with the final column types returned by _get_dtypes_for_upload;
+        if it does, its VARCHAR(?) and integer columns are first widened to fit the data if needed.
+
+        Arguments:
+        ---------
+        if_exists: str
+            Default='fail'. Passed to pd.DataFrame.to_sql: 'fail', 'replace' or 'append'.
+        table_name: str
+            Default=None. The name of the table to write to, if not _target_table_name
+            (e.g. the staging table).
+        '''
+        table_name = table_name or self._target_table_name
+        table_in_db = table_name in self.table_names_in_db
+        if if_exists == 'append' and table_in_db:
+            self._widen_columns_to_fit_cleaned_data(table_name)
+        self._cleaned_data.to_sql(table_name, self.engine, if_exists=if_exists,
+                                  dtype=self._get_dtypes_for_upload(), method=self._copy_rows_into_table,
+                                  chunksize=self._upload_chunksize)
+        if not table_in_db or if_exists == 'replace':
+            self.catalog.invalidate([table_name])
+
+    # the name of the table the dataset is loaded into before being swapped in for the live table
+    @property
+    def _staging_table_name(self) -> str:
+        '''
+        Protected; the name of the staging table the dataset is loaded into before
+        it is swapped in for the live table: the target table name suffixed with "__staging".
+        '''
+        return f"{self._target_table_name}__staging"
+
+    # method that builds the constraints of the live table on the staging table, before the swap
+    def _add_constraints_to_staging_table(self) -> None:
+        '''
+        Protected; method that builds on the staging table the constraints it needs
+        once it replaces the live table, so that they don't need rebuilding on the
+        live table after the swap: the primary key (if _primary_key_column is set),
+        and any NOT NULL and foreign key constraints of the columns of the current
+        live table, if there is one.
+        '''
+        staging_table_name = self._staging_table_name
+        if self._primary_key_column is not None:
+            self.update_db(f'ALTER TABLE "{staging_table_name}" ALTER COLUMN "{self._primary_key_column}" SET NOT NULL;')
+            self.update_db(f'ALTER TABLE "{staging_table_name}" ADD PRIMARY KEY ("{self._primary_key_column}");')
+
+        if self._target_table_name not in self.table_names_in_db:
+            return
+        nullable_staging_columns = {column['column_name'] for column in self.catalog.get_columns(staging_table_name)
+                                    if column['is_nullable'] == 'YES'}
+        not_null_columns = [column['column_name'] for column in self.catalog.get_columns(self._target_table_name)
+                            if column['is_nullable'] == 'NO' and column['column_name'] in nullable_staging_columns]
+        foreign_keys = [(constraint['constraint_name'], constraint['definition'])
+                        for constraint in self.catalog.get_constraints(self._target_table_name, 'FOREIGN KEY')]
+        if not_null_columns:
+            set_not_null_clauses = ', '.join(f'ALTER COLUMN "{column_name}" SET NOT NULL' for column_name in not_null_columns)
+            self.update_db(f'ALTER TABLE "{staging_table_name}" {set_not_null_clauses};')
+        for constraint_name, constraint_definition in foreign_keys:
+            try:
+                self.update_db(f'ALTER TABLE "{staging_table_name}" ADD CONSTRAINT "{constraint_name}" {constraint_definition};')
+            except Exception:
+                print(f"Foreign key {constraint_name} of {self._target_table_name} could not be added to the new table; it will be missing after the swap.")
+
+    # method that builds the indexes of the live table (other than its primary key) on the staging table
+    def _add_live_indexes_to_staging_table(self) -> dict[str, str]:
+        '''
+        Protected; method that builds on the staging table the indexes of the live table
+        that don't back a constraint (e.g. the indexes built by IndexPlanner), so that they
+        are carried across the swap rather than lost with the live table. Indexes that
+        can't be built on the new table (e.g. on a column it no longer has) are skipped.
+
+        Returns:
+        -------
+        dict[str, str]: dictionary mapping the name of each index built on the staging
+        table to the name of the live table's index it is renamed to after the swap.
+        '''
+        live_indexes_query = """
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index AS i
+            JOIN pg_class AS c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(quote_ident(:table_name)) AND i.indisvalid
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint AS con WHERE con.conindid = i.indexrelid);"""
+        with self.engine.connect() as conn:
+            live_indexes = conn.execute(text(live_indexes_query), {'table_name': self._target_table_name}).fetchall()
+
+        staging_index_renames = {}
+        for position, (index_name, index_definition) in enumerate(live_indexes):
+            # e.g. CREATE INDEX orders_table_product_code_idx ON public.orders_table USING btree (product_code)
+            definition_match = re.match(r'CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ (USING .*)$', index_definition)
+            if definition_match is None:
+                continue
+            staging_index_name = f"{self._staging_table_name}_idx_{position}"
+            try:
+                self.update_db(f'CREATE {definition_match.group(1) or ""}INDEX "{staging_index_name}" '
+                               f'ON "{self._staging_table_name}" {definition_match.group(2)};')
+            except Exception:
+                print(f"Index {index_name} of {self._target_table_name} could not be built on the new table; it will be missing after the swap.")
+                continue
+            staging_index_renames[staging_index_name] = index_name
+        return staging_index_renames
+
+    # method that replaces the live table with the staging table in a single transaction
+    def _swap_in_staging_table(self, staging_index_renames: dict[str, str] = None) -> None:
+        '''
+        Protected; method that replaces the live table with the staging table in a
+        single transaction: the live table (if any) is locked, the foreign keys of other
+        tables that reference it and the views that depend on it are read from the database
+        and dropped, the live table is dropped (with RESTRICT, so that the swap fails rather
+        than silently drop anything else depending on it), the staging table and its indexes
+        are renamed to take its place, and the foreign keys and views are recreated on the
+        new table. Readers of the table see either the old table or the new one, never neither.
+        The re-added foreign keys are added NOT VALID, so that the transaction doesn't
+        wait on a scan of the referencing table, then validated after the swap.
+
+        Arguments:
+        ---------
+        staging_index_renames: dict[str, str]
+            Default=None. Dictionary mapping the names of indexes carried over to the staging
+            table to the names they take after the swap (see _add_live_indexes_to_staging_table).
+            Other indexes of the staging table are renamed by replacing the staging table's name
+            in their name with the live table's name.
+        '''
+        staging_table_name = self._staging_table_name
+        staging_index_renames = staging_index_renames or {}
+        table_params = {'table_name': self._target_table_name}
+        referencing_foreign_keys_query = """
+            SELECT con.conrelid::regclass::text, con.conname, pg_get_constraintdef(con.oid)
+            FROM pg_constraint AS con
+            WHERE con.contype = 'f' AND con.confrelid = to_regclass(quote_ident(:table_name))
+              AND con.conrelid <> con.confrelid;"""
+        # views depend on a table through the rewrite rule that defines them
+        dependent_views_query = """
+            SELECT DISTINCT v.oid::regclass::text, v.relkind, pg_get_viewdef(v.oid)
+            FROM pg_depend AS d
+            JOIN pg_rewrite AS r ON r.oid = d.objid
+            JOIN pg_class AS v ON v.oid = r.ev_class
+            WHERE d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+              AND d.refobjid = to_regclass(quote_ident(:table_name)) AND v.oid <> d.refobjid;"""
+        staging_indexes_query = "SELECT indexname FROM pg_indexes WHERE tablename = :staging_table;"
+        self._create_table_versions_table()
+
+        with self.engine.begin() as conn:
+            referencing_foreign_keys, dependent_views = [], []
+            if conn.execute(text("SELECT to_regclass(quote_ident(:table_name)) IS NOT NULL;"), table_params).scalar():
+                # locking the live table first, so that no foreign key or view can be added to it while it is swapped
+                conn.execute(text(f'LOCK TABLE "{self._target_table_name}" IN ACCESS EXCLUSIVE MODE;'))
+                referencing_foreign_keys = conn.execute(text(referencing_foreign_keys_query), table_params).fetchall()
+                dependent_views = conn.execute(text(dependent_views_query), table_params).fetchall()
+                for view_name, view_kind, _ in dependent_views:
+                    conn.execute(text(f'DROP {"MATERIALIZED VIEW" if view_kind == "m" else "VIEW"} {view_name};'))
+                for referencing_table, constraint_name, _ in referencing_foreign_keys:
+                    conn.execute(text(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{constraint_name}";'))
+                conn.execute(text(f'DROP TABLE "{self._target_table_name}" RESTRICT;'))
+            staging_index_names = conn.execute(text(staging_indexes_query),
+                                               {'staging_table': staging_table_name}).scalars().all()
+            conn.execute(text(f'ALTER TABLE "{staging_table_name}" RENAME TO "{self._target_table_name}";'))
+            # renaming an index also renames the constraint it backs, e.g. the primary key
+            for index_name in staging_index_names:
+                live_index_name = staging_index_renames.get(index_name)
+                if live_index_name is None and staging_table_name in index_name:
+                    live_index_name = index_name.replace(staging_table_name, self._target_table_name, 1)
+                if live_index_name is not None:
+                    conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{live_index_name}";'))
+            for referencing_table, constraint_name, constraint_definition in referencing_foreign_keys:
+                constraint_definition = constraint_definition.removesuffix(' NOT VALID')
+                conn.execute(text(f'ALTER TABLE {referencing_table} ADD CONSTRAINT "{constraint_name}" {constraint_definition} NOT VALID;'))
+            for view_name, view_kind, view_definition in dependent_views:
+                conn.execute(text(f'CREATE {"MATERIALIZED VIEW" if view_kind == "m" else "VIEW"} {view_name} AS '
+                                  f'{view_definition.strip().removesuffix(";")};'))
+            self._bump_table_versions([self._target_table_name], conn)
+        # the swap dropped the live table and changed the constraints of the referencing tables, so the whole snapshot is reloaded
+        self.catalog.invalidate()
+
+        for referencing_table, constraint_name, _ in referencing_foreign_keys:
+            try:
+                self.update_db(f'ALTER TABLE {referencing_table} VALIDATE CONSTRAINT "{constraint_name}";')
+            except Exception:
+                print(f"Foreign key {constraint_name} of {referencing_table} has rows not matching the new {self._target_table_name} table; it has been left NOT VALID.")
+
+    # method that loads the _cleaned_data dataframe into the staging table and swaps it in
+    def _upload_via_staging_table(self) -> bool:
+        '''
+        Protected; method that uploads the Pandas dataframe stored at the attribute
+        _cleaned_data to the staging table, builds the table's constraints there, and
+        then swaps it in for the live table in a single transaction. The live table
+        is left unchanged if any step fails.
+
+        Returns:
+        -------
+        bool: True if the table was uploaded and swapped in, False if not.
+        '''
+        try:
+            self.update_db(f'DROP TABLE IF EXISTS "{self._staging_table_name}";')
+            self._write_cleaned_data_to_db(table_name=self._staging_table_name)
+            with DatabaseTableConnector._staging_swap_lock:
+                self._add_constraints_to_staging_table()
+                self._swap_in_staging_table(self._add_live_indexes_to_staging_table())
+            return True
+        except Exception as e:
+            print(f"An error occurred in uploading {self._target_table_name} through its staging table; the live table is unchanged: {e!r}")
+            return False
+
     # method that uploads the _cleaned_data dataframe to the database
     # the cleaned data is stored as the _cleaned_data property of the dataset instance (initialised as None)
-    def upload_to_db(self) -> None:
+    def upload_to_db(self, use_staging_table: bool = False) -> bool:
         '''
         Method that uploads the Pandas dataframe stored at the attribute
         _cleaned_data to the local database. Prints message to console when upload attempt is
         initialised and asks for user input if a table by the same name already exists so that the user
         can choose whether to override the existing table.
+
+        Arguments:
+        ---------
+        use_staging_table: bool
+            Default=False. If True, the data is loaded into a staging table, which is given the
+            table's constraints and then swapped in for any existing table in a single transaction,
+            without asking for user input and without leaving readers of the table with no table.
+
+        Returns:
+        -------
+        bool: True if the table was uploaded to the database, False if the upload
+        was cancelled or failed.
         '''
         print(f"Starting upload of {self._target_table_name} to local sales_data database.")
+        if use_staging_table:
+            return self._upload_via_staging_table()
         # if table name assigned to this dataset already in the database on initialisation
         if self._table_in_db_at_init:
             user_input = input("This table already exists. Enter Y if you wish to continue. \
@@ -259,14 +861,14 @@ class DatabaseTableConnector(LocalDatabaseConnector):
             # un upload is attempted to replace the existing dataframe
             if user_input == 'Y' and self._cleaned_data is not None:
               try:
-                self.engine.execution_options(isolation_level='AUTOCOMMIT').connect()
                 #
                 # TODO: when DROP CONSTRAINT becomes supported for PRIMARY and FOREIGN KEYS in potgresql,
                 # DROP/CHECK FOR RELEVANT PRIMARY AND FOREIGN KEYS IN EXISTING TABLES BEFORE UPLOAD
                 # (using self.return_column_in_common_with_orders_table() to get name of primary key column)
                 #
-                self._cleaned_data.to_sql(self._target_table_name, self.engine, if_exists='replace', dtype=self.dtypes_for_upload)
-                self.engine.dispose()
+                self._write_cleaned_data_to_db(if_exists='replace')
+                self._bump_table_versions([self._target_table_name])
+                return True
               except Exception:
                 print("User input Y and _cleaned_data property is not None, table by this name already exists in db, \
                       but an error occurred in uploading to the db and replacing the table.")
@@ -279,51 +881,201 @@ class DatabaseTableConnector(LocalDatabaseConnector):
               print(f"Upload to db of {self._target_table_name} cancelled.")
         else: # if _target_table_name not already in db at initialisation
             try:
-                self.engine.execution_options(isolation_level='AUTOCOMMIT').connect()
-                self._cleaned_data.to_sql(self._target_table_name, self.engine, dtype=self.dtypes_for_upload)
-                self.engine.dispose()
-                # update table_names_in_db_property after upload
-                self._set_db_table_names()
+                self._write_cleaned_data_to_db()
+                self._bump_table_versions([self._target_table_name])
+                return True
             except Exception:
                 print("A table by this name doesn't already exist, but an error occurred in uploading it to the database.")
+        return False
 
-    # method to return the maximum character length of the values in a column
-    def _get_max_char_length_in_column(self, column_name: str) -> int:
+    # method that appends the _cleaned_data dataframe to the existing table in the database,
+    # used by incremental loads
+    def append_to_db(self) -> bool:
+        '''
+        Method that appends the Pandas dataframe stored at the attribute _cleaned_data
+        to the existing table in the local database, without replacing the rows already
+        loaded. Used to load the rows extracted by an incremental extraction.
+
+        Returns:
+        -------
+        bool: True if the rows were appended to the table, False if the table doesn't
+        exist yet or the append failed.
+        '''
+        if self._target_table_name not in self.table_names_in_db:
+            print(f"Error: There is no table with the name '{self._target_table_name}' in the database to append to.")
+            return False
+        if self._cleaned_data is None or self._cleaned_data.empty:
+            print(f"There are no new rows to append to {self._target_table_name}.")
+            return True
+        try:
+            self._write_cleaned_data_to_db(if_exists='append')
+            self._bump_table_versions([self._target_table_name])
+            print(f"Appended {len(self._cleaned_data)} rows to {self._target_table_name}.")
+            return True
+        except Exception:
+            print(f"An error occurred in appending the new rows to {self._target_table_name}.")
+            return False
+
+    # method that releases the _cleaned_data dataframe once it has been uploaded
+    def release_cleaned_data(self) -> None:
+        '''
+        Method that sets the _cleaned_data attribute to None, so that the memory held
+        by the cleaned dataframe can be reclaimed once the upload has been confirmed.
+        Used in memory-lean mode, so that each dataset's data is only held in memory
+        between its extraction and its upload.
+        '''
+        self._cleaned_data = None
+
+    # method that cleans and uploads the extracted data one chunk at a time, for datasets
+    # whose extract_data method was called with a chunksize
+    def upload_extracted_chunks_to_db(self, use_staging_table: bool = False) -> bool:
+        '''
+        Method that cleans and uploads to the local database, one chunk at a time,
+        the iterator of Pandas DataFrames stored at the attribute _extracted_data
+        when the dataset's extract_data method has been called with a chunksize.
+        Each chunk is passed through the dataset's clean_extracted_data method; the
+        first chunk is uploaded with upload_to_db (so an existing table is handled in
+        the same way as a full upload), and the remaining chunks are appended to it,
+        so that only one chunk is held in memory at a time.
+
+        The column types can't be inferred from the first chunk alone, so the table is
+        created with the types of dtypes_for_upload, and the columns in _varchar_columns
+        are limited to their maximum character length once every chunk has been loaded.
+        Integer columns are widened before a chunk is appended if its values don't fit
+        (see _widen_columns_to_fit_cleaned_data).
+
+        Arguments:
+        ---------
+        use_staging_table: bool
+            Default=False. If True, every chunk is appended to the staging table, which
+            is swapped in for the live table only once all the chunks have been loaded.
+
+        Returns:
+        -------
+        bool: True if every chunk was uploaded, False if the upload was cancelled or failed.
+        '''
+        extracted_data_chunks = self._extracted_data
+        self._infer_column_types_on_upload = False
+        try:
+            if use_staging_table:
+                return self._upload_chunks_via_staging_table(extracted_data_chunks)
+            return self._upload_chunks_to_live_table(extracted_data_chunks)
+        finally:
+            self._infer_column_types_on_upload = True
+
+    # method that uploads every chunk into the staging table before swapping it in
+    def _upload_chunks_via_staging_table(self, extracted_data_chunks) -> bool:
+        '''
+        Protected; method used by upload_extracted_chunks_to_db to clean and append every
+        chunk to the staging table, then swap it in for the live table.
+
+        Arguments:
+        ---------
+        extracted_data_chunks: Iterator[pd.DataFrame]
+            The chunks of extracted data.
+
+        Returns:
+        -------
+        bool: True if every chunk was uploaded and the table swapped in, False if not.
+        '''
+        try:
+            self.update_db(f'DROP TABLE IF EXISTS "{self._staging_table_name}";')
+            for chunk_df in extracted_data_chunks:
+                self._extracted_data = chunk_df
+                with self.memory_lean_scope():
+                    self.clean_extracted_data()
+                self._write_cleaned_data_to_db(if_exists='append', table_name=self._staging_table_name)
+            self.set_varchar_type_limit_to_max_char_length_of_columns(self._varchar_columns, self._staging_table_name)
+            with DatabaseTableConnector._staging_swap_lock:
+                self._add_constraints_to_staging_table()
+                self._swap_in_staging_table(self._add_live_indexes_to_staging_table())
+            return True
+        except Exception as e:
+            print(f"An error occurred in uploading the chunks of {self._target_table_name} through its staging table; the live table is unchanged: {e!r}")
+            return False
+
+    # method that uploads the first chunk and appends every other chunk to the live table
+    def _upload_chunks_to_live_table(self, extracted_data_chunks) -> bool:
+        '''
+        Protected; method used by upload_extracted_chunks_to_db to clean every chunk,
+        upload the first one with upload_to_db and append the rest to the table.
+
+        Arguments:
+        ---------
+        extracted_data_chunks: Iterator[pd.DataFrame]
+            The chunks of extracted data.
+
+        Returns:
+        -------
+        bool: True if every chunk was uploaded, False if the upload was cancelled or failed.
+        '''
+        is_first_chunk = True
+        for chunk_df in extracted_data_chunks:
+            self._extracted_data = chunk_df
+            with self.memory_lean_scope():
+                self.clean_extracted_data()
+            if is_first_chunk:
+                is_first_chunk = False
+                # if the upload of the first chunk was cancelled or failed, stop streaming
+                if not self.upload_to_db():
+                    print(f"Chunked upload of {self._target_table_name} stopped after first chunk.")
+                    return False
+            else:
+                try:
+                    self._write_cleaned_data_to_db(if_exists='append')
+                except Exception:
+                    print(f"An error occurred in appending a chunk to {self._target_table_name}. Chunked upload stopped.")
+                    return False
+        self.set_varchar_type_limit_to_max_char_length_of_columns(self._varchar_columns)
+        self._bump_table_versions([self._target_table_name])
+        return True
+
+    # method to return the maximum character length of the values in each of a list of columns
+    def _get_max_char_lengths_of_columns(self, column_names: list[str], table_name: str) -> list[int]:
         '''
         Protected; method used internally by set_varchar_type_limit_to_max_char_length_of_columns
-        method to get establish the maximum character length of the values in a specified column.
+        method to establish the maximum character length of the values in each of the specified
+        columns, in a single scan of the table.
 
         Arguments:
         ---------
-        column_name: str
-            The name of the column to be checked.
+        column_names: list[str]
+            The names of the columns to be checked.
+        table_name: str
+            The name of the table to be checked.
 
         Returns:
         -------
-        int: The integer number representing the character length of the longest string in the column.
+        list[int]: The character lengths of the longest string in each column, in the order of column_names.
         '''
-        with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
-            query = f'SELECT MAX(LENGTH("{column_name}")) FROM "{self._target_table_name}";'
-            result = conn.execute(text(query)).fetchone() # this is returned as a tuple (e.g. (12, 0))
-        return result[0] # index to get just the numeric value
+        max_lengths = ', '.join(f'MAX(LENGTH("{column_name}"::text))' for column_name in column_names)
+        with self.engine.connect() as conn:
+            result = conn.execute(text(f'SELECT {max_lengths} FROM "{table_name}";')).fetchone()
+        return list(result)
 
     # method to cast columns to VARCHAR(?) where ? = the maximum character length of the values in the column
     # the columns are passed in as a list of strings
-    def set_varchar_type_limit_to_max_char_length_of_columns(self, column_names: list[str]) -> None:
+    def set_varchar_type_limit_to_max_char_length_of_columns(self, column_names: list[str], table_name: str = None) -> None:
         '''
         Method to typecast columns in the list provided to VARCHAR(?), where `?` represents
-        the maximum character length required.
+        the maximum character length required. The lengths are found in one scan of the
+        table, and the columns are altered in one statement, so the table is rewritten once.
+        Not needed for tables uploaded in one go, which are created with these types.
 
         Arguments:
         ---------
         column_names: list[str]
             A list of the column names in the table to be typecasted to VARCHAR(?)
+        table_name: str
+            Default=None. The name of the table, if not _target_table_name (e.g. the staging table).
         '''
-        for column_name in column_names:
-            max_length = self._get_max_char_length_in_column(column_name)
-            query = f'ALTER TABLE "{self._target_table_name}" ALTER COLUMN "{column_name}" TYPE VARCHAR({max_length});'
-            with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
-                conn.execute(text(query))
+        if not column_names:
+            return
+        table_name = table_name or self._target_table_name
+        max_lengths = self._get_max_char_lengths_of_columns(column_names, table_name)
+        alter_clauses = [f'ALTER COLUMN "{column_name}" TYPE VARCHAR({max(max_length or 1, 1)})'
+                         for column_name, max_length in zip(column_names, max_lengths)]
+        self.update_db(f'ALTER TABLE "{table_name}" {", ".join(alter_clauses)};')
 
     # method to print the data types of the columns
     def print_data_types_of_columns_in_database_table(self) -> None:
@@ -333,14 +1085,10 @@ class DatabaseTableConnector(LocalDatabaseConnector):
         _target_table_name.
         '''
         if self._check_if_table_in_db():
-            query = f"SELECT column_name, data_type, character_maximum_length, numeric_precision, numeric_precision_radix,\
-                        datetime_precision, udt_name, is_nullable FROM INFORMATION_SCHEMA.COLUMNS \
-                        WHERE TABLE_NAME = '{self._target_table_name}';"
-            with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
-                result = conn.execute(text(query))
-                print(result.keys())
-                for row in result:
-                  print(row)
+            columns = self.catalog.get_columns(self._target_table_name)
+            print(list(columns[0].keys()))
+            for column in columns:
+              print(tuple(column.values()))
         else:
             print("Error: This table does not currently exist in the local database.")
 
@@ -358,31 +1106,145 @@ class DatabaseTableConnector(LocalDatabaseConnector):
         str: the name of the column that matches the name of a column in orders_table
         '''
         if self._check_if_table_in_db():
-            query = f"SELECT column_name FROM INFORMATION_SCHEMA.COLUMNS \
-                        WHERE TABLE_NAME = '{self._target_table_name}' \
-                        AND COLUMN_NAME != 'index' \
-                    INTERSECT \
-                      SELECT column_name FROM INFORMATION_SCHEMA.COLUMNS \
-                        WHERE TABLE_NAME = 'orders_table';"
-            with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
-                result = conn.execute(text(query)).fetchone() # this should be returned as a tuple
-            column_name = result[0] # index to just get the column value
-            return column_name
+            orders_table_column_names = {column['column_name'] for column in self.catalog.get_columns('orders_table')}
+            for column in self.catalog.get_columns(self._target_table_name):
+                if column['column_name'] != 'index' and column['column_name'] in orders_table_column_names:
+                    return column['column_name']
         else:
            print(f"Error: There is no table with the name '{self._target_table_name}' in the database.")
 
+    # method to check whether a table in the database already has a constraint
+    def _table_has_constraint(self, table_name: str, constraint_type: str, constraint_name: str = None) -> bool:
+        '''
+        Protected; method that checks whether a table in the local database already has
+        a constraint of the given type (and name, if given), so that constraints that
+        were built on a staging table are not added to the live table a second time.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table to be checked.
+        constraint_type: str
+            The type of the constraint, e.g. 'PRIMARY KEY' or 'FOREIGN KEY'.
+        constraint_name: str
+            Default=None. The name of the constraint, if any constraint of the type will not do.
+
+        Returns:
+        -------
+        bool: True if the table has a matching constraint, False if not.
+        '''
+        constraint_names = [constraint['constraint_name'] for constraint in self.catalog.get_constraints(table_name, constraint_type)]
+        if constraint_name is None:
+            return len(constraint_names) > 0
+        return constraint_name in constraint_names
+
+    # method that runs a constraint-building statement and reports how long it took
+    def _run_timed_constraint_query(self, constraint_description: str, query_text: str) -> None:
+        '''
+        Protected; method that executes a statement building or validating a constraint
+        on the local database, and prints how long it took.
+
+        Arguments:
+        ---------
+        constraint_description: str
+            A description of the constraint step, printed with its duration.
+        query_text: str
+            The SQL statement to be executed.
+        '''
+        start_time = time.perf_counter()
+        self.update_db(query_text)
+        print(f"{constraint_description}: {time.perf_counter() - start_time:.2f}s")
+
+    # method to make a column NOT NULL without holding an exclusive lock during the table scan
+    def _set_column_not_null(self, table_name: str, column_name: str) -> None:
+        '''
+        Protected; method that sets a column of a table in the local database to NOT NULL.
+        Rather than letting SET NOT NULL scan the table under an ACCESS EXCLUSIVE lock, a
+        CHECK (column IS NOT NULL) constraint is added NOT VALID and then validated, which
+        only takes a SHARE UPDATE EXCLUSIVE lock, so readers aren't blocked; SET NOT NULL
+        then uses the validated constraint instead of scanning, and the constraint is dropped.
+        Does nothing if the column is already NOT NULL.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the table.
+        column_name: str
+            The name of the column.
+        '''
+        column = self.catalog.get_column(table_name, column_name)
+        if column is not None and column['is_nullable'] == 'NO':
+            return
+        check_name = f"{table_name}_{column_name}_not_null"
+        self.update_db(f'ALTER TABLE "{table_name}" DROP CONSTRAINT IF EXISTS "{check_name}";')
+        self._run_timed_constraint_query(f"{table_name}.{column_name} NOT NULL check added",
+                                         f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{check_name}" CHECK ("{column_name}" IS NOT NULL) NOT VALID;')
+        self._run_timed_constraint_query(f"{table_name}.{column_name} NOT NULL check validated",
+                                         f'ALTER TABLE "{table_name}" VALIDATE CONSTRAINT "{check_name}";')
+        self._run_timed_constraint_query(f"{table_name}.{column_name} set NOT NULL",
+                                         f'ALTER TABLE "{table_name}" ALTER COLUMN "{column_name}" SET NOT NULL;')
+        self.update_db(f'ALTER TABLE "{table_name}" DROP CONSTRAINT "{check_name}";')
+
     # method to set the primary key column of the table
     def set_primary_key_column(self) -> None:
         '''
         Method used to set the primary key column of the dimension table in the local database.
+        Does nothing if the table already has a primary key, e.g. one built on its staging table,
+        which is always the case in the pipeline (see run_dataset_etl in __main__): the key is
+        only built here for a table uploaded without a staging table (upload_to_db with
+        use_staging_table=False, or upload_extracted_chunks_to_db for the live table).
+        The column is made NOT NULL with _set_column_not_null, and the primary key's unique index
+        is built CONCURRENTLY, so that the table stays readable and writable while it is built;
+        the primary key is then added using the index, which only takes a brief lock.
         '''
-        column_name = self.return_column_in_common_with_orders_table()
+        if self._table_has_constraint(self._target_table_name, 'PRIMARY KEY'):
+            print(f"{self._target_table_name} already has a primary key.")
+            return
+        column_name = self._primary_key_column or self.return_column_in_common_with_orders_table()
         if column_name is not None:
-            query1 = f'ALTER TABLE "{self._target_table_name}" ALTER COLUMN "{column_name}" SET NOT NULL;'
-            query2 = f'ALTER TABLE "{self._target_table_name}" ADD PRIMARY KEY ("{column_name}");'
-            with self.engine.execution_options(isolation_level='AUTOCOMMIT').connect() as conn:
-                conn.execute(text(query1))
-                conn.execute(text(query2))
+            index_name = f"{self._target_table_name}_pkey"
+            self._set_column_not_null(self._target_table_name, column_name)
+            # an invalid index left by an interrupted concurrent build has to be dropped first
+            self.update_db(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}";')
+            self._run_timed_constraint_query(f"{self._target_table_name} primary key index built",
+                                             f'CREATE UNIQUE INDEX CONCURRENTLY "{index_name}" ON "{self._target_table_name}" ("{column_name}");')
+            self._run_timed_constraint_query(f"{self._target_table_name} primary key added",
+                                             f'ALTER TABLE "{self._target_table_name}" ADD CONSTRAINT "{index_name}" PRIMARY KEY USING INDEX "{index_name}";')
+
+    # method to make the column the table has in common with orders_table
+    # a foreign key in orders_table, referencing this table's primary key
+    def add_foreign_key_to_orders_table(self) -> None:
+        '''
+        Method used to add a foreign key constraint to the column of orders_table
+        that matches the primary key column of the dimension table in the local
+        database, completing the star-based schema. Does nothing if orders_table already
+        has the foreign key, e.g. one re-added when either table was swapped in from its staging table.
+        The foreign key is added NOT VALID, so that it applies to new rows without a scan of
+        orders_table under a heavy lock; the existing rows are checked by
+        validate_foreign_key_in_orders_table.
+        '''
+        primary_key_column = self._primary_key_column or self.return_column_in_common_with_orders_table()
+        if primary_key_column is not None:
+            if self._table_has_constraint('orders_table', 'FOREIGN KEY', f'fk_{primary_key_column}'):
+                print(f"orders_table already has the foreign key fk_{primary_key_column}.")
+                return
+            self._set_column_not_null('orders_table', primary_key_column)
+            query = f'ALTER TABLE orders_table ADD CONSTRAINT fk_{primary_key_column} FOREIGN KEY ("{primary_key_column}") \
+                        REFERENCES {self._target_table_name} ("{primary_key_column}") NOT VALID;'
+            self._run_timed_constraint_query(f"orders_table foreign key fk_{primary_key_column} added NOT VALID", query)
+
+    # method to check the existing rows of orders_table against the foreign key added NOT VALID
+    def validate_foreign_key_in_orders_table(self) -> None:
+        '''
+        Method used to validate the foreign key added by add_foreign_key_to_orders_table,
+        checking the rows of orders_table that existed when it was added. VALIDATE CONSTRAINT
+        only takes a SHARE UPDATE EXCLUSIVE lock on orders_table, so reads and writes of the
+        table carry on while it runs.
+        '''
+        primary_key_column = self._primary_key_column or self.return_column_in_common_with_orders_table()
+        if primary_key_column is not None:
+            self._run_timed_constraint_query(f"orders_table foreign key fk_{primary_key_column} validated",
+                                             f'ALTER TABLE orders_table VALIDATE CONSTRAINT fk_{primary_key_column};')
 
     # method to rename column of table in database
     def rename_column_in_db_table(self, original_column_name: str, target_column_name: str) -> None:
@@ -2,7 +2,7 @@ import pandas as pd
 from sqlalchemy.dialects.postgresql import DATE, VARCHAR
 
 from .config import card_data_config
-from ..data_cleaning import DataCleaning
+from ..data_cleaning import DataCleaning, RowFilterPlan
 from ..data_extraction import DataExtractor
 from ..database_utils import DatabaseTableConnector
 
@@ -20,6 +20,15 @@ class CardData(DataExtractor, DataCleaning, DatabaseTableConnector):
         Signifies how the data should be named in the new local database.
     _source_data_url: str
         Protected; extracted from card_data_config import from config module.
+    _pdf_extraction_workers: int | None
+        Protected; extracted from card_data_config import from config module;
+        the number of worker processes used to read the PDF (None uses every CPU).
+    _pdf_pages_per_shard: int
+        Protected; extracted from card_data_config import from config module;
+        the number of consecutive PDF pages read by a worker process at a time.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self):
         '''
@@ -27,8 +36,11 @@ class CardData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
           DataExtractor.__init__(self)
-          DatabaseTableConnector.__init__(self, card_data_config['target_table_name'])
+          DatabaseTableConnector.__init__(self, card_data_config['target_table_name'], card_data_config['primary_key_column'],
+                                          card_data_config['varchar_columns'])
           self._source_data_url = card_data_config['source_data_url']
+          self._pdf_extraction_workers = card_data_config['pdf_extraction_workers']
+          self._pdf_pages_per_shard = card_data_config['pdf_pages_per_shard']
         except Exception:
             print("Something went wrong trying to initialise the CardData child class")
 
@@ -40,7 +52,9 @@ class CardData(DataExtractor, DataCleaning, DatabaseTableConnector):
         source data using the _source_data_url attribute and saves the Pandas
         DataFrame to the class's _extracted_data attribute.
         '''
-        extracted_data_df = self._retrieve_pdf_data(self._source_data_url)
+        extracted_data_df = self._retrieve_pdf_data(self._source_data_url,
+                                                    self._pdf_extraction_workers,
+                                                    self._pdf_pages_per_shard)
         self._extracted_data = extracted_data_df
 
     def _clean_card_number_data(self, cd_df: pd.DataFrame) -> pd.DataFrame:
@@ -58,34 +72,46 @@ class CardData(DataExtractor, DataCleaning, DatabaseTableConnector):
         cd_df: pd.DataFrame
             The card_data dataframe after the cleaning of the card_number column.
         '''
-        # remove rows where column headings were transferred over as data values
-        cd_df = self._remove_rows_with_specific_value_in_specified_column(cd_df, 'card_number', 'card_number')
-
-        # remove NaN values
-        cd_df = self._remove_rows_with_nan_values_in_specified_column(cd_df, 'card_number')
-
-        # cast the column to a string dtype
+        # cast the column to a string dtype (NaN values are kept as NA)
         self._cast_columns_to_string(cd_df, ['card_number'])
 
         # remove all occurences of '?' in number strings
         cd_df['card_number'] = cd_df.card_number.str.replace('?', '')
 
+        row_filter_plan = RowFilterPlan(cd_df)
+
+        # remove rows where column headings were transferred over as data values
+        row_filter_plan.remove_rows_with_specific_value_in_specified_column('card_number', 'card_number')
+
+        # remove NaN values
+        row_filter_plan.remove_rows_with_nan_values_in_specified_column('card_number')
+
         # this leaves the rows that are erroneous - mixed alphanumeric strings for every column
         # dropping rows containing strings with non-numeric characters
-        cd_df = cd_df[cd_df['card_number'].str.isnumeric()]
+        row_filter_plan.remove_rows_where("non-numeric characters in card_number",
+                                          lambda df: ~df['card_number'].str.isnumeric())
+
+        cd_df, rows_removed = row_filter_plan.materialise()
+        print(f"Rows removed from the card data, by filter: {rows_removed}")
 
         return cd_df
 
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {'card_number': VARCHAR,
+                         'expiry_date': VARCHAR,
+                         'date_payment_confirmed': DATE,
+                         'card_provider': VARCHAR}
+
     # redefining the abstract method
     def clean_extracted_data(self) -> None:
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
 
-        card_data_df = self._extracted_data.copy()
+        card_data_df = self._take_extracted_data_for_cleaning()
 
         # clean up card_number column, and remove NaN values
         card_data_df = self._clean_card_number_data(card_data_df)
@@ -96,7 +122,3 @@ class CardData(DataExtractor, DataCleaning, DatabaseTableConnector):
         self._cast_columns_to_category(card_data_df, ['card_provider'])
 
         self._cleaned_data = card_data_df
-        setattr(self, 'dtypes_for_upload', {'card_number': VARCHAR,
-                                            'expiry_date': VARCHAR,
-                                            'date_payment_confirmed': DATE,
-                                            'card_provider': VARCHAR})
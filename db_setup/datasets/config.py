@@ -1,19 +1,40 @@
 card_data_config = {"target_table_name": "dim_card_details",
-                    "source_data_url": "https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf"}
+                    "primary_key_column": "card_number",
+                    "varchar_columns": ["card_number", "expiry_date", "card_provider"],
+                    "source_data_url": "https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf",
+                    "pdf_extraction_workers": None,
+                    "pdf_pages_per_shard": 8}
 
 date_events_data_config = {"target_table_name": "dim_date_times",
+                           "primary_key_column": "date_uuid",
+                           "varchar_columns": ["month", "day", "year", "time_period"],
                            "source_data_url": "https://data-handling-public.s3.eu-west-1.amazonaws.com/date_details.json"}
 
 orders_data_config = {"target_table_name": "orders_table",
-                      "source_db_table_name": "orders_table"}
+                      "varchar_columns": ["card_number", "store_code", "product_code"],
+                      "source_db_table_name": "orders_table",
+                      "source_key_column": "level_0",
+                      "source_read_partitions": 4}
 
 products_data_config = {"target_table_name": "dim_products",
-                        "source_data_s3_uri": "s3://data-handling-public/products.csv"}
+                        "primary_key_column": "product_code",
+                        "varchar_columns": ["EAN", "product_code"],
+                        "source_data_s3_uri": "s3://data-handling-public/products.csv",
+                        "s3_endpoint_url": None,
+                        "s3_range_request_size": 8 * 1024 * 1024,
+                        "s3_max_concurrent_range_requests": 8}
 
 stores_data_config = {"target_table_name": "dim_store_details",
+                      "primary_key_column": "store_code",
+                      "varchar_columns": ["store_code", "country_code"],
                       "store_details_endpoint": "https://aqj7u5id95.execute-api.eu-west-1.amazonaws.com/prod/store_details/",
                       "num_of_stores_endpoint": "https://aqj7u5id95.execute-api.eu-west-1.amazonaws.com/prod/number_stores",
-                      "api_credentials_filepath": "db_setup/.credentials/api_config.json"}
+                      "api_credentials_filepath": "db_setup/.credentials/api_config.json",
+                      "max_concurrent_requests": 16,
+                      "max_request_retries": 3}
 
 user_data_config = {"target_table_name": "dim_users",
-                    "source_db_table_name": "legacy_users"}
\ No newline at end of file
+                    "primary_key_column": "user_uuid",
+                    "varchar_columns": ["country_code"],
+                    "source_db_table_name": "legacy_users",
+                    "source_key_column": "index"}
\ No newline at end of file
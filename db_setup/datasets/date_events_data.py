@@ -1,7 +1,7 @@
 from sqlalchemy.dialects.postgresql import UUID, VARCHAR
 
 from .config import date_events_data_config
-from ..data_cleaning import DataCleaning
+from ..data_cleaning import DataCleaning, RowFilterPlan
 from ..data_extraction import DataExtractor
 from ..database_utils import DatabaseTableConnector
 
@@ -19,6 +19,9 @@ class DateEventsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         Signifies how the data should be named in the new local database.
     _source_data_url: str
         Protected; extracted from date_events_data_config import from config module.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self):
         '''
@@ -26,7 +29,8 @@ class DateEventsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
             DataExtractor.__init__(self)
-            DatabaseTableConnector.__init__(self, date_events_data_config['target_table_name'])
+            DatabaseTableConnector.__init__(self, date_events_data_config['target_table_name'], date_events_data_config['primary_key_column'],
+                                            date_events_data_config['varchar_columns'])
             self._source_data_url = date_events_data_config['source_data_url']
         except Exception:
             print("Something went wrong initialising the DateEventsData child class.")
@@ -40,16 +44,26 @@ class DateEventsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         extracted_data_df = self._extract_data_from_json_url(self._source_data_url)
         self._extracted_data = extracted_data_df
 
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {'month': VARCHAR,
+                         'day': VARCHAR,
+                         'year': VARCHAR,
+                         'time_period': VARCHAR,
+                         'date_uuid': UUID}
+
     def clean_extracted_data(self) -> None:
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
-        de_df = self._extracted_data.copy()
+        de_df = self._take_extracted_data_for_cleaning()
 
-        de_df = self._remove_rows_where_column_values_not_in_defined_list(de_df, 'time_period', ['Evening', 'Morning', 'Midday', 'Late_Hours'])
+        row_filter_plan = RowFilterPlan(de_df)
+        row_filter_plan.remove_rows_where_column_values_not_in_defined_list('time_period', ['Evening', 'Morning', 'Midday', 'Late_Hours'])
+        de_df, rows_removed = row_filter_plan.materialise()
+        print(f"Rows removed from the date events data, by filter: {rows_removed}")
 
         self._cast_columns_to_category(de_df, ['time_period'])
 
@@ -59,8 +73,3 @@ class DateEventsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         de_df['datetime'] = (de_df[['year', 'month', 'day']].agg('-'.join, axis=1) + ' ' + de_df['timestamp']).astype('datetime64[s]')
 
         self._cleaned_data = de_df
-        setattr(self, 'dtypes_for_upload', {'month': VARCHAR,
-                                            'day': VARCHAR,
-                                            'year': VARCHAR,
-                                            'time_period': VARCHAR,
-                                            'date_uuid': UUID})
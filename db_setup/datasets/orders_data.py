@@ -22,6 +22,16 @@ class OrdersData(DataExtractor, DataCleaning, DatabaseTableConnector):
         Protected; extracted from orders_data_config import from config module;
         the table name of the dataset in the AWS RDS database it is being extracted
         from.
+    _source_key_column: str
+        Protected; extracted from orders_data_config import from config module;
+        the numeric key column of the table in the AWS RDS database.
+    _source_read_partitions: int
+        Protected; extracted from orders_data_config import from config module;
+        the number of key ranges the table in the AWS RDS database is split into
+        and read concurrently.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self) -> None:
         '''
@@ -29,31 +39,83 @@ class OrdersData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
             DataExtractor.__init__(self)
-            DatabaseTableConnector.__init__(self, orders_data_config['target_table_name'])
+            DatabaseTableConnector.__init__(self, orders_data_config['target_table_name'],
+                                            varchar_columns=orders_data_config['varchar_columns'])
             self._source_db_table_name = orders_data_config['source_db_table_name']
+            self._source_key_column = orders_data_config['source_key_column']
+            self._source_read_partitions = orders_data_config['source_read_partitions']
         except Exception:
            print("Something went wrong initialising the OrdersData child class.")
 
-    def extract_data(self) -> None:
+    def extract_data(self, chunksize: int = None, incremental: bool = False) -> None:
         '''
         Method inherited from abstract base class DataExtractor. Connects to the AWS RDS
         Database by creating an instance of the RDSDatabaseConnector, and extracts the data
         from the table by the name saved on the _source_db_table_name attribute to a Pandas
-        DataFrame. Saves the DataFrame containing the extracted data to the class's
-        _extracted_data attribute.
+        DataFrame, reading _source_read_partitions ranges of its key column concurrently.
+        Saves the DataFrame containing the extracted data to the class's _extracted_data
+        attribute.
+
+        Arguments:
+        ---------
+        chunksize: int
+            Default=None. If provided, the table is streamed from the RDS database through
+            a server-side cursor, and an iterator of DataFrames of at most this many rows is
+            saved to the _extracted_data attribute instead, to be cleaned and uploaded with
+            the upload_extracted_chunks_to_db method.
+        incremental: bool
+            Default=False. If True, only the rows whose key is greater than the high-water
+            mark saved by the last load are extracted, to be appended to the existing table
+            with the append_to_db method. Raises a RuntimeError if no high-water mark has
+            been saved yet, as the whole table would then be appended on top of itself.
         '''
         conn = RDSDatabaseConnector()
-        extracted_data_df = self._read_rds_table(conn, self._source_db_table_name)
-        self._extracted_data = extracted_data_df
+        high_water_mark = self._watermark_store.get(self._source_db_table_name) if incremental else None
+        if incremental and high_water_mark is None:
+            raise RuntimeError(f"No high-water mark saved for {self._source_db_table_name}; "
+                               f"{self._target_table_name} must be loaded in full before it can be loaded incrementally.")
+
+        if high_water_mark is not None:
+            extracted_data_df = self._read_rds_table_beyond_watermark(conn,
+                                                                      self._source_db_table_name,
+                                                                      self._source_key_column,
+                                                                      high_water_mark)
+            print(f"Extracted {len(extracted_data_df)} rows added to {self._source_db_table_name} since the last load.")
+            self._extracted_data = extracted_data_df
+        elif chunksize is not None:
+            # the high-water mark is raised as each chunk is read (see _track_high_water_mark_of_chunks)
+            self._extracted_data = self._track_high_water_mark_of_chunks(
+                self._stream_rds_table(conn, self._source_db_table_name, chunksize), self._source_key_column)
+            return
+        else:
+            extracted_data_df = self._read_rds_table_partitioned(conn,
+                                                                 self._source_db_table_name,
+                                                                 self._source_key_column,
+                                                                 self._source_read_partitions)
+            self._extracted_data = extracted_data_df
+
+        # the high-water mark is carried forward when no new rows were extracted
+        if not self._extracted_data.empty:
+            self._extracted_high_water_mark = int(self._extracted_data[self._source_key_column].max())
+        else:
+            self._extracted_high_water_mark = high_water_mark
+
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {"date_uuid": UUID,
+                         "user_uuid": UUID,
+                         "card_number": VARCHAR,
+                         "store_code": VARCHAR,
+                         "product_code": VARCHAR,
+                         "product_quantity": SMALLINT}
 
     def clean_extracted_data(self) -> None:
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
-        od_df = self._extracted_data.copy()
+        od_df = self._take_extracted_data_for_cleaning()
 
         od_df.set_index('level_0', inplace=True)
 
@@ -64,12 +126,6 @@ class OrdersData(DataExtractor, DataCleaning, DatabaseTableConnector):
         self._cast_columns_to_integer(od_df, ['index', 'product_quantity'], 'raise')
 
         self._cleaned_data = od_df
-        setattr(self, 'dtypes_for_upload', {"date_uuid": UUID,
-                                            "user_uuid": UUID,
-                                            "card_number": VARCHAR,
-                                            "store_code": VARCHAR,
-                                            "product_code": VARCHAR,
-                                            "product_quality": SMALLINT})
 
     # redefining this method from the DatabaseTableConnector class - it applies to all other tables
     # in the schema other than orders_table
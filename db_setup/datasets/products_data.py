@@ -1,10 +1,11 @@
 import re
 
+import numpy as np
 import pandas as pd
-from sqlalchemy.dialects.postgresql import DATE, UUID
+from sqlalchemy.dialects.postgresql import BOOLEAN, DATE, UUID, VARCHAR
 
 from .config import products_data_config
-from ..data_cleaning import DataCleaning
+from ..data_cleaning import DataCleaning, RowFilterPlan
 from ..data_extraction import DataExtractor
 from ..database_utils import DatabaseTableConnector
 
@@ -23,6 +24,31 @@ class ProductsData(DataExtractor, DataCleaning, DatabaseTableConnector):
     _source_data_s3_uri: str
         Protected; extracted from products_data_config import from config module.
         AWS S3 URI of csv object (freely accessed with AWS subscription).
+    _s3_endpoint_url: str | None
+        Protected; extracted from products_data_config import from config module.
+        The S3 endpoint to connect to (None for AWS S3, or the URL of a local S3 stand-in).
+    _s3_range_request_size: int
+        Protected; extracted from products_data_config import from config module.
+        The object size above which the csv is fetched in parallel ranged requests,
+        and the size of each range.
+    _s3_max_concurrent_range_requests: int
+        Protected; extracted from products_data_config import from config module.
+        The maximum number of ranged requests in flight at once.
+    _weight_unit_to_kg: dict[str, float]
+        Protected; class attribute mapping each unit of the 'weight' column to
+        the number of kilograms in one of it.
+    _weight_pattern: str
+        Protected; class attribute holding the regular expression the values of the
+        'weight' column are parsed with, capturing their multiplier, number and unit.
+    _weight_class_upper_bounds: dict[str, float]
+        Protected; class attribute mapping each weight class but 'Truck_Required' to the
+        weight in kg its products weigh less than, in increasing order.
+    derived_columns: dict[str, str]
+        Class attribute mapping the 'weight_class' and 'still_available' columns to the
+        methods deriving them from the cleaned 'weight' and 'removed' columns.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self):
         '''
@@ -30,8 +56,12 @@ class ProductsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
           DataExtractor.__init__(self)
-          DatabaseTableConnector.__init__(self, products_data_config['target_table_name'])
+          DatabaseTableConnector.__init__(self, products_data_config['target_table_name'], products_data_config['primary_key_column'],
+                                          products_data_config['varchar_columns'])
           self._source_data_s3_uri = products_data_config['source_data_s3_uri']
+          self._s3_endpoint_url = products_data_config['s3_endpoint_url']
+          self._s3_range_request_size = products_data_config['s3_range_request_size']
+          self._s3_max_concurrent_range_requests = products_data_config['s3_max_concurrent_range_requests']
         except Exception:
             print("Something went wrong initialising the ProductsData child class")
 
@@ -43,14 +73,31 @@ class ProductsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         the _source_data_s3_uri attribute and saves the Pandas DataFrame to
         the class's _extracted_data attribute.
         '''
-        extracted_data_df = self._extract_from_s3(self._source_data_s3_uri)
+        extracted_data_df = self._extract_from_s3(self._source_data_s3_uri,
+                                                  self._s3_endpoint_url,
+                                                  self._s3_range_request_size,
+                                                  self._s3_max_concurrent_range_requests)
         self._extracted_data = extracted_data_df
 
-    @staticmethod
-    def _convert_product_weights_to_kg_float(pd_df: pd.DataFrame) -> pd.DataFrame:
+    # the number of kilograms in one of each weight unit found in the 'weight' column
+    # (ml are converted using a 1:1 ratio with grams)
+    _weight_unit_to_kg = {'kg': 1,
+                          'g': 0.001,
+                          'ml': 0.001,
+                          'oz': 0.02834952}
+
+    # matches weights such as '1.5kg', '100g', '16oz', '77g .' and '12 x 100g',
+    # capturing the optional multiplier, the number and the unit
+    _weight_pattern = r'^\s*(?:(?P<multiplier>\d+(?:\.\d+)?)\s*x\s*)?(?P<number>\d+(?:\.\d+)?|\.\d+)\s*(?P<unit>kg|g|ml|oz)[\s.]*$'
+
+    @classmethod
+    def _convert_product_weights_to_kg_float(cls, pd_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
         '''
         Protected; method used internally to convert the weight values
-        in the 'weight' column of the DataFrame to kilograms.
+        in the 'weight' column of the DataFrame to kilograms. The multiplier,
+        number and unit of every value are extracted in one column-wide pass,
+        and the unit converted with the _weight_unit_to_kg table. Values that
+        don't match _weight_pattern, or whose unit isn't in the table, are set to NaN.
 
         Arguments:
         ---------
@@ -59,57 +106,126 @@ class ProductsData(DataExtractor, DataCleaning, DatabaseTableConnector):
 
         Returns:
         -------
-        pd.DataFrame: Pandas DataFrame being cleaned
+        tuple[pd.DataFrame, pd.DataFrame]: Pandas DataFrame being cleaned, and a report
+        of the values that couldn't be parsed, with columns 'weight' (the original value)
+        and 'count' (the number of rows with that value).
+        '''
+        original_weights = pd_df['weight']
+        weight_parts = original_weights.astype('string').str.extract(cls._weight_pattern, flags=re.IGNORECASE)
+
+        multiplier = pd.to_numeric(weight_parts['multiplier']).astype('float64').fillna(1)
+        number = pd.to_numeric(weight_parts['number']).astype('float64')
+        kg_per_unit = weight_parts['unit'].str.lower().map(cls._weight_unit_to_kg).astype('float64')
+
+        pd_df['weight'] = (multiplier * number * kg_per_unit).round(4)
+
+        is_unparsed = pd_df['weight'].isna() & original_weights.notna()
+        unparsed_weights_report = (original_weights[is_unparsed].value_counts()
+                                   .rename_axis('weight').reset_index(name='count'))
+
+        return pd_df, unparsed_weights_report
+
+    @staticmethod
+    def _strip_pound_sign(price: str) -> str:
+        '''
+        Protected; method used internally to remove the leading '£' of a value
+        of the 'product_price' column.
+
+        Arguments:
+        ---------
+        price: str
+            The price, e.g. '£9.99'.
+
+        Returns:
+        -------
+        str: the price without the pound sign, e.g. '9.99'.
+        '''
+        return re.sub(r'^£', '', price)
+
+    # the weight in kg that the products of each weight class weigh less than;
+    # heavier products (and those whose weight is unknown) are 'Truck_Required'
+    _weight_class_upper_bounds = {'Light': 2,
+                                  'Mid_Sized': 40,
+                                  'Heavy': 140}
+
+    @classmethod
+    def _classify_product_weights(cls, pd_df: pd.DataFrame) -> pd.Categorical:
         '''
-        def helper(weight_str: str) -> float | str:
-            # first catchs the strings in the format'{num1} x {num2}g'
-            if re.fullmatch(r'\d+\s*x\s*\d+\.?\d*g', weight_str):
-                # splits the string along the 'x' into a list of two string values
-                nums = weight_str.split(' x ')
-                # remove anything that is not a numeric digit or decimal place
-                nums[1] = re.sub(r'[^\d\.]', '', nums[1])
-                return round((float(nums[0])*float(nums[1]))/1000, 4)
-            # then for values already entered as 'kg'
-            elif re.search('kg', weight_str):
-                weight_str = re.sub(r'[^\d\.]', '', weight_str)
-                return round(float(weight_str), 4)
-            # then for values entered in grams ('g') or ml (for ml, using 1:1 conversion ratio)
-            elif re.search(r'g|(ml)', weight_str):
-                weight_str = re.sub(r'[^\d\.]', '', weight_str)
-                return round((float(weight_str)/1000), 4)
-            # then for values entered in ounces ('oz')
-            elif re.search('oz', weight_str):
-                weight_str = re.sub(r'[^\d\.]', '', weight_str)
-                return round((float(weight_str)*0.02834952), 4)
-            # catching exceptions
-            else:
-                print(f"Error: The unit measurement of {weight_str} was not accounted for in convert_product_weight_to_kg_function")
-                return weight_str
-
-        pd_df['weight'] = pd_df['weight'].apply(helper)
-
-        return pd_df
+        Protected; method used internally to derive the 'weight_class' column from the
+        cleaned 'weight' column, categorising each product as 'Light', 'Mid_Sized', 'Heavy'
+        or 'Truck_Required' according to the _weight_class_upper_bounds.
+
+        Arguments:
+        ---------
+        pd_df: pd.DataFrame
+            Pandas DataFrame being cleaned
+
+        Returns:
+        -------
+        pd.Categorical: the weight class of each product.
+        '''
+        weights = pd_df['weight'].to_numpy()
+        weight_classes = list(cls._weight_class_upper_bounds) + ['Truck_Required']
+        weight_class = np.select([weights < upper_bound for upper_bound in cls._weight_class_upper_bounds.values()],
+                                 list(cls._weight_class_upper_bounds), default='Truck_Required')
+        return pd.Categorical(weight_class, categories=weight_classes)
+
+    @staticmethod
+    def _flag_products_still_available(pd_df: pd.DataFrame) -> pd.Series:
+        '''
+        Protected; method used internally to derive the boolean 'still_available' column
+        from the 'removed' column, whose values are 'Still_avaliable' (sic) or 'Removed'.
+
+        Arguments:
+        ---------
+        pd_df: pd.DataFrame
+            Pandas DataFrame being cleaned
+
+        Returns:
+        -------
+        pd.Series: True for each product still available, False otherwise.
+        '''
+        return (pd_df['removed'] == 'Still_avaliable').fillna(False).astype(bool)
+
+    # the columns derived from the cleaned columns, added in clean_extracted_data
+    # so that the table is loaded with them rather than altered after the upload
+    derived_columns = {'weight_class': '_classify_product_weights',
+                       'still_available': '_flag_products_still_available'}
+
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {'date_added': DATE,
+                         'uuid': UUID,
+                         'weight_class': VARCHAR(14),
+                         'still_available': BOOLEAN}
 
     # define method from abstract base class to clean product data
     def clean_extracted_data(self) -> None:
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
-        pd_df = self._extracted_data.copy()
+        pd_df = self._take_extracted_data_for_cleaning()
+
+        row_filter_plan = RowFilterPlan(pd_df)
 
         # remove rows with NaN values in 'weight' - these rows have no meaningful data
-        pd_df = self._remove_rows_with_nan_values_in_specified_column(pd_df, 'weight')
+        row_filter_plan.remove_rows_with_nan_values_in_specified_column('weight')
 
         # removes rows with numeric characters in the category field
         # every column in these rows are filled with meaningless alphanumeric strings
-        pd_df = self._remove_rows_where_numeric_digits_are_found_in_string_column_values(pd_df, 'category')
+        row_filter_plan.remove_rows_where_numeric_digits_are_found_in_string_column_values('category')
+
+        pd_df, rows_removed = row_filter_plan.materialise()
+        print(f"Rows removed from the products data, by filter: {rows_removed}")
 
         # convert the weight column values to a float32 type
-        # values have been rounded to 2 decimal places
-        pd_df = self._convert_product_weights_to_kg_float(pd_df)
+        # values have been rounded to 4 decimal places
+        pd_df, unparsed_weights_report = self._convert_product_weights_to_kg_float(pd_df)
+        if not unparsed_weights_report.empty:
+            print(f"Error: {unparsed_weights_report['count'].sum()} weight values could not be converted to kg and have been set to NaN:")
+            print(unparsed_weights_report.to_string(index=False))
 
         #already cast to float, but reducing float type down to maximum bits needed
         self._cast_columns_to_float(pd_df, ['weight'], 'raise')
@@ -118,34 +234,17 @@ class ProductsData(DataExtractor, DataCleaning, DatabaseTableConnector):
         self._cast_columns_to_string(pd_df, ['product_name', 'EAN', 'product_code','uuid'])
 
         # convert product_price to a float32 type
-        pd_df['product_price'] = pd_df['product_price'].apply(lambda x: re.sub(r'^£', '', x)).astype('float32')
+        pd_df['product_price'] = self._apply_to_unique_values(pd_df['product_price'], self._strip_pound_sign,
+                                                              cache_name='strip_pound_sign').astype('float32')
 
         # category type columns
-        self._cast_columns_to_category(pd_df, ['category', 'removed'])
+        self._cast_columns_to_category(pd_df, ['category'])
 
         # date_added tp datetime
         self._cast_columns_to_datetime64(pd_df, ['date_added'], '%Y-%m-%d', 'raise', parse_first=True)
 
-        self._cleaned_data = pd_df
-        setattr(self, 'dtypes_for_upload', {'date_added': DATE, 'uuid': UUID})
+        # add the 'weight_class' and 'still_available' columns, the latter replacing 'removed'
+        self._add_derived_columns(pd_df)
+        self._drop_columns(pd_df, ['removed'])
 
-    def add_weight_class_column_to_db_table(self) -> None:
-        '''
-        Method that adds a 'weight_class' column to the dim_products table
-        in the local PostgreSQL database, which categorises the values of the
-        weight_class column to 'Light', 'Mid_Sized', 'Heavy' or 'Truck_Required'.
-        '''
-        query = "ALTER TABLE dim_products\
-            ADD COLUMN weight_class VARCHAR(14);"
-
-        self.update_db(query)
-
-        query2 = "UPDATE dim_products\
-                    SET weight_class = CASE\
-                        WHEN weight < 2 THEN 'Light'\
-                        WHEN weight < 40 THEN 'Mid_Sized'\
-                        WHEN weight < 140 THEN 'Heavy'\
-                        ELSE 'Truck_Required'\
-                    END;"
-
-        self.update_db(query2)
\ No newline at end of file
+        self._cleaned_data = pd_df
@@ -5,7 +5,7 @@ from sqlalchemy.dialects.postgresql import DATE, VARCHAR
 
 from .config import stores_data_config
 from ..data_extraction import DataExtractor
-from ..data_cleaning import DataCleaning
+from ..data_cleaning import DataCleaning, RowFilterPlan
 from ..database_utils import DatabaseTableConnector
 
 
@@ -28,6 +28,15 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
     _num_of_stores_endpoint: str
         Protected; extracted from stores_data_config import from config module;
         the API endpoint which retrieves the number of stores the business has.
+    _max_concurrent_requests: int
+        Protected; extracted from stores_data_config import from config module;
+        the maximum number of store details requests in flight at once.
+    _max_request_retries: int
+        Protected; extracted from stores_data_config import from config module;
+        the maximum number of retries of a store details request after a transient failure.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self):
         '''
@@ -35,10 +44,13 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
           DataExtractor.__init__(self)
-          DatabaseTableConnector.__init__(self, stores_data_config['target_table_name'])
+          DatabaseTableConnector.__init__(self, stores_data_config['target_table_name'], stores_data_config['primary_key_column'],
+                                          stores_data_config['varchar_columns'])
           self._store_details_endpoint = stores_data_config['store_details_endpoint']
           self._num_of_stores_endpoint = stores_data_config['num_of_stores_endpoint']
           self.__api_credentials_filepath = stores_data_config['api_credentials_filepath']
+          self._max_concurrent_requests = stores_data_config['max_concurrent_requests']
+          self._max_request_retries = stores_data_config['max_request_retries']
         except Exception:
           print("Something went wrong initialising the StoresData child class")
 
@@ -67,81 +79,12 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
 
         print(response.status_code)
 
-    # method to get extract first row of store data from API and return it in a dataframe
-    def _initialise_stores_df_loading(self, header_dict: dict) -> pd.DataFrame:
-        '''
-        Protected; method that begins the loading of the stores data from the API
-        into a Pandas DataFrame.
-
-        Arguments:
-        ---------
-        header_dict: dict
-          dictionary header containing the API authentication key
-
-        Returns:
-        -------
-        pd.DataFrame: a Pandas DataFrame containing the details of the first
-        store in the dataset located at "{self._store_details_endpoint}0"
-        '''
-
-        response = requests.get(f"{self._store_details_endpoint}0", headers=header_dict)
-
-        if response.status_code == 200:
-
-            store_data = response.json()
-            df_store_data = pd.DataFrame([store_data])
-            df_store_data.set_index('index', inplace=True)
-
-            return df_store_data
-
-        else:
-            print("HTTPS response code: ", response.status_code)
-
-
-    # method to extract the remaining rows of store data and add them to the created dataframe
-    def _add_remaining_stores_as_rows_to_df(self,
-                                            df_store_data: pd.DataFrame,
-                                            num_of_stores: int,
-                                            header_dict: dict) -> pd.DataFrame:
-        '''
-        Protected; method used internally to finish loading from the API
-        the remaining store details to the initialised DataFrame
-        containing the first row value of the dataset.
-
-        Arguments:
-        ---------
-        df_store_data: pd.DataFrame
-            Pandas DataFrame containing the first row of stores data.
-        num_of_stores: int
-            The number of total stores, retrieved previously from the API endpoint
-        header_dict: dict
-            Header dictionary containing the API authentication key
-
-        Returns:
-        -------
-        pd.DataFrame: Pandas DataFrame containing the stores data
-        '''
-        for i in range(1, num_of_stores):
-
-          response = requests.get(f"{self._store_details_endpoint}{i}", headers=header_dict)
-
-          if response.status_code == 200:
-
-            store_data = response.json()
-            df_new_store_data = pd.DataFrame([store_data])
-            df_store_data = pd.concat([df_store_data, df_new_store_data], ignore_index=True)
-
-          else:
-
-            print("HTTPS response code: ", response.status_code)
-
-        return df_store_data
-
     # method to retrieve the stores data from the API endpoint
     def _retrieve_stores_data(self) -> pd.DataFrame:
         '''
         Protected; method using internally to retrive the stores data
-        from the API endpoints and load them into a Pandas DataFrame.
+        from the API endpoints and load them into a Pandas DataFrame. Raises
+        a RuntimeError if the details of any store couldn't be retrieved.
 
         Returns:
         -------
@@ -149,12 +92,17 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         header_dict = self._retrieve_api_authorisation(self.__api_credentials_filepath)
 
-        df_store_data = self._initialise_stores_df_loading(header_dict)
-
         num_of_stores = self._get_number_of_stores(header_dict)
 
         if num_of_stores is not None:
-            df_store_data = self._add_remaining_stores_as_rows_to_df(df_store_data, num_of_stores, header_dict)
+            store_details_endpoints = [f"{self._store_details_endpoint}{i}" for i in range(num_of_stores)]
+
+            # the store records are fetched concurrently, then loaded into a single DataFrame
+            store_records = self._retrieve_json_from_api_endpoints(store_details_endpoints,
+                                                                   header_dict,
+                                                                   self._max_concurrent_requests,
+                                                                   self._max_request_retries)
+            df_store_data = pd.DataFrame.from_records(store_records)
 
             return df_store_data
         else:
@@ -171,25 +119,33 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
       extracted_data_df = self._retrieve_stores_data()
       self._extracted_data = extracted_data_df
 
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {"locality": VARCHAR(255),
+                         "opening_date": DATE,
+                         "store_type": VARCHAR(255),
+                         "continent": VARCHAR(255)
+                         }
+
     # defining abstract method from DataCleaning abstract base class
     def clean_extracted_data(self) -> None:
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
-        sd_df = self._extracted_data.copy()
+        sd_df = self._take_extracted_data_for_cleaning()
 
         # index column not correctly handled in download from API
         # and 'lat' column that has no meaningful data (there is a 'latitude' column instead)
         self._drop_columns(sd_df, ['index', 'lat'])
 
         # these rows have no meaningful data
-        sd_df = self._remove_rows_with_specific_value_in_specified_column(sd_df, 'store_code', 'NULL')
-
-        # these rows have no meaningful data
-        sd_df = self._remove_rows_where_column_values_not_in_defined_list(sd_df, 'country_code', ['GB', 'DE', 'US'])
+        row_filter_plan = RowFilterPlan(sd_df)
+        row_filter_plan.remove_rows_with_specific_value_in_specified_column('store_code', 'NULL')
+        row_filter_plan.remove_rows_where_column_values_not_in_defined_list('country_code', ['GB', 'DE', 'US'])
+        sd_df, rows_removed = row_filter_plan.materialise()
+        print(f"Rows removed from the stores data, by filter: {rows_removed}")
 
         self._replace_values_with_mapping_dictionary(sd_df, 'continent', {'eeEurope': 'Europe', 'eeAmerica': 'America'})
 
@@ -203,12 +159,9 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
 
         self._cast_columns_to_integer(sd_df, ['staff_numbers'], 'raise')
 
-        # 0 is the index of the record for the Web Store
-        sd_df.at[0, 'address'] = None
-        sd_df.at[0, 'locality'] = None
-
-        # these rows have no meaningful data
-        sd_df = self._remove_rows_with_specific_value_in_specified_column(sd_df, 'store_code', 'NULL')
+        # the Web Store has no address or locality
+        web_store_mask = sd_df['store_type'] == 'Web Portal'
+        sd_df.loc[web_store_mask, ['address', 'locality']] = None
 
         self._cast_columns_to_category(sd_df, ['store_type', 'country_code', 'continent'])
 
@@ -229,8 +182,3 @@ class StoresData(DataExtractor, DataCleaning, DatabaseTableConnector):
         self._cast_columns_to_datetime64(sd_df, ['opening_date'], 'mixed', 'raise')
 
         self._cleaned_data = sd_df
-        setattr(self, 'dtypes_for_upload', {"locality": VARCHAR(255),
-                                            "opening_date": DATE,
-                                            "store_type": VARCHAR(255),
-                                            "continent": VARCHAR(255)
-                                            })
\ No newline at end of file
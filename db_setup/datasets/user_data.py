@@ -1,8 +1,7 @@
-import numpy as np
 from sqlalchemy.dialects.postgresql import DATE, UUID, VARCHAR
 
 from .config import user_data_config
-from ..data_cleaning import DataCleaning
+from ..data_cleaning import DataCleaning, RowFilterPlan
 from ..data_extraction import DataExtractor
 from ..database_utils import DatabaseTableConnector, RDSDatabaseConnector
 
@@ -22,6 +21,12 @@ class UserData(DataExtractor, DataCleaning, DatabaseTableConnector):
         Protected; extracted from user_data_config import from config module; the
         table name of the dataset in the AWS RDS database it is being extracted
         from.
+    _source_key_column: str
+        Protected; extracted from user_data_config import from config module;
+        the numeric key column of the table in the AWS RDS database.
+    dtypes_for_upload: dict
+        Class attribute mapping column names to the SQL types they are uploaded as,
+        defined on the class so that cleaned data can be uploaded without being cleaned again.
     '''
     def __init__(self):
         '''
@@ -29,34 +34,81 @@ class UserData(DataExtractor, DataCleaning, DatabaseTableConnector):
         '''
         try:
           DataExtractor.__init__(self)
-          DatabaseTableConnector.__init__(self, user_data_config['target_table_name'])
+          DatabaseTableConnector.__init__(self, user_data_config['target_table_name'], user_data_config['primary_key_column'],
+                                          user_data_config['varchar_columns'])
           self._source_db_table_name = user_data_config['source_db_table_name']
+          self._source_key_column = user_data_config['source_key_column']
         except Exception:
           print("Something went wrong when initialising the UserData child class")
 
     # define method from abstract base class to extract data
-    def extract_data(self):
+    def extract_data(self, chunksize: int = None, incremental: bool = False) -> None:
         '''
         Method inherited from abstract base class DataExtractor. Connects to the AWS RDS
         Database by creating an instance of the RDSDatabaseConnector, and extracts the data
         from the table by the name saved on the _source_db_table_name attribute to a Pandas
         DataFrame. Saves the DataFrame containing the extracted data to the class's
         _extracted_data attribute.
+
+        Arguments:
+        ---------
+        chunksize: int
+            Default=None. If provided, the table is streamed from the RDS database through
+            a server-side cursor, and an iterator of DataFrames of at most this many rows is
+            saved to the _extracted_data attribute instead, to be cleaned and uploaded with
+            the upload_extracted_chunks_to_db method.
+        incremental: bool
+            Default=False. If True, only the rows whose key is greater than the high-water
+            mark saved by the last load are extracted, to be appended to the existing table
+            with the append_to_db method. Raises a RuntimeError if no high-water mark has
+            been saved yet, as the whole table would then be appended on top of itself.
         '''
         conn = RDSDatabaseConnector()
-        extracted_data_df = self._read_rds_table(conn, self._source_db_table_name)
-        self._extracted_data = extracted_data_df
+        high_water_mark = self._watermark_store.get(self._source_db_table_name) if incremental else None
+        if incremental and high_water_mark is None:
+            raise RuntimeError(f"No high-water mark saved for {self._source_db_table_name}; "
+                               f"{self._target_table_name} must be loaded in full before it can be loaded incrementally.")
+
+        if high_water_mark is not None:
+            extracted_data_df = self._read_rds_table_beyond_watermark(conn,
+                                                                      self._source_db_table_name,
+                                                                      self._source_key_column,
+                                                                      high_water_mark)
+            print(f"Extracted {len(extracted_data_df)} rows added to {self._source_db_table_name} since the last load.")
+            self._extracted_data = extracted_data_df
+        elif chunksize is not None:
+            # the high-water mark is raised as each chunk is read (see _track_high_water_mark_of_chunks)
+            self._extracted_data = self._track_high_water_mark_of_chunks(
+                self._stream_rds_table(conn, self._source_db_table_name, chunksize), self._source_key_column)
+            return
+        else:
+            extracted_data_df = self._read_rds_table(conn, self._source_db_table_name)
+            self._extracted_data = extracted_data_df
+
+        # the high-water mark is carried forward when no new rows were extracted
+        if not self._extracted_data.empty:
+            self._extracted_high_water_mark = int(self._extracted_data[self._source_key_column].max())
+        else:
+            self._extracted_high_water_mark = high_water_mark
+
+    # the SQL types of the columns when uploaded, extended with the inferred types (see _get_dtypes_for_upload)
+    dtypes_for_upload = {"first_name": VARCHAR(255),
+                         "last_name": VARCHAR(255),
+                         "date_of_birth": DATE,
+                         "country_code": VARCHAR, # sized to its maximum length before upload
+                         "user_uuid": UUID,
+                         "join_date": DATE}
 
     # Method to clean the user data (look for NULL values,
     # errors with dates, incorrectly typed values and rows filled with the wrong info)
     def clean_extracted_data(self):
         '''
-        Method inherited from abstract base class DataCleaning. Makes a copy of
-        the Pandas dataframe stored at the _extracted_data attribute, applies
-        cleaning methods to this copy of the dataframe, and assigns the dataframe
-        after cleaning to the class's _cleaned_data attribute.
+        Method inherited from abstract base class DataCleaning. Takes a copy of
+        the Pandas dataframe stored at the _extracted_data attribute (or, in memory-lean
+        mode, the dataframe itself, releasing the attribute), applies cleaning methods
+        to it, and assigns the dataframe after cleaning to the class's _cleaned_data attribute.
         '''
-        ud_df = self._extracted_data.copy()
+        ud_df = self._take_extracted_data_for_cleaning()
 
         # Set index column
         ud_df.set_index('index', inplace=True)
@@ -64,12 +116,17 @@ class UserData(DataExtractor, DataCleaning, DatabaseTableConnector):
         # Cast the "first_name" and "last_name" and ... values to strings
         self._cast_columns_to_string(ud_df, ['first_name', 'last_name', 'company', 'email_address', 'address', 'phone_number', 'user_uuid'])
 
-        # Delete all rows where the "first_name" is equal to "NULL" string
-        ud_df.loc[ud_df['first_name'] == "NULL", 'first_name'] = np.nan # first replace strings with an NaN value
-        ud_df.dropna(subset='first_name', inplace=True)
+        row_filter_plan = RowFilterPlan(ud_df)
+
+        # Delete all rows where the "first_name" is equal to "NULL" string, or missing
+        row_filter_plan.remove_rows_with_specific_value_in_specified_column('first_name', "NULL")
+        row_filter_plan.remove_rows_with_nan_values_in_specified_column('first_name')
 
         # Delete all rows where the "first_name" value contains a numeric digit
-        ud_df = self._remove_rows_where_numeric_digits_are_found_in_string_column_values(ud_df, 'first_name')
+        row_filter_plan.remove_rows_where_numeric_digits_are_found_in_string_column_values('first_name')
+
+        ud_df, rows_removed = row_filter_plan.materialise()
+        print(f"Rows removed from the user data, by filter: {rows_removed}")
 
         # Cast the "date_of_birth" and "join_date" columns to datetime values
         self._cast_columns_to_datetime64(ud_df, ['date_of_birth', 'join_date'], 'mixed', 'coerce')
@@ -81,14 +138,9 @@ class UserData(DataExtractor, DataCleaning, DatabaseTableConnector):
         self._cast_columns_to_category(ud_df, ['country_code', 'country'])
 
         # replace invalid phone numbers with np.nan
-        ud_df = self._replace_invalid_phone_numbers_with_nan(ud_df, 'phone_number', ['GB', 'US', 'DE'])
+        ud_df, invalid_phone_number_counts = self._replace_invalid_phone_numbers_with_nan(ud_df, 'phone_number', ['GB', 'US', 'DE'])
+        print(f"Invalid phone numbers replaced with NaN, by country: {invalid_phone_number_counts}")
 
         # make phone_number uniform: UK numbers, German numbers, US numbers - for later if there's time
 
         self._cleaned_data = ud_df
-        setattr(self, 'dtypes_for_upload', {"first_name": VARCHAR(255),
-                                            "last_name": VARCHAR(255),
-                                            "date_of_birth": DATE,
-                                            "country_code": VARCHAR, # set maximum length after upload to server
-                                            "user_uuid": UUID,
-                                            "join_date": DATE})
\ No newline at end of file
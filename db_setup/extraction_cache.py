@@ -0,0 +1,187 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import requests
+
+
+class ExtractionCache:
+    '''
+    A non-interactive, content-addressed local cache of extracted datasets,
+    shared by the static extraction methods of DataExtractor. Each entry is keyed
+    on the source URI together with a freshness token describing the current
+    version of the source (e.g. its ETag and Last-Modified headers, or its row count),
+    so a cached DataFrame is only reused while the source is unchanged. Entries are
+    stored as Parquet files and the least recently used entries are evicted once the
+    cache grows beyond its maximum size.
+
+    Parameters:
+    ----------
+    cache_dir: str
+        Default='db_setup/.cache/extraction'. The directory the cached Parquet files
+        are saved in.
+    max_size_bytes: int
+        Default=2GiB. The maximum total size of the cached files.
+
+    Attributes:
+    ----------
+    _cache_dir: str
+        Protected; the directory the cached Parquet files are saved in.
+    _max_size_bytes: int
+        Protected; the maximum total size of the cached files.
+    _eviction_lock: threading.Lock
+        Protected; lock held while the cache is evicted, as entries are saved from the
+        pipeline's worker threads.
+    '''
+    def __init__(self, cache_dir: str = 'db_setup/.cache/extraction', max_size_bytes: int = 2 * 1024**3) -> None:
+        '''
+        See help(ExtractionCache) for accurate signature.
+        '''
+        self._cache_dir = cache_dir
+        self._max_size_bytes = max_size_bytes
+        self._eviction_lock = threading.Lock()
+
+    def _get_cache_filepath(self, source_uri: str, freshness_token: str) -> str:
+        '''
+        Protected; method that returns the filepath of the cache entry for
+        a source URI at the version described by the freshness token.
+
+        Arguments:
+        ---------
+        source_uri: str
+            The URI of the extracted source.
+        freshness_token: str
+            A string describing the current version of the source.
+
+        Returns:
+        -------
+        str: the filepath of the cache entry.
+        '''
+        cache_key = hashlib.sha256(f"{source_uri}\n{freshness_token}".encode()).hexdigest()
+        return os.path.join(self._cache_dir, f"{cache_key}.parquet")
+
+    def get(self, source_uri: str, freshness_token: str | None) -> pd.DataFrame | None:
+        '''
+        Method that returns the cached DataFrame for a source URI at the version
+        described by the freshness token, if there is one.
+
+        Arguments:
+        ---------
+        source_uri: str
+            The URI of the extracted source.
+        freshness_token: str | None
+            A string describing the current version of the source. If None, the
+            freshness of the source couldn't be checked and the cache is bypassed.
+
+        Returns:
+        -------
+        pd.DataFrame | None: the cached DataFrame, or None if there is no valid cache entry.
+        '''
+        if freshness_token is None:
+            return None
+
+        cache_filepath = self._get_cache_filepath(source_uri, freshness_token)
+        if not os.path.isfile(cache_filepath):
+            return None
+
+        try:
+            df = pd.read_parquet(cache_filepath)
+        except Exception:
+            print(f"Error: The cache entry for {source_uri} could not be read. Extracting from source.")
+            return None
+
+        # updating the modification time marks the entry as recently used for eviction
+        try:
+            os.utime(cache_filepath)
+        except FileNotFoundError:
+            pass
+        print(f"Loaded {source_uri} from the extraction cache.")
+        return df
+
+    def put(self, source_uri: str, freshness_token: str | None, df: pd.DataFrame | None) -> None:
+        '''
+        Method that saves an extracted DataFrame to the cache under the source URI
+        and freshness token, then evicts the least recently used entries if the cache
+        has grown beyond its maximum size.
+
+        Arguments:
+        ---------
+        source_uri: str
+            The URI of the extracted source.
+        freshness_token: str | None
+            A string describing the version of the source the DataFrame was
+            extracted from. If None, nothing is cached.
+        df: pd.DataFrame | None
+            The extracted DataFrame. If None, nothing is cached.
+        '''
+        if freshness_token is None or df is None:
+            return
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        cache_filepath = self._get_cache_filepath(source_uri, freshness_token)
+        # writing to a temporary file first so an interrupted write never leaves a partial entry
+        temp_filepath = f"{cache_filepath}.tmp"
+        try:
+            df.to_parquet(temp_filepath)
+            os.replace(temp_filepath, cache_filepath)
+        except Exception:
+            print(f"Error: The data extracted from {source_uri} could not be saved to the extraction cache.")
+            if os.path.isfile(temp_filepath):
+                os.remove(temp_filepath)
+            return
+
+        self._evict_to_max_size()
+
+    def _evict_to_max_size(self) -> None:
+        '''
+        Protected; method that deletes the least recently used cache entries
+        until the total size of the cache is within its maximum size. Entries
+        removed by another process while the cache is evicted are skipped.
+        '''
+        with self._eviction_lock:
+            cache_entries = []
+            for file_name in os.listdir(self._cache_dir):
+                if file_name.endswith('.parquet'):
+                    try:
+                        file_stat = os.stat(os.path.join(self._cache_dir, file_name))
+                    except FileNotFoundError:
+                        continue
+                    cache_entries.append((file_stat.st_mtime, file_stat.st_size, file_name))
+
+            total_size = sum(size for _, size, _ in cache_entries)
+            for _, size, file_name in sorted(cache_entries):
+                if total_size <= self._max_size_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self._cache_dir, file_name))
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+
+    @staticmethod
+    def get_http_freshness_token(url: str) -> str | None:
+        '''
+        Method that returns a freshness token for a file served over HTTP(S),
+        built from the ETag and Last-Modified headers of a HEAD request.
+
+        Arguments:
+        ---------
+        url: str
+            The URL of the file.
+
+        Returns:
+        -------
+        str | None: the freshness token, or None if the headers could not be retrieved.
+        '''
+        try:
+            response = requests.head(url, allow_redirects=True, timeout=10)
+        except requests.exceptions.RequestException:
+            return None
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or (etag is None and last_modified is None):
+            return None
+
+        return f"etag={etag};last-modified={last_modified}"
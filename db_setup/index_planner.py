@@ -0,0 +1,295 @@
+import argparse
+import re
+import time
+
+from sqlalchemy import text
+
+from .database_utils import LocalDatabaseConnector
+from .query_runner import QueryRunner
+
+
+class IndexPlanner(LocalDatabaseConnector):
+    '''
+    Plans and builds the indexes that the foreign keys of the database and the
+    business queries (e.g. querying-the-data/queries.sql) need. PostgreSQL indexes
+    the referenced side of a foreign key (the primary key) but not the referencing
+    columns, so an index is planned on every foreign key column, and on every column
+    that the queries join on or filter on, unless an index on the column already exists.
+    The indexes are built concurrently, so the tables stay readable and writable
+    while they are built, and the planned cost of each query is reported before and
+    after. Extends LocalDatabaseConnector.
+
+    Parameters:
+    ----------
+    queries_filepath: str
+        Default='querying-the-data/queries.sql'. The filepath of the SQL file of numbered queries.
+
+    Attributes:
+    ----------
+    _queries: dict[int, str]
+        Protected; dictionary mapping the number of each query of the file to its SQL.
+    '''
+    # the qualified columns on either side of a join condition, e.g. orders_table.product_code = dim_products.product_code
+    _join_condition_pattern = re.compile(r'"?(\w+)"?\."?(\w+)"?\s*=\s*"?(\w+)"?\."?(\w+)"?')
+    # the (optionally qualified) column of an equality, IN or IS NULL filter of a WHERE clause
+    _filter_pattern = re.compile(r'\b(?:WHERE|AND)\s+(?:"?(\w+)"?\.)?"?(\w+)"?\s*(?:=|\bIN\b|\bIS\s+(?:NOT\s+)?NULL\b)',
+                                 re.IGNORECASE)
+    # the qualified column references of a query, e.g. orders_table.product_quantity
+    _qualified_column_pattern = re.compile(r'"?(\w+)"?\."?(\w+)"?')
+
+    # the leading column of every valid index of the current schema
+    _indexed_columns_query = """
+        SELECT t.relname, a.attname
+        FROM pg_index AS i
+        JOIN pg_class AS t ON t.oid = i.indrelid
+        JOIN pg_namespace AS n ON n.oid = t.relnamespace
+        JOIN pg_attribute AS a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+        WHERE n.nspname = current_schema() AND i.indisvalid;"""
+
+    # the indexes left invalid by a concurrent build that failed
+    _invalid_indexes_query = """
+        SELECT c.relname
+        FROM pg_index AS i
+        JOIN pg_class AS c ON c.oid = i.indexrelid
+        JOIN pg_namespace AS n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND NOT i.indisvalid;"""
+
+    def __init__(self, queries_filepath: str = 'querying-the-data/queries.sql') -> None:
+        '''
+        See help(IndexPlanner) for accurate signature.
+        '''
+        super().__init__()
+        self._queries = QueryRunner._parse_queries_file(queries_filepath)
+
+    def _get_foreign_key_columns(self) -> list[tuple[str, str]]:
+        '''
+        Protected; method that returns the referencing columns of the foreign keys of
+        the database, from the catalog snapshot.
+
+        Returns:
+        -------
+        list[tuple[str, str]]: the table name and column name of each single-column foreign key.
+        '''
+        foreign_key_columns = []
+        for table_name in self.catalog.get_table_names():
+            for constraint in self.catalog.get_constraints(table_name, 'FOREIGN KEY'):
+                columns_match = re.match(r'FOREIGN KEY \(([^)]*)\)', constraint['definition'])
+                if columns_match and ',' not in columns_match.group(1):
+                    foreign_key_columns.append((table_name, columns_match.group(1).strip('"')))
+        return foreign_key_columns
+
+    def _get_query_columns(self, query: str) -> tuple[list[tuple[str, str]], dict[str, set[str]]]:
+        '''
+        Protected; method that returns the columns of the database's tables that a query
+        joins on or filters on, and the columns of each table that it reads.
+
+        Arguments:
+        ---------
+        query: str
+            The SQL of the query.
+
+        Returns:
+        -------
+        tuple[list[tuple[str, str]], dict[str, set[str]]]: the table name and column name of each
+        join or filter column, and dictionary mapping each table to the columns of it that the
+        query qualifies with its name.
+        '''
+        query_without_comments = re.sub(r'--[^\n]*', '', query)
+        table_names = set(self.table_names_in_db)
+
+        read_columns = {}
+        for table_name, column_name in self._qualified_column_pattern.findall(query_without_comments):
+            if table_name in table_names:
+                read_columns.setdefault(table_name, set()).add(column_name)
+
+        query_columns = []
+        for left_table, left_column, right_table, right_column in self._join_condition_pattern.findall(query_without_comments):
+            query_columns += [(table_name, column_name) for table_name, column_name
+                              in [(left_table, left_column), (right_table, right_column)] if table_name in table_names]
+
+        tables_read = [table_name for table_name in QueryRunner._table_reference_pattern.findall(query_without_comments)
+                       if table_name in table_names]
+        for table_name, column_name in self._filter_pattern.findall(query_without_comments):
+            # unqualified filter columns belong to whichever table read by the query has them
+            candidate_tables = [table_name] if table_name else tables_read
+            query_columns += [(candidate_table, column_name) for candidate_table in candidate_tables
+                              if candidate_table in table_names and self.catalog.get_column(candidate_table, column_name)]
+        return query_columns, read_columns
+
+    def _get_indexed_columns(self) -> set[tuple[str, str]]:
+        '''
+        Protected; method that returns the columns that lead a valid index, which the
+        planned indexes would duplicate.
+
+        Returns:
+        -------
+        set[tuple[str, str]]: the table name and column name of the leading column of each valid index.
+        '''
+        with self.engine.connect() as conn:
+            return set(map(tuple, conn.execute(text(self._indexed_columns_query)).fetchall()))
+
+    def plan_indexes(self, covering: bool = False) -> list[dict]:
+        '''
+        Method that plans an index on each foreign key column, and on each column the
+        queries join on or filter on, that doesn't already lead an index.
+
+        Arguments:
+        ---------
+        covering: bool
+            Default=False. If True, the index on a column used by the queries also includes
+            (as INCLUDE columns) the other columns of its table that those queries read,
+            so that they can be answered from the index alone.
+
+        Returns:
+        -------
+        list[dict]: a dictionary for each planned index, holding its 'index_name', 'table_name',
+        'column_name', 'include_columns' and the 'reasons' it was planned for.
+        '''
+        indexed_columns = self._get_indexed_columns()
+        planned_indexes = {}
+
+        def plan_index(table_name: str, column_name: str, reason: str, read_columns: set[str] = frozenset()) -> None:
+            if (table_name, column_name) in indexed_columns:
+                return
+            planned_index = planned_indexes.setdefault((table_name, column_name),
+                                                       {'index_name': f"{table_name}_{column_name}_idx",
+                                                        'table_name': table_name,
+                                                        'column_name': column_name,
+                                                        'include_columns': set(),
+                                                        'reasons': []})
+            if reason not in planned_index['reasons']:
+                planned_index['reasons'].append(reason)
+            if covering:
+                planned_index['include_columns'] |= set(read_columns) - {column_name}
+
+        for table_name, column_name in self._get_foreign_key_columns():
+            plan_index(table_name, column_name, 'foreign key')
+        for query_number, query in sorted(self._queries.items()):
+            query_columns, read_columns = self._get_query_columns(query)
+            for table_name, column_name in query_columns:
+                plan_index(table_name, column_name, f"query {query_number}", read_columns.get(table_name, set()))
+
+        for planned_index in planned_indexes.values():
+            planned_index['include_columns'] = sorted(planned_index['include_columns'])
+        return list(planned_indexes.values())
+
+    def _get_query_costs(self) -> dict[int, float | None]:
+        '''
+        Protected; method that returns the total cost of the plan PostgreSQL chooses for
+        each query, without running them.
+
+        Returns:
+        -------
+        dict[int, float | None]: dictionary mapping the number of each query to the total
+        cost of its plan, or None if it couldn't be planned.
+        '''
+        query_costs = {}
+        with self.engine.connect() as conn:
+            for query_number, query in sorted(self._queries.items()):
+                try:
+                    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+                    query_costs[query_number] = plan[0]['Plan']['Total Cost']
+                except Exception:
+                    conn.rollback()
+                    query_costs[query_number] = None
+        return query_costs
+
+    def _analyze_tables(self, table_names: list[str]) -> None:
+        '''
+        Protected; method that updates the planner statistics of tables, so that the plan
+        costs are compared on up-to-date statistics.
+
+        Arguments:
+        ---------
+        table_names: list[str]
+            The names of the tables.
+        '''
+        for table_name in table_names:
+            self.update_db(f'ANALYZE "{table_name}";')
+
+    def _drop_invalid_indexes(self) -> None:
+        '''
+        Protected; method that drops the indexes left invalid by concurrent builds that
+        failed, which would otherwise stop the index from being built again.
+        '''
+        with self.engine.connect() as conn:
+            invalid_index_names = conn.execute(text(self._invalid_indexes_query)).scalars().all()
+        for index_name in invalid_index_names:
+            self.update_db(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}";')
+
+    # method that builds the planned indexes and reports their effect on the queries' plans
+    def build_indexes(self, covering: bool = False) -> list[dict]:
+        '''
+        Method that plans the indexes (see plan_indexes), builds them concurrently, one at
+        a time, and prints the planned cost of each query before and after. An index whose
+        build fails is dropped, and the others are still built.
+
+        Arguments:
+        ---------
+        covering: bool
+            Default=False. If True, the indexes on the columns used by the queries are
+            covering indexes (see plan_indexes).
+
+        Returns:
+        -------
+        list[dict]: the planned indexes that were built (see plan_indexes).
+        '''
+        self._drop_invalid_indexes()
+        planned_indexes = self.plan_indexes(covering)
+        if not planned_indexes:
+            print("Every foreign key and query column is already indexed.")
+            return []
+
+        indexed_table_names = sorted({planned_index['table_name'] for planned_index in planned_indexes})
+        self._analyze_tables(indexed_table_names)
+        costs_before = self._get_query_costs()
+
+        built_indexes = []
+        for planned_index in planned_indexes:
+            include_clause = ''
+            if planned_index['include_columns']:
+                include_columns = ', '.join(f'"{column}"' for column in planned_index['include_columns'])
+                include_clause = f" INCLUDE ({include_columns})"
+            query = (f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{planned_index["index_name"]}" '
+                     f'ON "{planned_index["table_name"]}" ("{planned_index["column_name"]}"){include_clause};')
+            start_time = time.perf_counter()
+            try:
+                self.update_db(query)
+            except Exception as e:
+                print(f"Error: Index {planned_index['index_name']} could not be built: {e!r}")
+                self.update_db(f'DROP INDEX CONCURRENTLY IF EXISTS "{planned_index["index_name"]}";')
+                continue
+            built_indexes.append(planned_index)
+            print(f"Built index {planned_index['index_name']} ({', '.join(planned_index['reasons'])}) "
+                  f"in {time.perf_counter() - start_time:.2f}s.")
+
+        self._analyze_tables(indexed_table_names)
+        costs_after = self._get_query_costs()
+        for query_number in sorted(self._queries):
+            cost_before, cost_after = costs_before[query_number], costs_after[query_number]
+            if cost_before is None or cost_after is None:
+                print(f"Query {query_number}: plan cost could not be compared.")
+            else:
+                change = (cost_after - cost_before) / cost_before * 100 if cost_before else 0
+                print(f"Query {query_number}: plan cost {cost_before:.2f} -> {cost_after:.2f} ({change:+.1f}%).")
+        return built_indexes
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog='python -m db_setup.index_planner',
+                                     description='Builds the indexes needed by the foreign keys and the business queries of the local sales_data database.')
+    parser.add_argument('--queries-file', default='querying-the-data/queries.sql',
+                        help='the SQL file of numbered queries to plan indexes for (default: querying-the-data/queries.sql)')
+    parser.add_argument('--covering', action='store_true',
+                        help='include in each index on a query column the other columns of its table that the queries read')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='print the planned indexes without building them')
+    args = parser.parse_args()
+
+    index_planner = IndexPlanner(args.queries_file)
+    if args.dry_run:
+        for planned_index in index_planner.plan_indexes(args.covering):
+            print(planned_index)
+    else:
+        index_planner.build_indexes(args.covering)
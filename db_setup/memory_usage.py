@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+import os
+import resource
+import sys
+from typing import Iterator
+
+
+def get_current_rss_mb() -> float | None:
+    '''
+    Returns the resident set size (the physical memory in use) of this process.
+
+    Returns:
+    -------
+    float | None: the resident set size in MB, or None if it can't be read on this platform.
+    '''
+    try:
+        # the second field of /proc/self/statm is the number of resident pages (Linux only)
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_peak_rss_mb() -> float:
+    '''
+    Returns the peak resident set size of this process since it started.
+
+    Returns:
+    -------
+    float: the peak resident set size in MB.
+    '''
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 ** 2
+    return peak_rss / 1024
+
+
+def _format_mb(mb: float | None) -> str:
+    '''
+    Protected; formats a memory figure in MB for the stage reports.
+    '''
+    return 'n/a' if mb is None else f"{mb:.1f} MB"
+
+
+@contextmanager
+def report_memory_usage(stage_name: str) -> Iterator[None]:
+    '''
+    Context manager that prints the resident set size of the process before and
+    after a stage of the pipeline, and the peak resident set size reached by the
+    end of the stage. The peak is that of the whole process, so when stages run
+    concurrently it covers every stage running alongside this one.
+
+    Arguments:
+    ---------
+    stage_name: str
+        The name of the stage, e.g. 'clean dim_users', printed with the figures.
+    '''
+    start_rss = get_current_rss_mb()
+    start_peak_rss = get_peak_rss_mb()
+    try:
+        yield
+    finally:
+        end_rss = get_current_rss_mb()
+        # ru_maxrss is only updated periodically, so can trail the current figure slightly
+        end_peak_rss = max(get_peak_rss_mb(), end_rss or 0)
+        new_peak = " (new peak)" if end_peak_rss > start_peak_rss else ""
+        print(f"Memory usage of {stage_name}: {_format_mb(start_rss)} -> {_format_mb(end_rss)}, "
+              f"peak RSS {_format_mb(end_peak_rss)}{new_peak}.")
@@ -0,0 +1,164 @@
+import time
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+
+class PipelineScheduler:
+    '''
+    Runs the tasks of the database setup pipeline as a dependency graph:
+    each task is started as soon as all the tasks it depends on have succeeded,
+    so that independent tasks (e.g. the extraction of different datasets) run
+    concurrently in a pool of worker threads. If a task fails, every task that
+    depends on it, directly or indirectly, is skipped.
+
+    Parameters:
+    ----------
+    max_workers: int
+        Default=4. The maximum number of tasks run at once.
+
+    Attributes:
+    ----------
+    _max_workers: int
+        Protected; the maximum number of tasks run at once.
+    _tasks: dict[str, Callable]
+        Protected; dictionary mapping each task name to the function it runs.
+    _dependencies: dict[str, list[str]]
+        Protected; dictionary mapping each task name to the names of the tasks
+        it depends on.
+    '''
+    def __init__(self, max_workers: int = 4) -> None:
+        '''
+        See help(PipelineScheduler) for accurate signature.
+        '''
+        self._max_workers = max_workers
+        self._tasks = {}
+        self._dependencies = {}
+
+    def add_task(self, task_name: str, task_function: Callable, depends_on: list[str] = None) -> None:
+        '''
+        Method that adds a task to the graph.
+
+        Arguments:
+        ---------
+        task_name: str
+            The unique name of the task.
+        task_function: Callable
+            The function run by the task, taking no arguments. The task fails
+            if the function raises an exception.
+        depends_on: list[str]
+            Default=None. The names of the tasks that must succeed before this
+            task is started.
+        '''
+        if task_name in self._tasks:
+            raise ValueError(f"A task named {task_name} has already been added.")
+        self._tasks[task_name] = task_function
+        self._dependencies[task_name] = list(depends_on or [])
+
+    def _check_graph(self) -> None:
+        '''
+        Protected; method that checks every dependency names a task in the graph,
+        and that the graph has no cycles. Raises a ValueError if not.
+        '''
+        for task_name, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                if dependency not in self._tasks:
+                    raise ValueError(f"Task {task_name} depends on unknown task {dependency}.")
+
+        # Kahn's algorithm: repeatedly remove the tasks with no remaining dependencies
+        num_of_dependencies = {task_name: len(dependencies) for task_name, dependencies in self._dependencies.items()}
+        ready_tasks = [task_name for task_name, num in num_of_dependencies.items() if num == 0]
+        num_of_ordered_tasks = 0
+        while ready_tasks:
+            ready_task = ready_tasks.pop()
+            num_of_ordered_tasks += 1
+            for task_name, dependencies in self._dependencies.items():
+                if ready_task in dependencies:
+                    num_of_dependencies[task_name] -= 1
+                    if num_of_dependencies[task_name] == 0:
+                        ready_tasks.append(task_name)
+        if num_of_ordered_tasks != len(self._tasks):
+            raise ValueError("The pipeline's task dependencies contain a cycle.")
+
+    @staticmethod
+    def _run_timed(task_function: Callable) -> float:
+        '''
+        Protected; method run in the worker threads, which runs a task's function
+        and returns how long it took.
+
+        Arguments:
+        ---------
+        task_function: Callable
+            The function run by the task.
+
+        Returns:
+        -------
+        float: the number of seconds the task took to run.
+        '''
+        start_time = time.perf_counter()
+        task_function()
+        return time.perf_counter() - start_time
+
+    def run(self) -> dict[str, str]:
+        '''
+        Method that runs every task in the graph, each as soon as all of its
+        dependencies have succeeded, and prints the outcome and duration of each.
+
+        Returns:
+        -------
+        dict[str, str]: dictionary mapping each task name to its outcome:
+        'succeeded', 'failed' or 'skipped'.
+        '''
+        self._check_graph()
+
+        dependents = {task_name: [] for task_name in self._tasks}
+        for task_name, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                dependents[dependency].append(task_name)
+
+        remaining_dependencies = {task_name: set(dependencies) for task_name, dependencies in self._dependencies.items()}
+        task_outcomes = {}
+        start_time = time.perf_counter()
+
+        def skip_dependents(failed_task_name: str) -> None:
+            for dependent in dependents[failed_task_name]:
+                if dependent not in task_outcomes:
+                    task_outcomes[dependent] = 'skipped'
+                    print(f"Skipping task {dependent}: task {failed_task_name} did not succeed.")
+                    skip_dependents(dependent)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            running_tasks: dict[Future, str] = {}
+
+            def submit(task_name: str) -> None:
+                print(f"Starting task {task_name}.")
+                running_tasks[executor.submit(self._run_timed, self._tasks[task_name])] = task_name
+
+            for task_name, dependencies in remaining_dependencies.items():
+                if not dependencies:
+                    submit(task_name)
+
+            while running_tasks:
+                finished_tasks, _ = wait(running_tasks, return_when=FIRST_COMPLETED)
+                for future in finished_tasks:
+                    task_name = running_tasks.pop(future)
+                    try:
+                        elapsed_time = future.result()
+                    except Exception as e:
+                        task_outcomes[task_name] = 'failed'
+                        print(f"Task {task_name} failed: {e!r}")
+                        skip_dependents(task_name)
+                        continue
+
+                    task_outcomes[task_name] = 'succeeded'
+                    print(f"Task {task_name} succeeded in {elapsed_time:.1f}s.")
+                    for dependent in dependents[task_name]:
+                        remaining_dependencies[dependent].discard(task_name)
+                        if not remaining_dependencies[dependent] and dependent not in task_outcomes:
+                            submit(dependent)
+
+        num_of_failed_tasks = sum(outcome != 'succeeded' for outcome in task_outcomes.values())
+        print(f"Pipeline finished in {time.perf_counter() - start_time:.1f}s: "
+              f"{len(task_outcomes) - num_of_failed_tasks} tasks succeeded, {num_of_failed_tasks} failed or skipped.")
+
+        return task_outcomes
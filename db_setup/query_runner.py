@@ -0,0 +1,242 @@
+import argparse
+import csv
+from datetime import timedelta
+from decimal import Decimal
+import glob
+import hashlib
+import json
+import os
+import re
+
+from sqlalchemy import text
+
+from .database_utils import LocalDatabaseConnector
+
+
+class QueryRunner(LocalDatabaseConnector):
+    '''
+    Runs the numbered business queries of a SQL file (e.g. querying-the-data/queries.sql)
+    on the local database and writes the results of each to a CSV file next to it
+    (query-N-results.csv). The results are cached, keyed on the text of the query and
+    the versions of the tables it reads, which the load pipeline bumps whenever it loads
+    a table. A query is only run again once a table it reads has been reloaded (or the
+    query has changed); otherwise its cached results are written. Extends LocalDatabaseConnector.
+
+    Parameters:
+    ----------
+    cache_dir: str
+        Default='db_setup/.cache/query_results'. The directory the cached results are saved in.
+
+    Attributes:
+    ----------
+    _cache_dir: str
+        Protected; the directory the cached results are saved in.
+    '''
+    # the table names after FROM and JOIN, and the names of the CTEs defined with WITH
+    _table_reference_pattern = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+    _cte_name_pattern = re.compile(r'(?:\bWITH|,)\s*"?(\w+)"?\s+AS\s*\(', re.IGNORECASE)
+
+    def __init__(self, cache_dir: str = 'db_setup/.cache/query_results') -> None:
+        '''
+        See help(QueryRunner) for accurate signature.
+        '''
+        super().__init__()
+        self._cache_dir = cache_dir
+
+    @staticmethod
+    def _parse_queries_file(queries_filepath: str) -> dict[int, str]:
+        '''
+        Protected; method that reads the queries of a SQL file. Each query is a statement
+        ending in ';', numbered by the first comment of the form '-- N.' that it contains.
+
+        Arguments:
+        ---------
+        queries_filepath: str
+            The filepath of the SQL file.
+
+        Returns:
+        -------
+        dict[int, str]: dictionary mapping the number of each query to its SQL, including its comments.
+        '''
+        with open(queries_filepath, 'r') as read_file:
+            statements = read_file.read().split(';')
+        queries = {}
+        for statement in statements:
+            query_number_match = re.search(r'^\s*--\s*(\d+)\.', statement, re.MULTILINE)
+            if query_number_match:
+                queries[int(query_number_match.group(1))] = statement.strip() + ';'
+        return queries
+
+    def _get_tables_read(self, query: str) -> list[str]:
+        '''
+        Protected; method that returns the tables of the database a query reads.
+
+        Arguments:
+        ---------
+        query: str
+            The SQL of the query.
+
+        Returns:
+        -------
+        list[str]: the sorted names of the tables of the database the query reads from.
+        '''
+        query_without_comments = re.sub(r'--[^\n]*', '', query)
+        cte_names = set(self._cte_name_pattern.findall(query_without_comments))
+        table_names = set(self._table_reference_pattern.findall(query_without_comments)) - cte_names
+        return sorted(table_names & set(self.table_names_in_db))
+
+    @staticmethod
+    def _format_value(value) -> str:
+        '''
+        Protected; method that formats a value of the results of a query for the CSV
+        file, in the same way as the CSV files exported from pgAdmin 4.
+
+        Arguments:
+        ---------
+        value: Any
+            The value returned by the database.
+
+        Returns:
+        -------
+        str: the value as written to the CSV file.
+        '''
+        if value is None:
+            return ''
+        if isinstance(value, timedelta):
+            # intervals are written as their non-zero parts, e.g. {"hours":2,"minutes":17,"seconds":12,"milliseconds":300.182}
+            hours, remainder = divmod(value.seconds, 3600)
+            minutes, seconds = divmod(remainder, 60)
+            milliseconds = value.microseconds / 1000
+            interval_parts = {'days': value.days, 'hours': hours, 'minutes': minutes, 'seconds': seconds,
+                              'milliseconds': int(milliseconds) if milliseconds.is_integer() else milliseconds}
+            return json.dumps({part: amount for part, amount in interval_parts.items() if amount},
+                              separators=(',', ':'))
+        if isinstance(value, Decimal):
+            return format(value, 'f')
+        return str(value)
+
+    def _get_cache_filepath(self, results_prefix: str, query_number: int, cache_key: str) -> str:
+        '''
+        Protected; method that returns the filepath of the cached results of a query.
+
+        Arguments:
+        ---------
+        results_prefix: str
+            The prefix of the results files of the queries file, e.g. 'query'.
+        query_number: int
+            The number of the query.
+        cache_key: str
+            The hash of the query and the versions of the tables it reads.
+
+        Returns:
+        -------
+        str: the filepath of the cached results.
+        '''
+        return os.path.join(self._cache_dir, f"{results_prefix}-{query_number}-{cache_key}.csv")
+
+    @staticmethod
+    def _run_query(conn, query: str, results_filepath: str) -> None:
+        '''
+        Protected; method that runs a query and writes its results to a CSV file, with a
+        header row and every value quoted.
+
+        Arguments:
+        ---------
+        conn: sqlalchemy.engine.Connection
+            The connection of the transaction the versions of the tables were read in.
+        query: str
+            The SQL of the query.
+        results_filepath: str
+            The filepath of the CSV file.
+        '''
+        result = conn.execute(text(query))
+        column_names = list(result.keys())
+        rows = result.fetchall()
+        with open(results_filepath, 'w', newline='') as write_file:
+            writer = csv.writer(write_file, quoting=csv.QUOTE_ALL)
+            writer.writerow(column_names)
+            writer.writerows([QueryRunner._format_value(value) for value in row] for row in rows)
+
+    # method that writes the results of every query of the file, from the cache where possible
+    def run(self,
+            queries_filepath: str = 'querying-the-data/queries.sql',
+            results_prefix: str = 'query',
+            use_cache: bool = True) -> dict[int, str]:
+        '''
+        Method that writes the results of every query of a SQL file to a CSV file in the
+        same directory, named '<results_prefix>-N-results.csv' for query N. The results of
+        a query are taken from the cache if neither the query nor the tables it reads have
+        changed since they were cached, and computed by running the query otherwise. Queries
+        reading a table that has no version (i.e. that was loaded before versions were
+        recorded) are always run. The versions are read, and the query run, in one
+        REPEATABLE READ transaction that first locks the tables read against being swapped
+        out, so that the results cached under the versions are computed from those versions.
+
+        Arguments:
+        ---------
+        queries_filepath: str
+            Default='querying-the-data/queries.sql'. The filepath of the SQL file.
+        results_prefix: str
+            Default='query'. The prefix of the names of the CSV files.
+        use_cache: bool
+            Default=True. If False, every query is run, and its results cached.
+
+        Returns:
+        -------
+        dict[int, str]: dictionary mapping the number of each query to 'cached', 'computed' or 'failed'.
+        '''
+        os.makedirs(self._cache_dir, exist_ok=True)
+        results_dir = os.path.dirname(queries_filepath)
+        outcomes = {}
+        for query_number, query in sorted(self._parse_queries_file(queries_filepath).items()):
+            results_filepath = os.path.join(results_dir, f"{results_prefix}-{query_number}-results.csv")
+            tables_read = self._get_tables_read(query)
+            cache_filepath = None
+            try:
+                with self.engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn, conn.begin():
+                    # the snapshot is only taken by the first query after the locks, so it can't predate a swap
+                    if tables_read:
+                        quoted_table_names = ', '.join(f'"{table_name}"' for table_name in tables_read)
+                        conn.execute(text(f'LOCK TABLE {quoted_table_names} IN ACCESS SHARE MODE;'))
+                    table_versions = self.get_table_versions(tables_read, conn)
+                    if set(table_versions) == set(tables_read):
+                        cache_key = hashlib.sha256(json.dumps([query, sorted(table_versions.items())]).encode()).hexdigest()[:16]
+                        cache_filepath = self._get_cache_filepath(results_prefix, query_number, cache_key)
+
+                    if use_cache and cache_filepath is not None and os.path.isfile(cache_filepath):
+                        with open(cache_filepath, 'rb') as read_file, open(results_filepath, 'wb') as write_file:
+                            write_file.write(read_file.read())
+                        outcomes[query_number] = 'cached'
+                        continue
+
+                    self._run_query(conn, query, results_filepath)
+            except Exception as e:
+                print(f"Error: Query {query_number} failed: {e!r}")
+                outcomes[query_number] = 'failed'
+                continue
+            outcomes[query_number] = 'computed'
+
+            if cache_filepath is not None:
+                # the results cached for earlier versions of the tables won't be used again
+                for stale_cache_filepath in glob.glob(self._get_cache_filepath(results_prefix, query_number, '*')):
+                    os.remove(stale_cache_filepath)
+                with open(results_filepath, 'rb') as read_file, open(cache_filepath, 'wb') as write_file:
+                    write_file.write(read_file.read())
+
+        print(f"Query results written to {results_dir}: {outcomes}")
+        return outcomes
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(prog='python -m db_setup.query_runner',
+                                     description='Runs the business queries on the local sales_data database and writes their results to CSV files.')
+    parser.add_argument('--queries-file', default='querying-the-data/queries.sql',
+                        help='the SQL file of numbered queries to run (default: querying-the-data/queries.sql)')
+    parser.add_argument('--results-prefix', default='query',
+                        help='the prefix of the results files, written next to the queries file as <prefix>-N-results.csv (default: query)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='run every query, even those whose tables have not changed since their results were cached')
+    args = parser.parse_args()
+
+    QueryRunner().run(args.queries_file, args.results_prefix, use_cache=not args.no_cache)
@@ -0,0 +1,231 @@
+import time
+
+from sqlalchemy import text
+
+from .database_utils import LocalDatabaseConnector
+from .datasets.config import orders_data_config
+
+
+class SalesRollups(LocalDatabaseConnector):
+    '''
+    Maintains pre-aggregated sales tables (rollups) in the local database, so that
+    the business queries in querying-the-data/rollup_queries.sql read a few hundred
+    rows instead of joining orders_table to the dimension tables and recomputing
+    product_price * product_quantity over every order. Extends LocalDatabaseConnector.
+
+    The rollups are rebuilt in full at the end of each full load. After an incremental
+    load, the orders rollups are updated with only the orders beyond the high-water mark
+    recorded in the sales_rollups_state table when they were last refreshed, and the
+    rollups of the dimension tables (which are small) are rebuilt, as incremental loads
+    reload dim_date_times. Each refresh runs in a single transaction, so readers see the
+    rollups before or after it, never in between.
+
+    Attributes:
+    ----------
+    _rollups: dict[str, dict]
+        Protected; class attribute mapping the name of each rollup table to its definition:
+        the 'select' query computing its rows (filtered with the {orders_filter} placeholder),
+        its 'key_columns', the 'attribute_columns' taken from the dimension tables, the
+        'additive_columns' summed when new orders are added, and whether it is refreshed
+        'incrementally' (i.e. is aggregated from orders_table).
+    _orders_key_column: str
+        Protected; class attribute holding the name of the numeric key column of orders_table
+        (the key of the source table the orders are extracted from, see orders_data_config).
+    _state_table_name: str
+        Protected; class attribute holding the name of the table recording the high-water
+        mark of the orders included in the rollups.
+    '''
+    _orders_key_column = orders_data_config['source_key_column']
+
+    _state_table_name = 'sales_rollups_state'
+
+    # prices are rounded to pence before being multiplied, so the sales totals are exact
+    _rollups = {
+        'sales_by_month': {'select': """
+            SELECT dim_date_times.year,
+                   dim_date_times.month,
+                   SUM(ROUND(dim_products.product_price::numeric, 2) * orders_table.product_quantity) AS total_sales,
+                   SUM(orders_table.product_quantity) AS product_quantity,
+                   COUNT(*) AS number_of_sales
+            FROM orders_table
+            JOIN dim_products ON orders_table.product_code = dim_products.product_code
+            JOIN dim_date_times ON orders_table.date_uuid = dim_date_times.date_uuid
+            WHERE {orders_filter}
+            GROUP BY dim_date_times.year, dim_date_times.month""",
+                           'key_columns': ['year', 'month'],
+                           'attribute_columns': [],
+                           'additive_columns': ['total_sales', 'product_quantity', 'number_of_sales'],
+                           'incremental': True},
+        'sales_by_store': {'select': """
+            SELECT orders_table.store_code,
+                   dim_store_details.store_type,
+                   dim_store_details.country_code,
+                   dim_store_details.locality,
+                   SUM(ROUND(dim_products.product_price::numeric, 2) * orders_table.product_quantity) AS total_sales,
+                   SUM(orders_table.product_quantity) AS product_quantity,
+                   COUNT(*) AS number_of_sales
+            FROM orders_table
+            JOIN dim_products ON orders_table.product_code = dim_products.product_code
+            JOIN dim_store_details ON orders_table.store_code = dim_store_details.store_code
+            WHERE {orders_filter}
+            GROUP BY orders_table.store_code, dim_store_details.store_type,
+                     dim_store_details.country_code, dim_store_details.locality""",
+                           'key_columns': ['store_code'],
+                           'attribute_columns': ['store_type', 'country_code', 'locality'],
+                           'additive_columns': ['total_sales', 'product_quantity', 'number_of_sales'],
+                           'incremental': True},
+        # the first and last sale of each year, from which the average time between
+        # consecutive sales is derived (see query 9 of rollup_queries.sql)
+        'sale_times_by_year': {'select': """
+            SELECT year,
+                   COUNT(*) AS number_of_sales,
+                   MIN(datetime) AS first_sale_at,
+                   MAX(datetime) AS last_sale_at
+            FROM dim_date_times
+            WHERE {orders_filter}
+            GROUP BY year""",
+                               'key_columns': ['year'],
+                               'attribute_columns': [],
+                               'additive_columns': [],
+                               'incremental': False}
+    }
+
+    @staticmethod
+    def _rebuild_rollup(conn, rollup_name: str, rollup: dict) -> None:
+        '''
+        Protected; method that rebuilds a rollup from the tables of the database.
+
+        Arguments:
+        ---------
+        conn: sqlalchemy.engine.Connection
+            The connection the refresh transaction is running on.
+        rollup_name: str
+            The name of the rollup table.
+        rollup: dict
+            The definition of the rollup (see _rollups).
+        '''
+        conn.execute(text(f'DROP TABLE IF EXISTS "{rollup_name}";'))
+        conn.execute(text(f'CREATE TABLE "{rollup_name}" AS {rollup["select"].format(orders_filter="TRUE")};'))
+        conn.execute(text(f'ALTER TABLE "{rollup_name}" ADD PRIMARY KEY ({", ".join(rollup["key_columns"])});'))
+
+    def _refresh_in_full(self, conn) -> int:
+        '''
+        Protected; method that rebuilds every rollup, and the state table, from the
+        tables of the database.
+
+        Arguments:
+        ---------
+        conn: sqlalchemy.engine.Connection
+            The connection the refresh transaction is running on.
+
+        Returns:
+        -------
+        int: the number of orders included in the rollups.
+        '''
+        for rollup_name, rollup in self._rollups.items():
+            self._rebuild_rollup(conn, rollup_name, rollup)
+
+        conn.execute(text(f'DROP TABLE IF EXISTS "{self._state_table_name}";'))
+        conn.execute(text(f'CREATE TABLE "{self._state_table_name}" AS '
+                          f'SELECT MAX("{self._orders_key_column}") AS orders_high_water_mark FROM orders_table;'))
+        return conn.execute(text("SELECT COUNT(*) FROM orders_table;")).scalar()
+
+    def _refresh_incrementally(self, conn, high_water_mark: int) -> int:
+        '''
+        Protected; method that adds to the orders rollups the orders beyond the high-water
+        mark, adding their totals to those of the existing rows of the rollups, rebuilds the
+        other rollups, and moves the high-water mark on to the last of these orders. Raises
+        a RuntimeError, rolling the refresh back, if any of the new orders has no matching
+        row in a dimension table a rollup joins it to, as the order would be left out of the
+        rollup while the high-water mark moved past it.
+
+        Arguments:
+        ---------
+        conn: sqlalchemy.engine.Connection
+            The connection the refresh transaction is running on.
+        high_water_mark: int
+            The largest key of the orders already included in the rollups.
+
+        Returns:
+        -------
+        int: the number of orders added to the rollups.
+        '''
+        # bounding the new orders above too, so that orders appended during the refresh are
+        # left for the next one rather than added without moving the high-water mark past them
+        new_high_water_mark, new_orders_count = conn.execute(text(
+            f'SELECT MAX("{self._orders_key_column}"), COUNT(*) FROM orders_table '
+            f'WHERE "{self._orders_key_column}" > :high_water_mark;'), {'high_water_mark': high_water_mark}).one()
+        if not new_orders_count:
+            return 0
+
+        orders_filter = (f'orders_table."{self._orders_key_column}" > :high_water_mark '
+                         f'AND orders_table."{self._orders_key_column}" <= :new_high_water_mark')
+        filter_params = {'high_water_mark': high_water_mark, 'new_high_water_mark': new_high_water_mark}
+        for rollup_name, rollup in self._rollups.items():
+            if not rollup['incremental']:
+                self._rebuild_rollup(conn, rollup_name, rollup)
+                continue
+            # the orders rollups inner join the dimension tables, so orders without a matching row are dropped
+            joined_orders_count = conn.execute(text(f'SELECT COALESCE(SUM(number_of_sales), 0) '
+                                                    f'FROM ({rollup["select"].format(orders_filter=orders_filter)}) AS new_sales;'),
+                                               filter_params).scalar()
+            if joined_orders_count != new_orders_count:
+                raise RuntimeError(f"{new_orders_count - joined_orders_count} of the {new_orders_count} new orders have no "
+                                   f"matching rows in the dimension tables of {rollup_name}; run a full load.")
+            columns = rollup['key_columns'] + rollup['attribute_columns'] + rollup['additive_columns']
+            updates = [f'{column} = EXCLUDED.{column}' for column in rollup['attribute_columns']] \
+                + [f'{column} = "{rollup_name}".{column} + EXCLUDED.{column}' for column in rollup['additive_columns']]
+            conn.execute(text(f'INSERT INTO "{rollup_name}" ({", ".join(columns)}) '
+                              f'{rollup["select"].format(orders_filter=orders_filter)} '
+                              f'ON CONFLICT ({", ".join(rollup["key_columns"])}) DO UPDATE SET {", ".join(updates)};'),
+                         filter_params)
+
+        conn.execute(text(f'UPDATE "{self._state_table_name}" SET orders_high_water_mark = :new_high_water_mark;'),
+                     {'new_high_water_mark': new_high_water_mark})
+        return new_orders_count
+
+    # method that brings the rollups up to date with the tables they are aggregated from
+    def refresh(self, incremental: bool = False) -> bool:
+        '''
+        Method that refreshes the rollups in a single transaction: in full, or, if
+        incremental is True and the rollups have been built before, with only the
+        orders added since they were last refreshed.
+
+        Arguments:
+        ---------
+        incremental: bool
+            Default=False. True if only orders (and no dimension tables) have been
+            loaded since the rollups were last refreshed.
+
+        Returns:
+        -------
+        bool: True if the rollups were refreshed, False if the refresh failed, in which
+        case the rollups are left as they were.
+        '''
+        start_time = time.perf_counter()
+        try:
+            self._create_table_versions_table()
+            with self.engine.begin() as conn:
+                high_water_mark = None
+                if incremental and self._state_table_name in self.table_names_in_db:
+                    # locking the state row, so that concurrent refreshes run one after the other
+                    high_water_mark = conn.execute(text(f'SELECT orders_high_water_mark FROM "{self._state_table_name}" '
+                                                        'FOR UPDATE;')).scalar()
+                if high_water_mark is None:
+                    orders_count = self._refresh_in_full(conn)
+                    refresh_description = f"rebuilt from {orders_count} orders"
+                    refreshed_rollup_names = list(self._rollups)
+                else:
+                    orders_count = self._refresh_incrementally(conn, high_water_mark)
+                    refresh_description = f"updated with {orders_count} new orders"
+                    refreshed_rollup_names = list(self._rollups) if orders_count else []
+                # recording that the rollups have changed, so results cached from them are recomputed
+                if refreshed_rollup_names:
+                    self._bump_table_versions(refreshed_rollup_names, conn)
+            print(f"Sales rollups {refresh_description} in {time.perf_counter() - start_time:.2f}s.")
+            return True
+        except Exception as e:
+            print(f"An error occurred in refreshing the sales rollups; they are unchanged: {e!r}")
+            return False
+        finally:
+            self.catalog.invalidate(list(self._rollups) + [self._state_table_name])
@@ -0,0 +1,215 @@
+from datetime import datetime, timezone
+import json
+import os
+
+import pandas as pd
+
+
+class StageSnapshotStore:
+    '''
+    A persistent record of the output of the extract and clean stages of each
+    dataset's pipeline, so that a run can start from a later stage (e.g. clean the
+    last extracted data, or upload the last cleaned data) without extracting the
+    dataset from its source again. Each snapshot is saved as a zstd-compressed
+    Parquet file, with a JSON sidecar file holding its schema, its row count and
+    the state of the dataset needed to resume from it (e.g. its high-water mark).
+    The sidecar is written last, so a snapshot is only read back once it has been
+    written in full, and is checked against the Parquet file when it is read.
+
+    Parameters:
+    ----------
+    snapshot_dir: str
+        Default='db_setup/.state/snapshots'. The directory the snapshots are saved in.
+
+    Attributes:
+    ----------
+    _snapshot_dir: str
+        Protected; the directory the snapshots are saved in.
+    '''
+    # the stages of the pipeline a run can start from, in order; the snapshot read
+    # to start from a stage is the one saved by the stage before it
+    stages = ['extract', 'clean', 'upload']
+
+    def __init__(self, snapshot_dir: str = 'db_setup/.state/snapshots') -> None:
+        '''
+        See help(StageSnapshotStore) for accurate signature.
+        '''
+        self._snapshot_dir = snapshot_dir
+
+    def _get_snapshot_filepaths(self, table_name: str, stage: str) -> tuple[str, str]:
+        '''
+        Protected; method that returns the filepaths of the Parquet file and the
+        JSON sidecar file of the snapshot of a dataset's output of a stage.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the dataset's table in the local database.
+        stage: str
+            The stage whose output the snapshot holds: 'extract' or 'clean'.
+
+        Returns:
+        -------
+        tuple[str, str]: the filepaths of the Parquet file and the sidecar file.
+        '''
+        snapshot_filepath = os.path.join(self._snapshot_dir, f"{table_name}.{stage}")
+        return f"{snapshot_filepath}.parquet", f"{snapshot_filepath}.json"
+
+    @staticmethod
+    def _get_schema(df: pd.DataFrame) -> list[dict]:
+        '''
+        Protected; method that returns the schema of a DataFrame as recorded in the sidecar file.
+
+        Arguments:
+        ---------
+        df: pd.DataFrame
+            The DataFrame.
+
+        Returns:
+        -------
+        list[dict]: a dictionary holding the 'column_name' and 'dtype' of each column, in order.
+        '''
+        return [{'column_name': str(column_name), 'dtype': str(dtype)} for column_name, dtype in df.dtypes.items()]
+
+    @staticmethod
+    def _stringify_mixed_type_columns(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+        '''
+        Protected; method that converts to strings the values of the object columns
+        holding values of more than one type (e.g. the ints and strs of a column read
+        from different pages of a PDF), which can't be written to Parquet. Missing values
+        are kept as they are.
+
+        Arguments:
+        ---------
+        df: pd.DataFrame
+            The DataFrame to be snapshotted.
+
+        Returns:
+        -------
+        tuple[pd.DataFrame, list[str]]: the DataFrame, with the mixed-type columns converted
+        (a new DataFrame if any were), and the names of the converted columns.
+        '''
+        mixed_type_columns = [column_name for column_name in df.columns[df.dtypes == object]
+                              if df[column_name].dropna().map(type).nunique() > 1]
+        if not mixed_type_columns:
+            return df, []
+        df = df.copy(deep=False)
+        for column_name in mixed_type_columns:
+            df[column_name] = df[column_name].map(str, na_action='ignore')
+        return df, mixed_type_columns
+
+    @staticmethod
+    def _restore_schema(df: pd.DataFrame, schema: list[dict]) -> pd.DataFrame:
+        '''
+        Protected; method that casts the columns of a DataFrame read back from Parquet
+        to the dtypes recorded in the sidecar file, where they were read back as another
+        dtype (e.g. a datetime64[s] column, which Parquet stores and reads back as datetime64[ms]).
+
+        Arguments:
+        ---------
+        df: pd.DataFrame
+            The DataFrame read back from the Parquet file.
+        schema: list[dict]
+            The schema recorded in the sidecar file (see _get_schema).
+
+        Returns:
+        -------
+        pd.DataFrame: the DataFrame, with its columns cast to their recorded dtypes
+        (a new DataFrame if any were cast).
+        '''
+        recorded_dtypes = {column['column_name']: column['dtype'] for column in schema}
+        dtypes_to_restore = {column_name: recorded_dtypes[str(column_name)] for column_name, dtype in df.dtypes.items()
+                             if str(column_name) in recorded_dtypes and str(dtype) != recorded_dtypes[str(column_name)]}
+        if not dtypes_to_restore:
+            return df
+        return df.astype(dtypes_to_restore)
+
+    def save(self, table_name: str, stage: str, df: pd.DataFrame, dataset_state: dict = None) -> None:
+        '''
+        Method that saves a snapshot of a dataset's output of a stage, replacing any
+        earlier snapshot of that stage. The values of object columns of mixed types are
+        saved as strings, and the columns listed in the sidecar file. Prints an error and
+        saves nothing if the DataFrame can't be written to Parquet, as the pipeline doesn't
+        depend on the snapshots.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the dataset's table in the local database.
+        stage: str
+            The stage whose output the snapshot holds: 'extract' or 'clean'.
+        df: pd.DataFrame
+            The output of the stage.
+        dataset_state: dict
+            Default=None. JSON-serialisable state of the dataset to be restored along with
+            the snapshot, e.g. {'extracted_high_water_mark': 1000}.
+        '''
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        snapshot_filepath, sidecar_filepath = self._get_snapshot_filepaths(table_name, stage)
+        # removing the old sidecar first so that it is never read back with a newer Parquet file
+        if os.path.isfile(sidecar_filepath):
+            os.remove(sidecar_filepath)
+        # writing to temporary files first so an interrupted write never leaves a partial snapshot
+        temp_filepath = f"{snapshot_filepath}.tmp"
+        df, stringified_columns = self._stringify_mixed_type_columns(df)
+        try:
+            df.to_parquet(temp_filepath, compression='zstd')
+            os.replace(temp_filepath, snapshot_filepath)
+        except Exception as e:
+            print(f"Error: The {stage} snapshot of {table_name} could not be saved: {e!r}")
+            if os.path.isfile(temp_filepath):
+                os.remove(temp_filepath)
+            return
+
+        sidecar = {'table_name': table_name,
+                   'stage': stage,
+                   'saved_at': datetime.now(timezone.utc).isoformat(),
+                   'row_count': len(df),
+                   'schema': self._get_schema(df),
+                   'stringified_columns': stringified_columns,
+                   'dataset_state': dataset_state or {}}
+        with open(f"{sidecar_filepath}.tmp", 'w') as write_file:
+            json.dump(sidecar, write_file, indent=2)
+        os.replace(f"{sidecar_filepath}.tmp", sidecar_filepath)
+        print(f"Saved the {stage} snapshot of {table_name} ({len(df)} rows, "
+              f"{os.path.getsize(snapshot_filepath) / 1024 ** 2:.1f} MB).")
+
+    def load(self, table_name: str, stage: str) -> tuple[pd.DataFrame, dict] | None:
+        '''
+        Method that reads back the snapshot of a dataset's output of a stage, casting
+        its columns back to the dtypes recorded in its sidecar file, and checking its
+        row count and schema against those recorded.
+
+        Arguments:
+        ---------
+        table_name: str
+            The name of the dataset's table in the local database.
+        stage: str
+            The stage whose output the snapshot holds: 'extract' or 'clean'.
+
+        Returns:
+        -------
+        tuple[pd.DataFrame, dict] | None: the output of the stage and the dataset state
+        saved with it, or None if there is no complete snapshot or it doesn't match its sidecar.
+        '''
+        snapshot_filepath, sidecar_filepath = self._get_snapshot_filepaths(table_name, stage)
+        if not os.path.isfile(sidecar_filepath) or not os.path.isfile(snapshot_filepath):
+            print(f"Error: There is no {stage} snapshot of {table_name}.")
+            return None
+
+        try:
+            with open(sidecar_filepath, 'r') as read_file:
+                sidecar = json.load(read_file)
+            df = self._restore_schema(pd.read_parquet(snapshot_filepath), sidecar['schema'])
+        except Exception as e:
+            print(f"Error: The {stage} snapshot of {table_name} could not be read: {e!r}")
+            return None
+
+        if len(df) != sidecar['row_count'] or self._get_schema(df) != sidecar['schema']:
+            print(f"Error: The {stage} snapshot of {table_name} doesn't match the row count and schema recorded with it.")
+            return None
+
+        print(f"Loaded the {stage} snapshot of {table_name} saved at {sidecar['saved_at']} ({len(df)} rows).")
+        if sidecar['stringified_columns']:
+            print(f"The mixed-type values of these columns of the snapshot were saved as strings: {sidecar['stringified_columns']}")
+        return df, sidecar['dataset_state']
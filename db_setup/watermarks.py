@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+
+
+class WatermarkStore:
+    '''
+    A persistent record of the high-water mark (the largest key value extracted
+    so far) of each source table, saved as a JSON file. Used to extract only the
+    rows added to a source table since the last successful load.
+
+    Parameters:
+    ----------
+    watermarks_filepath: str
+        Default='db_setup/.state/watermarks.json'. The filepath of the JSON file
+        the high-water marks are saved to.
+
+    Attributes:
+    ----------
+    _watermarks_filepath: str
+        Protected; the filepath of the JSON file the high-water marks are saved to.
+    _lock: threading.Lock
+        Protected; serialises reading and writing the JSON file.
+    '''
+    def __init__(self, watermarks_filepath: str = 'db_setup/.state/watermarks.json') -> None:
+        '''
+        See help(WatermarkStore) for accurate signature.
+        '''
+        self._watermarks_filepath = watermarks_filepath
+        self._lock = threading.Lock()
+
+    def _read_watermarks(self) -> dict:
+        '''
+        Protected; method that loads the saved high-water marks from the JSON file.
+
+        Returns:
+        -------
+        dict: Dictionary mapping each source table name to its high-water mark.
+        '''
+        if not os.path.isfile(self._watermarks_filepath):
+            return {}
+        with open(self._watermarks_filepath, 'r') as read_file:
+            return json.load(read_file)
+
+    def get(self, source_table_name: str) -> int | None:
+        '''
+        Method that returns the saved high-water mark of a source table.
+
+        Arguments:
+        ---------
+        source_table_name: str
+            The name of the source table.
+
+        Returns:
+        -------
+        int | None: the high-water mark, or None if none has been saved for the table.
+        '''
+        with self._lock:
+            return self._read_watermarks().get(source_table_name)
+
+    def set(self, source_table_name: str, high_water_mark: int) -> None:
+        '''
+        Method that saves the high-water mark of a source table.
+
+        Arguments:
+        ---------
+        source_table_name: str
+            The name of the source table.
+        high_water_mark: int
+            The largest key value of the source table that has been loaded.
+        '''
+        with self._lock:
+            watermarks = self._read_watermarks()
+            watermarks[source_table_name] = int(high_water_mark)
+            os.makedirs(os.path.dirname(self._watermarks_filepath), exist_ok=True)
+            # writing to a temporary file first so an interrupted write never corrupts the saved marks
+            temp_filepath = f"{self._watermarks_filepath}.tmp"
+            with open(temp_filepath, 'w') as write_file:
+                json.dump(watermarks, write_file, indent=2)
+            os.replace(temp_filepath, self._watermarks_filepath)
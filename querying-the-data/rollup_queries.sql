@@ -0,0 +1,169 @@
+-- The business queries of queries.sql, answered from the sales rollups maintained by
+-- db_setup/sales_rollups.py instead of from orders_table. The rollups are refreshed at the
+-- end of each load. Queries 1, 2 and 7 only read dim_store_details (a few hundred rows),
+-- so they are the same as in queries.sql.
+-- The sales totals of the rollups are computed with prices rounded to pence, so they can
+-- differ by a few pence from those of queries.sql, which sums the REAL prices.
+
+
+-- 1. How many stores does the business have and in which country?
+-- The Operations team would like to know which countries we currently operate in and which country now has the most stores.
+
+SELECT
+        country_code AS country,
+        COUNT(country_code) AS total_no_stores
+FROM
+        dim_store_details
+GROUP BY
+        country_code
+ORDER BY
+        total_no_stores DESC;
+
+
+-- 2. Which locations currently have the most stores?
+-- The business stakeholders would like to know which locations currently have the most stores.
+-- They would like to close some stores before opening more in other locations.
+-- Find out which locations have the most stores currently.
+
+SELECT
+        locality,
+        COUNT(store_code) AS total_no_stores
+FROM
+        dim_store_details
+GROUP BY
+        locality
+ORDER BY
+        total_no_stores DESC,
+        locality
+LIMIT 7;
+
+
+-- 3. Which months produce the largest amounts of sales?
+-- Query the database to find out which months have produced the most sales.
+
+SELECT
+        ROUND(SUM(total_sales),2) AS total_sales,
+        month
+FROM
+        sales_by_month
+GROUP BY
+        month
+ORDER BY
+        total_sales DESC
+LIMIT 6;
+
+
+-- 4. The company is looking to increase its online sales.
+-- They want to know how many sales are happening online vs offline.
+-- Calculate how many products were sold and the amount of sales made for online and offline purchases.
+
+-- The web store is the only store without a locality
+
+SELECT
+    SUM(number_of_sales) AS numbers_of_sales,
+    SUM(product_quantity) AS product_quantity_count,
+    CASE WHEN locality IS NULL THEN 'Web' ELSE 'Offline' END AS location
+FROM
+    sales_by_store
+GROUP BY
+    location;
+
+--5. What percentage of sales come through each type of store?
+-- The sales team wants to know which of the different store types is generated the most revenue so they know where to focus.
+-- Find out the total and percentage of sales coming from each of the different store types.
+
+WITH revenue_by_store_type AS (
+        SELECT
+                store_type,
+                ROUND(SUM(total_sales),2) AS total_sales_per_store
+        FROM
+                sales_by_store
+        GROUP BY
+                store_type
+)
+SELECT
+        store_type, total_sales_per_store AS total_sales,
+        ROUND((total_sales_per_store/(SELECT SUM(total_sales_per_store) FROM revenue_by_store_type))*100,2) AS "percentage_total(%)"
+FROM
+        revenue_by_store_type
+ORDER BY
+        total_sales DESC;
+
+
+-- 6. Which month in which year produced the highest cost of sales?
+-- The company stakeholders want assurances that the company has been doing well recently.
+-- Find which months in which years have had the most sales historically.
+
+SELECT
+        total_sales,
+        year,
+        month
+FROM
+        sales_by_month
+ORDER BY
+        total_sales DESC
+LIMIT 10;
+
+
+-- 7. What is the staff headcount?
+-- The operations team would like to know the overall staff numbers in each location around the world.
+-- Perform a query to determine the staff numbers in each of the countries the company sells in.
+
+SELECT
+        SUM(staff_numbers) AS total_staff_numbers,
+        country_code
+FROM
+        dim_store_details
+GROUP BY
+        country_code
+ORDER BY
+        total_staff_numbers DESC;
+
+
+-- 8. Which German store is selling the most?
+-- The sales team is looking to expand their territory in Germany.
+-- Determine which type of store is generating the most sales in Germany
+
+SELECT
+        ROUND(SUM(total_sales),2) AS total_sales,
+        store_type,
+        country_code
+FROM
+        sales_by_store
+WHERE
+        country_code = 'DE'
+GROUP BY
+        store_type,
+        country_code
+ORDER BY
+        total_sales;
+
+
+-- 9. How quickly is the company making sales?
+-- Sales would like to get an accurate metric for how quickly the company is making sales.
+-- Determine the average time taken between each sale grouped by year.
+
+-- The gaps between consecutive sales within a year add up to the time between the year's
+-- last sale and the previous year's last sale (or the year's first sale, for the first year),
+-- so their average is that time divided by the number of gaps.
+
+WITH years AS (
+    SELECT
+            year,
+            number_of_sales,
+            first_sale_at,
+            last_sale_at,
+            LAG(last_sale_at, 1) OVER (
+                    ORDER BY last_sale_at
+            ) AS previous_year_last_sale_at
+    FROM
+            sale_times_by_year
+)
+SELECT
+        year,
+        (last_sale_at - COALESCE(previous_year_last_sale_at, first_sale_at))
+            / NULLIF(number_of_sales - (previous_year_last_sale_at IS NULL)::int, 0) AS actual_time_taken
+FROM
+        years
+ORDER BY
+        actual_time_taken DESC;
\ No newline at end of file
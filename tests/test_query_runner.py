@@ -0,0 +1,47 @@
+import csv
+from datetime import timedelta
+from decimal import Decimal
+
+from db_setup.query_runner import QueryRunner
+
+
+class StubResult:
+
+    def __init__(self, column_names, rows):
+        self._column_names = column_names
+        self._rows = rows
+
+    def keys(self):
+        return self._column_names
+
+    def fetchall(self):
+        return self._rows
+
+
+class StubConnection:
+
+    def __init__(self, result):
+        self.result = result
+        self.executed_queries = []
+
+    def execute(self, statement):
+        self.executed_queries.append(str(statement))
+        return self.result
+
+
+def test_run_query_writes_formatted_results_to_csv(tmp_path):
+    conn = StubConnection(StubResult(['country_code', 'total_sales', 'average_time_taken'],
+                                     [('GB', Decimal('1234.50'), timedelta(hours=2, minutes=17, seconds=12, microseconds=300182)),
+                                      ('DE', None, timedelta(seconds=5))]))
+    results_filepath = tmp_path / 'query-1-results.csv'
+
+    QueryRunner._run_query(conn, 'SELECT * FROM orders_table;', str(results_filepath))
+
+    assert conn.executed_queries == ['SELECT * FROM orders_table;']
+    with open(results_filepath, newline='') as read_file:
+        assert list(csv.reader(read_file)) == [
+            ['country_code', 'total_sales', 'average_time_taken'],
+            ['GB', '1234.50', '{"hours":2,"minutes":17,"seconds":12,"milliseconds":300.182}'],
+            ['DE', '', '{"seconds":5}']]
+    with open(results_filepath, newline='') as read_file:
+        assert read_file.readline() == '"country_code","total_sales","average_time_taken"\r\n'
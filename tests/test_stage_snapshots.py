@@ -0,0 +1,28 @@
+import pandas as pd
+
+from db_setup.stage_snapshots import StageSnapshotStore
+
+
+def test_snapshot_round_trip_restores_datetime64_seconds_column(tmp_path):
+    snapshot_store = StageSnapshotStore(str(tmp_path))
+    df = pd.DataFrame({'date_uuid': ['a', 'b', None],
+                       'timestamp': pd.to_datetime(['2020-01-01 10:00:00', '2021-06-30 23:59:59', None]).astype('datetime64[s]'),
+                       'product_quantity': pd.Series([1, 2, 3], dtype='int16')})
+
+    snapshot_store.save('orders_table', 'clean', df, {'extracted_high_water_mark': 3})
+    loaded = snapshot_store.load('orders_table', 'clean')
+
+    assert loaded is not None
+    loaded_df, dataset_state = loaded
+    assert loaded_df['timestamp'].dtype == 'datetime64[s]'
+    pd.testing.assert_frame_equal(loaded_df, df)
+    assert dataset_state == {'extracted_high_water_mark': 3}
+
+
+def test_snapshot_not_matching_its_sidecar_is_not_loaded(tmp_path):
+    snapshot_store = StageSnapshotStore(str(tmp_path))
+    snapshot_store.save('dim_users', 'extract', pd.DataFrame({'index': [1, 2]}))
+    snapshot_filepath, _ = snapshot_store._get_snapshot_filepaths('dim_users', 'extract')
+    pd.DataFrame({'index': [1, 2, 3]}).to_parquet(snapshot_filepath)
+
+    assert snapshot_store.load('dim_users', 'extract') is None